@@ -0,0 +1,44 @@
+import time
+import numpy as np
+from castle.game import Game
+from castle.kernels import get_kernels
+from players.reinforcement import ReinforcedPlayer
+
+
+def timed(function, repeats):
+    """Seconds per call of `function`, after one untimed warm-up call."""
+    function()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def benchmark_kernels(config, num_games=100000, repeats=200):
+    """
+    Time the kernels of the configured backend.
+
+    Returns:
+        dict: The backend name and the throughput of each kernel.
+    """
+    kernels = get_kernels(config.kernel_backend)
+    game = Game(config)
+    uniform = np.full(config.num_castles, 1 / config.num_castles)
+    allocations1 = config.random_generator.multinomial(
+        config.armies_per_player, uniform, size=num_games
+    )
+    allocations2 = config.random_generator.multinomial(
+        config.armies_per_player, uniform, size=num_games
+    )
+    player = ReinforcedPlayer(config)
+
+    def distribute_and_update():
+        player.distribute_armies()
+        player.update(config.reinforced_win_reward, training_progress=0.5)
+
+    score_seconds = timed(lambda: game.score_allocations(allocations1, allocations2), 5)
+    return {
+        "backend": kernels.name,
+        "games_scored_per_second": num_games / score_seconds,
+        "reinforced_games_per_second": 1 / timed(distribute_and_update, repeats),
+    }
@@ -0,0 +1,223 @@
+import numpy as np
+from castle.game import Game
+from castle.simulator import (
+    FixedStrategy,
+    MixedStrategy,
+    MultinomialStrategy,
+    QPolicyStrategy,
+)
+
+# Castles are scored independently, so the expected points of an allocation
+# against any opponent only depend on the opponent's per-castle army
+# distributions (its marginals), whatever the correlation between castles.
+# The best response is then a knapsack over castles and armies.
+
+OBJECTIVES = ["points", "margin"]
+
+
+def binomial_marginals(genes, armies) -> np.ndarray:
+    """
+    Exact per-castle army distributions of a multinomial strategy: castle c
+    receives Binomial(armies, p_c) armies.
+
+    Returns:
+        np.ndarray: Matrix of shape (castles, armies + 1) whose entry [c, k] is
+        the probability of exactly k armies on castle c.
+    """
+    probabilities = np.asarray(genes, dtype=float)
+    probabilities = probabilities / probabilities.sum()
+    counts = np.arange(armies + 1)
+    log_choose = np.concatenate(
+        ([0.0], np.cumsum(np.log(np.arange(armies, 0, -1) / counts[1:])))
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_p = np.log(probabilities)[:, None]
+        log_q = np.log1p(-probabilities)[:, None]
+        # 0 * log(0) terms are 0, which the products alone would make nan
+        log_pmf = (
+            log_choose
+            + np.where(counts > 0, counts * log_p, 0)
+            + np.where(counts < armies, (armies - counts) * log_q, 0)
+        )
+    return np.exp(log_pmf)
+
+
+def qpolicy_marginals(strategy) -> np.ndarray:
+    """
+    Exact per-castle army distributions of an epsilon-greedy Q-policy.
+
+    Every placement picks the greedy castle or a uniform one independently
+    of the others, so the armies on a castle are a sum of Bernoulli variables
+    with different probabilities. Their distribution is built with one
+    convolution step per placement, for all castles at once.
+
+    Args:
+        strategy (QPolicyStrategy): The policy.
+
+    Returns:
+        np.ndarray: Matrix of shape (castles, armies + 1), see
+        `binomial_marginals`.
+    """
+    castles, armies = strategy.num_castles, strategy.armies
+    picks = np.full((armies, castles), strategy.epsilon / castles)
+    picks[np.arange(armies), strategy.greedy] += 1 - strategy.epsilon
+    marginals = np.zeros((castles, armies + 1))
+    marginals[:, 0] = 1
+    for pick in picks:
+        pick = pick[:, None]
+        marginals[:, 1:] = marginals[:, 1:] * (1 - pick) + marginals[:, :-1] * pick
+        marginals[:, :1] *= 1 - pick
+    return marginals
+
+
+def empirical_marginals(allocations, armies, weights=None) -> np.ndarray:
+    """
+    Per-castle army distributions of a (weighted) set of allocations.
+
+    Returns:
+        np.ndarray: Matrix of shape (castles, armies + 1), see
+        `binomial_marginals`.
+
+    Raises:
+        ValueError: If an allocation places more than `armies` on a castle.
+    """
+    allocations = np.asarray(allocations, dtype=np.int64)
+    if allocations.max() > armies:
+        raise ValueError(f"Allocations place more than {armies} armies on a castle")
+    count, castles = allocations.shape
+    weights = np.full(count, 1.0 / count) if weights is None else weights
+    weights = np.asarray(weights, dtype=float) / np.sum(weights)
+    entries = np.arange(castles) * (armies + 1) + allocations
+    return np.bincount(
+        entries.ravel(),
+        weights=np.repeat(weights, castles),
+        minlength=castles * (armies + 1),
+    ).reshape(castles, armies + 1)
+
+
+def strategy_marginals(strategy, armies) -> np.ndarray:
+    """
+    Per-castle army distributions of a simulator strategy, or of an integer
+    array of sampled allocations.
+
+    Raises:
+        ValueError: If the strategy type is not supported.
+    """
+    if isinstance(strategy, np.ndarray):
+        return empirical_marginals(strategy, armies)
+    if isinstance(strategy, MultinomialStrategy):
+        return binomial_marginals(strategy.genes, strategy.armies)
+    if isinstance(strategy, QPolicyStrategy):
+        return qpolicy_marginals(strategy)
+    if isinstance(strategy, MixedStrategy):
+        return empirical_marginals(strategy.allocations, armies, strategy.weights)
+    if isinstance(strategy, FixedStrategy):
+        return empirical_marginals(strategy.allocation[None, :], armies)
+    raise ValueError(f"No marginals for {type(strategy).__name__}")
+
+
+def castle_values(marginals, points, armies, objective="points") -> np.ndarray:
+    """
+    Expected value of placing 0..armies armies on each castle against an
+    opponent with the given marginals.
+
+    Args:
+        marginals (np.ndarray): Opponent distributions, shape (castles, n).
+        points (np.ndarray): Points per castle.
+        armies (int): Largest number of armies to value.
+        objective (str): "points" values a castle by the points won,
+            points * P(opponent < a); "margin" subtracts the points conceded,
+            points * (P(opponent < a) - P(opponent > a)).
+
+    Returns:
+        np.ndarray: Matrix of shape (castles, armies + 1).
+
+    Raises:
+        ValueError: If the objective is unknown.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Invalid best response objective: {objective}")
+    castles, size = marginals.shape
+    # Armies beyond the opponent's largest count win the castle for sure
+    padded = np.zeros((castles, max(size, armies + 1)))
+    padded[:, :size] = marginals
+    at_most = np.cumsum(padded, axis=1)[:, : armies + 1]
+    values = at_most - padded[:, : armies + 1]
+    if objective == "margin":
+        values = values - (1 - at_most)
+    return np.asarray(points, dtype=float)[:, None] * values
+
+
+def knapsack_allocation(values, armies, max_entries=2**22) -> tuple:
+    """
+    Allocation of exactly `armies` armies maximizing the sum of
+    values[c, a_c] over castles, by dynamic programming over castles.
+
+    Each castle step is vectorized over all (total, armies on the castle)
+    pairs; totals are processed in blocks of at most `max_entries` pairs,
+    so memory stays bounded on large boards.
+
+    Returns:
+        tuple: (allocation, value) of the best allocation.
+    """
+    castles = len(values)
+    totals = np.arange(armies + 1)
+    best = values[0, : armies + 1].copy()
+    choices = np.zeros((castles, armies + 1), dtype=np.int64)
+    choices[0] = totals
+    block_size = max(1, max_entries // (armies + 1))
+    for castle in range(1, castles):
+        placement_values = values[castle, : armies + 1]
+        new_best = np.empty(armies + 1)
+        for start in range(0, armies + 1, block_size):
+            block = totals[start : start + block_size]
+            # candidates[t, a]: t armies in total, a of them on this castle
+            remaining = block[:, None] - totals[None, :]
+            candidates = np.where(
+                remaining >= 0,
+                best[np.maximum(remaining, 0)] + placement_values,
+                -np.inf,
+            )
+            choices[castle, block] = np.argmax(candidates, axis=1)
+            new_best[block] = candidates[np.arange(len(block)), choices[castle, block]]
+        best = new_best
+
+    allocation = np.zeros(castles, dtype=np.int64)
+    remaining = armies
+    for castle in range(castles - 1, -1, -1):
+        allocation[castle] = choices[castle, remaining]
+        remaining -= allocation[castle]
+    return allocation, float(best[armies])
+
+
+def best_response(strategy, config, objective="points") -> tuple:
+    """
+    The allocation maximizing the expected points (or point margin) against
+    an opponent strategy.
+
+    Args:
+        strategy: A simulator strategy, e.g. from `strategy_from_player`, or
+            an integer array of sampled opponent allocations.
+        config (Config): Board and army count.
+        objective (str): "points" or "margin", see `castle_values`.
+
+    Returns:
+        tuple: (allocation, expected value) of the best response.
+    """
+    armies = config.armies_per_player
+    values = castle_values(
+        strategy_marginals(strategy, armies),
+        Game(config).castle_points(),
+        armies,
+        objective,
+    )
+    return knapsack_allocation(values, armies)
+
+
+def exploitability(strategy, config) -> float:
+    """
+    Expected point margin of the best response against a strategy. The game
+    is symmetric and zero-sum in the point margin, so this is 0 for an
+    equilibrium strategy and grows the more the strategy can be exploited.
+    """
+    return best_response(strategy, config, "margin")[1]
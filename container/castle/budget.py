@@ -0,0 +1,88 @@
+import time
+
+# Weight of the latest round in the moving averages of the round cost
+ROUND_COST_SMOOTHING = 0.3
+# Bounds of the factor evaluation depth changes by per round
+MIN_DEPTH = 0.05
+MAX_DEPTH_STEP = 2.0
+
+
+class TrainingBudget:
+    """
+    Wall-clock and match budgets of a training run.
+
+    The budget tracks a moving average of the seconds and matches a round
+    costs and uses it in two ways:
+    - `exhausted` stops training before a round that would overrun a budget,
+      so a run ends within its slot instead of one round after it;
+    - `depth` scales how many matches population evaluation (racing or
+      distributed) plays per individual, and how many opponents every
+      player meets in a "k_opponents" round. It shrinks while the rounds
+      left in the budget would not reach `config.budget_min_rounds` rounds in
+      total, and grows back towards 1 once there is room again.
+
+    The other matchmaking strategies already play a single match per player
+    and round, so their rounds keep their size and the budget only decides
+    when to stop.
+    """
+
+    def __init__(self, config, clock=time.monotonic):
+        self.time_budget = config.time_budget
+        self.match_budget = config.match_budget
+        self.min_rounds = config.budget_min_rounds
+        self.clock = clock
+        self.started = clock()
+        self.round_started = self.started
+        self.rounds = 0
+        self.matches = 0
+        self.round_seconds = None
+        self.round_matches = None
+        self.depth = 1.0
+
+    def elapsed(self) -> float:
+        return self.clock() - self.started
+
+    def progress(self) -> float:
+        """Fraction of the tightest budget used so far, between 0 and 1."""
+        used = [0.0]
+        if self.time_budget is not None:
+            used.append(self.elapsed() / self.time_budget)
+        if self.match_budget is not None:
+            used.append(self.matches / self.match_budget)
+        return min(1.0, max(used))
+
+    def round_cost(self) -> float:
+        """Expected fraction of the tightest budget the next round uses."""
+        cost = 0.0
+        if self.time_budget is not None and self.round_seconds is not None:
+            cost = max(cost, self.round_seconds / self.time_budget)
+        if self.match_budget is not None and self.round_matches is not None:
+            cost = max(cost, self.round_matches / self.match_budget)
+        return cost
+
+    def record_round(self, matches):
+        """Account for a finished round and adapt the evaluation depth."""
+        now = self.clock()
+        seconds = now - self.round_started
+        self.round_started = now
+        self.rounds += 1
+        self.matches += matches
+        if self.round_seconds is None:
+            self.round_seconds, self.round_matches = seconds, matches
+        else:
+            self.round_seconds += ROUND_COST_SMOOTHING * (seconds - self.round_seconds)
+            self.round_matches += ROUND_COST_SMOOTHING * (matches - self.round_matches)
+
+        cost = self.round_cost()
+        if cost > 0:
+            projected_rounds = self.rounds + (1 - self.progress()) / cost
+            step = min(MAX_DEPTH_STEP, projected_rounds / self.min_rounds)
+            self.depth = min(1.0, max(MIN_DEPTH, self.depth * step))
+
+    def exhausted(self) -> bool:
+        """Whether the next round would overrun a budget."""
+        return self.progress() + self.round_cost() > 1 + 1e-9
+
+    def scaled_matches(self, matches) -> int:
+        """A per-individual evaluation match count scaled by the depth."""
+        return max(1, round(matches * self.depth))
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import numpy as np
+
+
+def atomic_save(path, save):
+    """
+    Write a file through `save(file)` so readers never see a partial file:
+    the data goes to a temporary file in the same directory, which then
+    replaces `path` in one rename.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    handle, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as temporary_file:
+            save(temporary_file)
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def save_qmatrix(path, qmatrix):
+    """Atomically save a Q-matrix as a .npy file."""
+    atomic_save(path, lambda checkpoint: np.save(checkpoint, np.asarray(qmatrix)))
+
+
+def load_qmatrix(path, mmap_threshold=None):
+    """
+    Load a Q-matrix saved with save_qmatrix.
+
+    Args:
+        path (str): The .npy file.
+        mmap_threshold (int): Files larger than this many bytes are
+            memory-mapped copy-on-write instead of read into memory; updates
+            then stay in memory and never touch the file.
+    """
+    if mmap_threshold is not None and os.path.getsize(path) > mmap_threshold:
+        return np.load(path, mmap_mode="c")
+    return np.load(path)
+
+
+def save_elites(path, genes, fitness=None, ratings=None, source="elites"):
+    """
+    Atomically save the genes of the best players of a population, best
+    first.
+
+    Args:
+        path (str): The .npz file.
+        genes (np.ndarray): Gene matrix of shape (players, castles).
+        fitness (np.ndarray): Optional fitness of each player.
+        ratings (np.ndarray): Optional [mean, variance] rating of each player.
+        source (str): What the genes are: "elites" ranked by fitness, or
+            "cmaes_mean", the mean of a CMA-ES search distribution.
+    """
+    arrays = {"genes": np.asarray(genes, dtype=float), "source": np.array(source)}
+    if fitness is not None:
+        arrays["fitness"] = np.asarray(fitness, dtype=float)
+    if ratings is not None:
+        arrays["ratings"] = np.asarray(ratings, dtype=float)
+    atomic_save(path, lambda checkpoint: np.savez(checkpoint, **arrays))
+
+
+def load_elites(path) -> np.ndarray:
+    """Load the gene matrix saved with save_elites."""
+    with np.load(path) as elites:
+        return elites["genes"]
+
+
+def load_elite_ratings(path):
+    """Load the ratings saved with save_elites, or None if there are none."""
+    with np.load(path) as elites:
+        return elites["ratings"] if "ratings" in elites else None
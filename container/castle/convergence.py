@@ -0,0 +1,147 @@
+import math
+import numpy as np
+from players.player import RandomPlayer
+from castle.simulator import simulate, strategies_from_players
+
+
+def wilson_interval(successes: int, trials: int, z: float = 1.96):
+    """
+    Wilson score interval for a binomial proportion.
+
+    Args:
+        successes (int): Number of successes.
+        trials (int): Number of trials.
+        z (float): Normal quantile of the desired confidence level.
+
+    Returns:
+        tuple: (lower, upper) bounds of the interval.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z**2 / trials
+    centre = (p + z**2 / (2 * trials)) / denominator
+    margin = (
+        z * math.sqrt(p * (1 - p) / trials + z**2 / (4 * trials**2)) / denominator
+    )
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+
+class ConvergenceMonitor:
+    """
+    Watches the training signal of one side of the trainer and decides when
+    further rounds stop paying off.
+
+    Three signals are tracked per round:
+    - best and mean fitness, compared between two consecutive windows;
+    - the variance of the gene matrix of a genetic population;
+    - the win rate of the current best player against a held-out random
+      baseline, with a Wilson confidence interval.
+    """
+
+    def __init__(self, config, game):
+        self.config = config
+        self.game = game
+        self.window = config.convergence_window
+        self.best_fitness = []
+        self.mean_fitness = []
+        self.gene_variance = []
+        self.baseline_intervals = []
+        self.baseline_player = RandomPlayer(config)
+
+    def reset(self):
+        """Forget the fitness history, e.g. after the mutation rate was raised."""
+        self.best_fitness = []
+        self.mean_fitness = []
+        self.baseline_intervals = []
+
+    def observe(self, round_number, population, results, best_player):
+        """
+        Record the statistics of a finished round.
+
+        Args:
+            round_number (int): Zero-based index of the round.
+            population (list): The population that played the round.
+            results (list): (player, reward) tuples of the round.
+            best_player (Player): The current best player of this side.
+        """
+        if hasattr(population[0], "fitness"):
+            fitness = np.array([player.fitness() for player in population])
+        else:
+            fitness = np.array([reward for _, reward in results], dtype=float)
+        self.best_fitness.append(float(np.max(fitness)))
+        self.mean_fitness.append(float(np.mean(fitness)))
+
+        if hasattr(population[0], "chromosome"):
+            genes = np.array([player.chromosome.genes for player in population])
+            self.gene_variance.append(float(np.mean(np.var(genes, axis=0))))
+
+        interval = self.config.baseline_eval_interval
+        if interval > 0 and (round_number + 1) % interval == 0:
+            self.baseline_intervals.append(self.evaluate_baseline(best_player))
+
+    def evaluate_baseline(self, player):
+        """
+        Play the given player against the held-out random baseline.
+
+        Returns:
+            tuple: Wilson interval of the player's win rate.
+        """
+        result = simulate(
+            self.config,
+            strategies_from_players([player]),
+            strategies_from_players([self.baseline_player]),
+            self.config.baseline_eval_matches,
+        )
+        return wilson_interval(
+            int(result.wins[0, 0]), self.config.baseline_eval_matches
+        )
+
+    def fitness_stalled(self) -> bool:
+        """
+        Whether best and mean fitness did not move significantly between the
+        last two windows. A change counts as significant when it exceeds the
+        configured tolerance plus two standard errors of the window means, so
+        noisy single-game sides are not mistaken for improving ones.
+        """
+        window = self.window
+        if len(self.best_fitness) < 2 * window:
+            return False
+        best_delta = max(self.best_fitness[-window:]) - max(
+            self.best_fitness[-2 * window : -window]
+        )
+        previous = np.array(self.mean_fitness[-2 * window : -window])
+        recent = np.array(self.mean_fitness[-window:])
+        mean_delta = abs(np.mean(recent) - np.mean(previous))
+        standard_error = math.sqrt((np.var(previous) + np.var(recent)) / window)
+        tolerance = self.config.convergence_tolerance
+        return (
+            best_delta < tolerance + 2 * standard_error
+            and mean_delta < tolerance + 2 * standard_error
+        )
+
+    def diversity_collapsed(self) -> bool:
+        """Whether the population's genes have become (nearly) identical."""
+        return (
+            len(self.gene_variance) > 0
+            and self.gene_variance[-1] < self.config.diversity_threshold
+        )
+
+    def baseline_stalled(self) -> bool:
+        """
+        Whether the latest baseline win rate is not significantly better than
+        the best earlier one. Without baseline evaluations this is vacuously true.
+        """
+        if self.config.baseline_eval_interval <= 0:
+            return True
+        if len(self.baseline_intervals) < 2:
+            return False
+        _, best_upper = max(self.baseline_intervals[:-1])
+        latest_lower, _ = self.baseline_intervals[-1]
+        return latest_lower <= best_upper
+
+    def stalled(self) -> bool:
+        """Whether this side has stopped making progress."""
+        return self.fitness_stalled() and (
+            self.baseline_stalled() or self.diversity_collapsed()
+        )
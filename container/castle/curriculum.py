@@ -0,0 +1,98 @@
+import copy
+import numpy as np
+from players.approximate import ApproximatePlayer
+from players.cmaes import CMAESPlayer
+from players.genetic import GeneticPlayer
+from players.reinforcement import ReinforcedPlayer
+
+# Gene vectors are shares of the armies per castle and the approximate
+# players' features are fractions of the army count, so both carry over to a
+# larger army count unchanged. Q-tables are indexed by the number of armies
+# left and are stretched to the new count.
+
+
+def curriculum_stages(config) -> list:
+    """
+    The configs of the reduced stages before full-size training.
+
+    Stage i plays with `config.curriculum_armies[i]` armies for
+    `config.curriculum_rounds[i]` training rounds; everything else, apart
+    from the outputs that only the full-size run writes, is the same. Time
+    and match budgets apply to the full-size run only, so the stages keep
+    their round counts.
+
+    Raises:
+        ValueError: If the army counts do not increase towards
+            `config.armies_per_player` or there is not one round count per
+            stage.
+    """
+    armies = config.curriculum_armies
+    if len(config.curriculum_rounds) != len(armies):
+        raise ValueError("curriculum_rounds needs one round count per stage")
+    if any(
+        count <= 0 or count >= following
+        for count, following in zip(armies, armies[1:] + (config.armies_per_player,))
+    ):
+        raise ValueError(
+            f"Curriculum army counts must increase below {config.armies_per_player}"
+        )
+    return [
+        config.replace(
+            armies_per_player=count,
+            num_training_rounds=rounds,
+            time_budget=None,
+            match_budget=None,
+            curriculum_armies=(),
+            curriculum_rounds=(),
+            checkpoint_dir=None,
+            match_log_path=None,
+            exploitability_interval=0,
+        )
+        for count, rounds in zip(armies, config.curriculum_rounds)
+    ]
+
+
+def upsample_qmatrix(qmatrix, armies) -> np.ndarray:
+    """
+    Stretch a Q-matrix to another army count: row r of the result is the
+    source interpolated at the same fraction r / armies of armies left.
+
+    Args:
+        qmatrix (np.ndarray): Matrix of shape (source armies + 1, castles).
+        armies (int): Target army count.
+
+    Returns:
+        np.ndarray: Matrix of shape (armies + 1, castles).
+    """
+    qmatrix = np.asarray(qmatrix, dtype=float)
+    positions = np.arange(armies + 1) * (len(qmatrix) - 1) / armies
+    lower = np.minimum(positions.astype(int), len(qmatrix) - 2)
+    weights = (positions - lower)[:, None]
+    return (1 - weights) * qmatrix[lower] + weights * qmatrix[lower + 1]
+
+
+def transfer_player(source, target):
+    """
+    Carry what `source` learned at a lower fidelity over to `target` of the
+    same type. Players without learned state (random, equilibrium) are left
+    as they are.
+    """
+    if isinstance(source, CMAESPlayer):
+        target.set_logits(source.logits.copy())
+    elif isinstance(source, GeneticPlayer):
+        target.chromosome.genes = source.chromosome.genes.copy()
+    elif isinstance(source, ReinforcedPlayer):
+        target.set_qmatrix(
+            upsample_qmatrix(source.get_qmatrix(), target.config.armies_per_player)
+        )
+    elif isinstance(source, ApproximatePlayer):
+        target.qfunction = copy.deepcopy(source.qfunction)
+
+
+def transfer_strategy(source, config):
+    """A copy of a CMAES search distribution that samples for `config`."""
+    # tell replaces the distribution's arrays instead of updating them in
+    # place, so the copy can share them
+    strategy = copy.copy(source)
+    strategy.config = config
+    return strategy
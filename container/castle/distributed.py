@@ -0,0 +1,341 @@
+import collections
+import json
+import math
+import os
+import socket
+import struct
+import threading
+import time
+import numpy as np
+from castle.game import Config, Game
+
+# Wire format. Every message is a header (magic, kind, metadata length, array
+# count), UTF-8 JSON metadata, then per array a header (dtype string, number
+# of dimensions), its shape and its raw bytes. Arrays are sent from and
+# received into contiguous buffers without any further encoding.
+MAGIC = b"CSTL"
+MESSAGE_HEADER = struct.Struct("<4sBIH")
+ARRAY_HEADER = struct.Struct("<8sB")
+DIMENSION = struct.Struct("<q")
+
+CONFIG = 1
+TASK = 2
+RESULT = 3
+SHUTDOWN = 4
+
+
+def parse_address(address):
+    """
+    Socket family and address of "unix:/path/to/socket" or "host:port".
+
+    Raises:
+        ValueError: If a TCP address has no port.
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    host, separator, port = address.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Invalid address, expected host:port or unix:path: {address}")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def send_message(sock, kind, metadata=None, arrays=()):
+    """Send a message with JSON metadata and raw array buffers."""
+    meta = json.dumps(metadata or {}).encode()
+    sock.sendall(MESSAGE_HEADER.pack(MAGIC, kind, len(meta), len(arrays)) + meta)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        header = ARRAY_HEADER.pack(array.dtype.str.encode(), array.ndim)
+        sock.sendall(header + b"".join(DIMENSION.pack(size) for size in array.shape))
+        sock.sendall(memoryview(array).cast("B"))
+
+
+def receive_exactly(sock, size) -> bytearray:
+    """
+    Receive exactly `size` bytes.
+
+    Raises:
+        ConnectionError: If the peer closes the connection first.
+    """
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Connection closed by peer")
+        received += count
+    return buffer
+
+
+def receive_message(sock) -> tuple:
+    """
+    Receive a message sent with `send_message`.
+
+    Returns:
+        tuple: (kind, metadata dict, list of arrays).
+
+    Raises:
+        ConnectionError: If the connection closes or the message is malformed.
+    """
+    magic, kind, meta_size, num_arrays = MESSAGE_HEADER.unpack(
+        receive_exactly(sock, MESSAGE_HEADER.size)
+    )
+    if magic != MAGIC:
+        raise ConnectionError("Invalid message header")
+    metadata = json.loads(receive_exactly(sock, meta_size).decode())
+    arrays = []
+    for _ in range(num_arrays):
+        dtype, ndim = ARRAY_HEADER.unpack(receive_exactly(sock, ARRAY_HEADER.size))
+        dtype = np.dtype(dtype.rstrip(b"\0").decode())
+        shape = tuple(
+            DIMENSION.unpack(receive_exactly(sock, DIMENSION.size))[0]
+            for _ in range(ndim)
+        )
+        size = math.prod(shape) * dtype.itemsize
+        arrays.append(np.frombuffer(receive_exactly(sock, size), dtype).reshape(shape))
+    return kind, metadata, arrays
+
+
+def evaluate_shard(config, genes, opponents, matches, left_side, seed) -> np.ndarray:
+    """
+    Mean reward of every gene vector over `matches` matches against
+    allocations drawn from an opponent sample. All randomness comes from
+    `seed`, so a shard gives the same result on any worker.
+
+    Args:
+        config (Config): Board and rewards.
+        genes (np.ndarray): Gene vectors of shape (individuals, castles).
+        opponents (np.ndarray): Opponent allocations, shape (samples, castles).
+        matches (int): Matches per individual.
+        left_side (bool): Whether the individuals play as player 1.
+        seed (int): Seed of the shard's random generator.
+
+    Returns:
+        np.ndarray: Mean reward per individual.
+    """
+    rng = np.random.default_rng(seed)
+    game = Game(config)
+    allocations = rng.multinomial(
+        config.armies_per_player, genes, size=(matches, len(genes))
+    )
+    allocations = allocations.transpose(1, 0, 2).reshape(-1, genes.shape[1])
+    opponent_allocations = opponents[
+        rng.integers(len(opponents), size=len(allocations))
+    ]
+    if left_side:
+        rewards, _ = game.score_rewards(
+            *game.score_allocations(allocations, opponent_allocations)
+        )
+    else:
+        _, rewards = game.score_rewards(
+            *game.score_allocations(opponent_allocations, allocations)
+        )
+    return rewards.reshape(len(genes), matches).mean(axis=1)
+
+
+class Coordinator:
+    """
+    Hands out population evaluations to workers connected over TCP or a Unix
+    socket.
+
+    `evaluate` splits the gene matrix into shards of
+    `config.distributed_shard_size` individuals. Each connected worker takes
+    one shard at a time; a shard whose worker disconnects or does not answer
+    within `config.distributed_timeout` seconds goes back to the queue for
+    another worker. While no worker is connected, the coordinator evaluates
+    the queued shards itself, so training never waits for workers.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.condition = threading.Condition()
+        self.pending = collections.deque()
+        self.results = {}
+        self.workers = 0
+        self.next_task_id = 0
+        self.closed = False
+        self.server = None
+        self.shards_by_worker = 0
+        self.shards_local = 0
+
+    def start(self):
+        """Listen on `config.distributed_address` and accept workers."""
+        family, address = parse_address(self.config.distributed_address)
+        if family == socket.AF_UNIX and os.path.exists(address):
+            os.unlink(address)
+        self.server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(address)
+        self.server.listen()
+        threading.Thread(target=self.accept_workers, daemon=True).start()
+
+    def accept_workers(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(
+                target=self.serve_worker, args=(connection,), daemon=True
+            ).start()
+
+    def serve_worker(self, connection):
+        connection.settimeout(self.config.distributed_timeout)
+        with self.condition:
+            if self.closed:
+                connection.close()
+                return
+            self.workers += 1
+            self.condition.notify_all()
+        task = None
+        try:
+            send_message(connection, CONFIG, {"config": self.config.to_dict()})
+            while True:
+                with self.condition:
+                    while not self.pending and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        send_message(connection, SHUTDOWN)
+                        break
+                    task = self.pending.popleft()
+                task_id, metadata, genes, opponents = task
+                send_message(connection, TASK, metadata, [genes, opponents])
+                _, _, (rewards,) = receive_message(connection)
+                with self.condition:
+                    self.results[task_id] = rewards
+                    self.shards_by_worker += 1
+                    self.condition.notify_all()
+                task = None
+        except (OSError, ConnectionError, ValueError):
+            pass
+        finally:
+            with self.condition:
+                if task is not None:
+                    # The worker failed with the shard, another one takes over
+                    self.pending.appendleft(task)
+                self.workers -= 1
+                self.condition.notify_all()
+            connection.close()
+
+    def evaluate(self, genes, opponents, matches, left_side=True) -> np.ndarray:
+        """
+        Mean reward of every gene vector, see `evaluate_shard`.
+
+        Returns:
+            np.ndarray: Mean reward per row of `genes`.
+        """
+        genes = np.asarray(genes, dtype=float)
+        opponents = np.asarray(opponents, dtype=np.int64)
+        shard_size = self.config.distributed_shard_size
+        task_ids = []
+        with self.condition:
+            for start in range(0, len(genes), shard_size):
+                metadata = {
+                    "matches": matches,
+                    "left_side": bool(left_side),
+                    "seed": int(self.config.random_generator.integers(2**63)),
+                }
+                self.pending.append(
+                    (
+                        self.next_task_id,
+                        metadata,
+                        genes[start : start + shard_size],
+                        opponents,
+                    )
+                )
+                task_ids.append(self.next_task_id)
+                self.next_task_id += 1
+            self.condition.notify_all()
+
+        while True:
+            with self.condition:
+                while not all(task_id in self.results for task_id in task_ids) and (
+                    self.workers > 0 or not self.pending
+                ):
+                    self.condition.wait()
+                if all(task_id in self.results for task_id in task_ids):
+                    return np.concatenate(
+                        [self.results.pop(task_id) for task_id in task_ids]
+                    )
+                task_id, metadata, shard, _ = self.pending.popleft()
+            rewards = evaluate_shard(
+                self.config,
+                shard,
+                opponents,
+                metadata["matches"],
+                metadata["left_side"],
+                metadata["seed"],
+            )
+            with self.condition:
+                self.results[task_id] = rewards
+                self.shards_local += 1
+
+    def close(self):
+        """Stop accepting workers and tell the connected ones to shut down."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.server is not None:
+            self.server.close()
+            family, address = parse_address(self.config.distributed_address)
+            if family == socket.AF_UNIX and os.path.exists(address):
+                os.unlink(address)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def run_worker(address, retry_interval=1.0, max_failures=None):
+    """
+    Evaluate shards for a coordinator until it shuts the worker down.
+
+    The worker (re)connects whenever it has no connection: after a failed
+    connection attempt, a dropped connection or a coordinator restart, it
+    waits `retry_interval` seconds and tries again.
+
+    Args:
+        address (str): Coordinator address, "host:port" or "unix:/path".
+        retry_interval (float): Seconds between connection attempts.
+        max_failures (int): Give up after this many consecutive failures;
+            None retries forever.
+
+    Returns:
+        int: Number of shards evaluated.
+    """
+    family, sockaddr = parse_address(address)
+    evaluated = 0
+    failures = 0
+    while max_failures is None or failures < max_failures:
+        try:
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
+                sock.connect(sockaddr)
+                kind, metadata, _ = receive_message(sock)
+                if kind != CONFIG:
+                    raise ConnectionError("Expected the config first")
+                config = Config.from_dict(metadata["config"])
+                failures = 0
+                while True:
+                    kind, metadata, arrays = receive_message(sock)
+                    if kind == SHUTDOWN:
+                        return evaluated
+                    genes, opponents = arrays
+                    rewards = evaluate_shard(
+                        config,
+                        genes,
+                        opponents,
+                        metadata["matches"],
+                        metadata["left_side"],
+                        metadata["seed"],
+                    )
+                    send_message(sock, RESULT, arrays=[rewards])
+                    evaluated += 1
+        except (OSError, ConnectionError):
+            failures += 1
+            time.sleep(retry_interval)
+    return evaluated
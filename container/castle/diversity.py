@@ -0,0 +1,111 @@
+import numpy as np
+
+
+def gene_statistics(genes) -> dict:
+    """
+    Diversity statistics of a gene matrix that cost a single pass over it.
+
+    Returns:
+        dict: "gene_variance", the mean per-castle variance; "centroid_distance",
+        the mean L1 distance to the mean genes; "entropy", the mean entropy
+        (in nats) of the individual gene vectors.
+    """
+    genes = np.asarray(genes, dtype=float)
+    centroid = genes.mean(axis=0)
+    safe_genes = np.where(genes > 0, genes, 1)
+    return {
+        "gene_variance": float(np.mean(np.var(genes, axis=0))),
+        "centroid_distance": float(np.mean(np.abs(genes - centroid).sum(axis=1))),
+        "entropy": float(np.mean(-np.sum(genes * np.log(safe_genes), axis=1))),
+    }
+
+
+def pairwise_distances(rows, genes, block_size=256) -> np.ndarray:
+    """
+    L1 distances between every row of `rows` and every row of `genes`.
+
+    The distances are computed `block_size` rows at a time, so the
+    intermediate array stays at block_size * len(genes) * castles entries.
+
+    Returns:
+        np.ndarray: Matrix of shape (len(rows), len(genes)).
+    """
+    distances = np.empty((len(rows), len(genes)))
+    for start in range(0, len(rows), block_size):
+        block = rows[start : start + block_size]
+        distances[start : start + len(block)] = np.abs(
+            block[:, None, :] - genes[None, :, :]
+        ).sum(axis=2)
+    return distances
+
+
+def shared_fitness(fitness, distances, radius, alpha=1.0) -> tuple:
+    """
+    Fitness sharing: divide each individual's fitness by its niche count,
+    the summed similarity 1 - (d / radius) ** alpha to all individuals closer
+    than `radius` (itself included). Fitness is shifted to be non-negative
+    first, so sharing always penalizes crowded niches.
+
+    Returns:
+        tuple: (shared fitness, niche count) arrays.
+    """
+    fitness = np.asarray(fitness, dtype=float)
+    similarity = np.where(distances < radius, 1 - (distances / radius) ** alpha, 0)
+    niche_counts = similarity.sum(axis=1)
+    return (fitness - fitness.min()) / niche_counts, niche_counts
+
+
+class DistanceCache:
+    """
+    Pairwise gene distances of a population, kept across generations.
+
+    A chromosome keeps its row when it is the same object with the same
+    `version` as in the previous call; elites that survive a generation
+    unchanged are therefore never recomputed. Only the rows of new or
+    modified chromosomes are computed, against the whole population.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.chromosomes = []
+        self.versions = []
+        self.distances = np.zeros((0, 0))
+        self.recomputed_rows = 0
+
+    def update(self, chromosomes) -> np.ndarray:
+        """
+        Return the distance matrix of the given chromosomes, in their order.
+        """
+        previous = {
+            id(chromosome): (index, version)
+            for index, (chromosome, version) in enumerate(
+                zip(self.chromosomes, self.versions)
+            )
+        }
+        kept_new = []
+        kept_old = []
+        for index, chromosome in enumerate(chromosomes):
+            old = previous.get(id(chromosome))
+            if old is not None and old[1] == chromosome.version:
+                kept_new.append(index)
+                kept_old.append(old[0])
+
+        genes = np.array([chromosome.genes for chromosome in chromosomes])
+        distances = np.empty((len(chromosomes), len(chromosomes)))
+        distances[np.ix_(kept_new, kept_new)] = self.distances[
+            np.ix_(kept_old, kept_old)
+        ]
+        changed = np.setdiff1d(np.arange(len(chromosomes)), kept_new)
+        if len(changed):
+            rows = pairwise_distances(
+                genes[changed], genes, self.config.diversity_block_size
+            )
+            distances[changed] = rows
+            distances[:, changed] = rows.T
+
+        # Holding on to the chromosomes keeps their ids from being reused
+        self.chromosomes = list(chromosomes)
+        self.versions = [chromosome.version for chromosome in chromosomes]
+        self.distances = distances
+        self.recomputed_rows = len(changed)
+        return distances
@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class EquilibriumSolver:
+    """
+    Approximates a Nash equilibrium of the game restricted to a finite set of
+    allocations.
+
+    The payoff matrix of the set is computed once with the batched scorer
+    (+1 for a win on points, -1 for a loss, 0 for equal points), which makes
+    the restricted game symmetric and zero-sum. Regret matching (or fictitious
+    play) then iterates on that matrix only, without playing further games.
+    """
+
+    def __init__(self, config, game):
+        self.config = config
+        self.game = game
+        self.games_played = 0
+
+    def payoff_matrix(self, strategies) -> np.ndarray:
+        """
+        Payoff of every allocation against every other allocation.
+
+        Games are scored in chunks of about `config.equilibrium_chunk_size`
+        so memory use does not grow with the square of the set size.
+
+        Returns:
+            np.ndarray: Matrix A with A[i, j] the payoff of strategy i against j.
+        """
+        size = len(strategies)
+        payoffs = np.zeros((size, size))
+        rows_per_chunk = max(1, self.config.equilibrium_chunk_size // size)
+        for start in range(0, size, rows_per_chunk):
+            rows = strategies[start : start + rows_per_chunk]
+            _, score, opponent_score = self.game.score_allocations(
+                np.repeat(rows, size, axis=0), np.tile(strategies, (len(rows), 1))
+            )
+            payoffs[start : start + len(rows)] = np.sign(
+                score - opponent_score
+            ).reshape(len(rows), size)
+            self.games_played += len(rows) * size
+        return payoffs
+
+    def regret_matching(self, payoffs, iterations) -> np.ndarray:
+        """
+        Regret matching+ in self-play; returns the weighted average strategy.
+        """
+        size = len(payoffs)
+        regrets = np.zeros(size)
+        strategy_sum = np.zeros(size)
+        for iteration in range(1, iterations + 1):
+            positive = np.maximum(regrets, 0)
+            total = positive.sum()
+            strategy = positive / total if total > 0 else np.full(size, 1 / size)
+            values = payoffs @ strategy
+            regrets = np.maximum(regrets + values - strategy @ values, 0)
+            strategy_sum += iteration * strategy
+        return strategy_sum / strategy_sum.sum()
+
+    def fictitious_play(self, payoffs, iterations) -> np.ndarray:
+        """
+        Fictitious play; returns the empirical frequency of best responses.
+        """
+        counts = np.zeros(len(payoffs))
+        counts[self.config.random_generator.integers(len(payoffs))] = 1
+        for _ in range(iterations):
+            counts[np.argmax(payoffs @ counts)] += 1
+        return counts / counts.sum()
+
+    def exploitability(self, payoffs, strategy) -> float:
+        """
+        Payoff of the best pure response within the set against the mixed
+        strategy; 0 for an exact equilibrium of the restricted game.
+        """
+        return float(np.max(payoffs @ strategy))
+
+    def solve(self, player):
+        """
+        Compute an equilibrium over the player's allocations and let the player
+        use it.
+
+        Returns:
+            float: The exploitability of the resulting strategy within the set.
+        """
+        payoffs = self.payoff_matrix(player.strategies)
+        iterations = self.config.equilibrium_iterations
+        if self.config.equilibrium_method == "regret_matching":
+            weights = self.regret_matching(payoffs, iterations)
+        elif self.config.equilibrium_method == "fictitious_play":
+            weights = self.fictitious_play(payoffs, iterations)
+        else:
+            raise ValueError(
+                f"Invalid equilibrium method: {self.config.equilibrium_method}"
+            )
+        exploitability = self.exploitability(payoffs, weights)
+        # Drop allocations that are (almost) never played
+        weights = np.where(weights > 1e-4, weights, 0)
+        player.set_strategy(player.strategies, weights)
+        return exploitability
@@ -1,37 +1,280 @@
+import dataclasses
+import hashlib
+import json
+import os
+import typing
 import numpy as np
-from typing import Dict
+from typing import Dict, Optional, Tuple
+from castle.kernels import get_kernels
 
+# Prefix of the environment variables read by Config.from_env
+ENV_PREFIX = "CASTLE_"
 
+
+def parse_value(hint, value):
+    """
+    Convert a value read from a file, the environment or the command line to
+    the type of a Config field. Strings are parsed, lists become tuples.
+
+    Raises:
+        ValueError: If the value cannot be converted.
+    """
+    if typing.get_origin(hint) is typing.Union:
+        if value is None or (
+            isinstance(value, str) and value.strip().lower() in ("", "none", "null")
+        ):
+            return None
+        hint = next(arg for arg in typing.get_args(hint) if arg is not type(None))
+    if typing.get_origin(hint) is tuple:
+        if isinstance(value, str):
+            value = [part.strip() for part in value.split(",") if part.strip()]
+        item_type = typing.get_args(hint)[0]
+        return tuple(parse_value(item_type, item) for item in value)
+    if hint is bool:
+        if isinstance(value, str):
+            if value.strip().lower() in ("1", "true", "yes", "on"):
+                return True
+            if value.strip().lower() in ("0", "false", "no", "off"):
+                return False
+            raise ValueError(f"Invalid boolean: {value}")
+        return bool(value)
+    if hint is int:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"Invalid integer: {value}")
+        return int(value)
+    if hint is float:
+        return float(value)
+    return hint(value)
+
+
+def read_config_file(path) -> dict:
+    """
+    Read config values from a JSON or (with PyYAML installed) YAML file.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in (".json", ".yaml", ".yml"):
+        raise ValueError(f"Unsupported config file type: {path}")
+    with open(path) as config_file:
+        if extension == ".json":
+            return json.load(config_file)
+        try:
+            import yaml
+        except ImportError:  # pragma: no cover - depends on the environment
+            raise ValueError("Reading YAML configs requires PyYAML")
+        return yaml.safe_load(config_file) or {}
+
+
+def env_values(environ=None, prefix=ENV_PREFIX) -> dict:
+    """
+    Config values set through environment variables, e.g.
+    CASTLE_POPULATION_SIZE=100 for `population_size`.
+    """
+    environ = os.environ if environ is None else environ
+    names = {field.name for field in dataclasses.fields(Config) if field.init}
+    values = {}
+    for key, value in environ.items():
+        if key.startswith(prefix) and key[len(prefix) :].lower() in names:
+            values[key[len(prefix) :].lower()] = value
+    return values
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class Config:
-    def __init__(
-        self,
-        num_castles=10,
-        armies_per_player=100,
-        num_matches=100,
-        num_training_rounds=1000,
-    ):
-        self.num_castles = num_castles
-        self.points_per_castle = {i + 1: i + 1 for i in range(self.num_castles)}
-        self.armies_per_player = armies_per_player
-        self.random_generator = np.random.default_rng()
-        self.num_matches = num_matches
-        self.num_training_rounds = num_training_rounds
-
-        self.learning_rate = 0.05  # Lower learning rate for stability
-        self.discount_factor = (
-            0.95  # Higher discount factor to value future rewards more
+    """
+    Immutable hyperparameters of a game and its training.
+
+    Configs are hashable and compare by value; `random_generator` and the
+    derived `points_per_castle` are excluded from comparison, hashing and
+    serialization. Use `replace` to derive a changed config. Note that a
+    derived config starts a fresh random generator from its seed.
+    """
+
+    num_castles: int = 10
+    armies_per_player: int = 100
+    num_matches: int = 100
+    num_training_rounds: int = 1000
+    early_stopping: bool = False
+    time_budget: Optional[float] = None  # Seconds; replaces the round count
+    match_budget: Optional[int] = None  # Matches; replaces the round count
+    budget_min_rounds: int = 50  # Rounds to keep within a budget
+    curriculum_armies: Tuple[int, ...] = ()  # Reduced army counts trained first
+    curriculum_rounds: Tuple[int, ...] = ()  # Training rounds of each such stage
+    seed: Optional[int] = None
+    _: dataclasses.KW_ONLY
+
+    learning_rate: float = 0.05  # Lower learning rate for stability
+    discount_factor: float = 0.95  # Higher discount factor to value future rewards more
+    epsilon: float = 0.3  # Higher initial epsilon for more exploration
+    epsilon_decay: float = 0.9995  # Slower decay to maintain exploration longer
+    reinforced_training_games: Optional[int] = None  # None: num_training_rounds
+    reinforced_win_reward: int = 100
+    reinforced_lose_penalty: int = 50
+    approximate_model: str = "linear"  # Q-function of approximate players, or "mlp"
+    approximate_hidden_units: int = 32
+    approximate_learning_rate: float = 0.3
+    approximate_batch_size: int = 16  # Games per batched Q-function update
+
+    population_players: Tuple[str, ...] = ("genetic", "cmaes")
+    mutation_std_dev: float = 0.1
+    point_mutation_rate: float = 0.01  # Low rate for subtle changes
+    swap_probability: float = 0.05  # Occasional swaps for diversity
+    mutation_operators: Tuple[str, ...] = ("gaussian", "swap")  # Applied in order
+    crossover_operator: str = "single_point"  # or "uniform", "blend"
+    dirichlet_probability: float = 0.05  # Chance of a Dirichlet resample
+    dirichlet_concentration: float = 50.0  # Higher stays closer to the genes
+    diversity_pairwise: bool = False  # Track the mean pairwise gene distance
+    diversity_block_size: int = 256  # Rows per block of pairwise distances
+    fitness_sharing: bool = False  # Divide fitness by the niche count
+    sharing_radius: float = 0.2  # L1 gene distance within which players share
+    sharing_alpha: float = 1.0  # Shape of the sharing function
+    cmaes_sigma: float = 1.0  # Initial CMA-ES step size in logit space
+    rating_fitness: bool = False  # Rank population players by Glicko rating
+    rating_initial_deviation: float = 350.0  # Rating deviation of new players
+    rating_min_deviation: float = 30.0  # Keeps old players' ratings moving
+    rating_confidence: float = 1.0  # Deviations below the mean used to rank
+    population_size: int = 1000
+    self_play: bool = False  # One population plays itself (same type both sides)
+    matchmaking: str = "sequential"  # or "random", "stratified", "k_opponents"
+    matchmaking_opponents: int = 4  # Matches per player with "k_opponents"
+    kernel_backend: str = "auto"  # "auto", "numpy" or "numba"
+    sample_bank_size: int = 32  # Allocations pre-drawn per chromosome
+
+    convergence_window: int = 20  # Rounds per fitness comparison window
+    convergence_tolerance: float = 0.5  # Minimal fitness gain per window
+    diversity_threshold: float = 1e-5  # Gene variance below which we collapsed
+    baseline_eval_interval: int = 10  # Rounds between baseline evaluations
+    baseline_eval_matches: int = 200
+    convergence_action: str = "stop"  # "stop" or "adapt"
+    mutation_boost: float = 2.0  # Mutation multiplier when adapting
+    max_adaptations: int = 3  # Stop after this many boosts
+
+    racing: bool = False  # Race fitness evaluation of population players
+    racing_initial_matches: int = 4  # Matches per individual in stage one
+    racing_stages: int = 3  # Successive-halving stages after stage one
+    racing_confidence: float = 0.05  # Hoeffding failure probability
+    racing_max_matches: int = 64  # Upper bound of matches per individual
+    racing_opponent_samples: int = 1024  # Pre-sampled opponent allocations
+
+    distributed_address: Optional[str] = None  # "host:port" or "unix:path"
+    distributed_matches: int = 16  # Matches per individual on the workers
+    distributed_opponent_samples: int = 1024  # Opponent allocations per shard
+    distributed_shard_size: int = 128  # Individuals per worker task
+    distributed_timeout: float = 60.0  # Seconds before a shard is reassigned
+
+    hall_of_fame_size: int = 0  # Archived best players per side, 0 disables
+    hall_of_fame_fraction: float = 0.2  # Share of matches against the archive
+    hall_of_fame_min_distance: float = 0.05  # L1 gene distance for duplicates
+    hall_of_fame_bank_size: int = 64  # Pre-sampled allocations per member
+
+    equilibrium_strategies: int = 400  # Allocations in the strategy set
+    equilibrium_iterations: int = 2000
+    equilibrium_method: str = "regret_matching"  # or "fictitious_play"
+    equilibrium_chunk_size: int = 100000  # Games scored per batch
+    simulator_chunk_size: int = 16384  # Matches simulated per chunk
+    simulator_policy_samples: int = 256  # Allocations drawn from stateful policies
+    serving_bank_size: int = 4096  # Allocations pre-sampled per compiled policy
+    exploitability_interval: int = 0  # Rounds between checks, 0 disables
+
+    warm_start_elites: Optional[str] = None  # .npz of genes to seed populations
+    warm_start_qmatrix: Optional[str] = None  # .npy Q-matrix for reinforced players
+    warm_start_fraction: float = 1.0  # Share of a population seeded from elites
+    warm_start_noise: float = 0.05  # Gene noise std dev of seeded copies
+    mmap_threshold: int = 64 * 1024 * 1024  # Bytes above which Q-matrices are mmapped
+    checkpoint_dir: Optional[str] = None  # Where training saves the best players
+    checkpoint_interval: float = 60.0  # Seconds between checkpoints while training
+
+    match_log_path: Optional[str] = None  # File to append every training match to
+    match_log_chunk_size: int = 65536  # Matches buffered per disk write
+
+    offline_buffer_size: int = 65536  # Logged matches per replay buffer
+    offline_minibatch_size: int = 256  # Trajectories per Q-update
+    offline_sampling: str = "uniform"  # "uniform" or "sequential"
+    offline_sides: str = "both"  # Learn from "left", "right" or "both"
+    offline_checkpoint_interval: int = 1000  # Minibatches between saves
+
+    points_per_castle: Dict[int, int] = dataclasses.field(
+        init=False, compare=False, repr=False
+    )
+    random_generator: np.random.Generator = dataclasses.field(
+        init=False, compare=False, repr=False
+    )
+
+    def __post_init__(self):
+        for field in dataclasses.fields(self):
+            if field.init:
+                value = getattr(self, field.name)
+                # Sequences are stored as tuples, so configs stay hashable
+                if isinstance(value, list):
+                    object.__setattr__(self, field.name, tuple(value))
+        object.__setattr__(
+            self,
+            "points_per_castle",
+            {i + 1: i + 1 for i in range(self.num_castles)},
+        )
+        object.__setattr__(self, "random_generator", np.random.default_rng(self.seed))
+
+    @classmethod
+    def from_dict(cls, values) -> "Config":
+        """
+        Build a config from a dict of field values, parsing strings.
+
+        Raises:
+            ValueError: If a key is not a config field or a value is invalid.
+        """
+        hints = typing.get_type_hints(cls)
+        names = {field.name for field in dataclasses.fields(cls) if field.init}
+        unknown = sorted(set(values) - names)
+        if unknown:
+            raise ValueError(f"Unknown config parameter: {', '.join(unknown)}")
+        return cls(
+            **{name: parse_value(hints[name], value) for name, value in values.items()}
         )
-        self.epsilon = 0.3  # Higher initial epsilon for more exploration
-        self.epsilon_decay = 0.9995  # Slower decay to maintain exploration longer
-        self.reinforced_training_games = num_training_rounds
-        self.reinforced_win_reward = 100
-        self.reinforced_lose_penalty = 50
 
-        self.population_players = ["genetic"]
-        self.mutation_std_dev = 0.1
-        self.point_mutation_rate = 0.01  # Low rate for subtle changes
-        self.swap_probability = 0.05  # Occasional swaps for diversity
-        self.population_size = 1000
+    @classmethod
+    def from_file(cls, path) -> "Config":
+        """Load a config from a JSON or YAML file of field values."""
+        return cls.from_dict(read_config_file(path))
+
+    @classmethod
+    def from_env(cls, environ=None, prefix=ENV_PREFIX, base=None) -> "Config":
+        """
+        Apply config values from environment variables on top of `base`
+        (the defaults if not given).
+        """
+        values = base.to_dict() if base is not None else {}
+        return cls.from_dict({**values, **env_values(environ, prefix)})
+
+    def to_dict(self) -> dict:
+        """The field values, with tuples as lists so they serialize to JSON."""
+        return {
+            field.name: (
+                list(getattr(self, field.name))
+                if isinstance(getattr(self, field.name), tuple)
+                else getattr(self, field.name)
+            )
+            for field in dataclasses.fields(self)
+            if field.init
+        }
+
+    def content_hash(self) -> str:
+        """
+        Stable hash of the field values, independent of the Python process,
+        for keying result caches, checkpoints and sweep jobs.
+        """
+        encoded = json.dumps(self.to_dict(), sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def replace(self, **changes) -> "Config":
+        """
+        A copy of the config with the given fields changed.
+
+        Raises:
+            ValueError: If a key is not a config field.
+        """
+        return self.from_dict({**self.to_dict(), **changes})
 
 
 class Game:
@@ -65,6 +308,53 @@ class Game:
         player1_won = player1_score > player2_score
         return player1_won, player1_score, player2_score
 
+    def castle_points(self) -> np.ndarray:
+        """
+        Points of every castle as an array, ordered by castle number, so that
+        column i of an allocation array refers to castle i + 1.
+        """
+        return np.array(
+            [
+                self.config.points_per_castle[castle]
+                for castle in sorted(self.config.points_per_castle)
+            ]
+        )
+
+    def score_allocations(self, allocations1, allocations2):
+        """
+        Score many games at once.
+
+        Args:
+            allocations1 (np.ndarray): Allocations of player 1, shape (games, castles).
+            allocations2 (np.ndarray): Allocations of player 2, shape (games, castles).
+
+        Returns:
+            tuple: Arrays (player1_won, player1_score, player2_score), one entry per game.
+        """
+        kernels = get_kernels(self.config.kernel_backend)
+        player1_score, player2_score = kernels.score_allocations(
+            np.asarray(allocations1), np.asarray(allocations2), self.castle_points()
+        )
+        return player1_score > player2_score, player1_score, player2_score
+
+    def score_rewards(self, player1_won, player1_score, player2_score):
+        """
+        Turn batched game results into training rewards: the winner gets a
+        bonus on top of its score, the loser a penalty.
+
+        Returns:
+            tuple: Arrays (player1_reward, player2_reward).
+        """
+        win_reward = self.config.reinforced_win_reward
+        lose_penalty = self.config.reinforced_lose_penalty
+        player1_reward = np.where(
+            player1_won, player1_score + win_reward, player1_score - lose_penalty
+        )
+        player2_reward = np.where(
+            player1_won, player2_score - lose_penalty, player2_score + win_reward
+        )
+        return player1_reward, player2_reward
+
     def play_game(self, player1, player2):
         distribution1 = player1.sanitize_distribute_armies()
         distribution2 = player2.sanitize_distribute_armies()
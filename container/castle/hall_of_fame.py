@@ -0,0 +1,66 @@
+import numpy as np
+
+
+class HallOfFame:
+    """
+    Bounded archive of past best gene vectors, stored as a ring buffer.
+
+    Archived members never change, so a bank of allocations is drawn for each
+    member when it is added; an archive match then only costs an array lookup.
+    A candidate closer than `config.hall_of_fame_min_distance` (L1 distance) to
+    an archived member is treated as a duplicate and not stored.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        capacity = config.hall_of_fame_size
+        self.genes = np.zeros((capacity, config.num_castles))
+        self.allocations = np.zeros(
+            (capacity, config.hall_of_fame_bank_size, config.num_castles), dtype=int
+        )
+        self.count = 0
+        self.position = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, genes) -> bool:
+        """
+        Archive a gene vector, overwriting the oldest member when full.
+
+        Args:
+            genes (np.ndarray): Normalized genes of the player to archive.
+
+        Returns:
+            bool: False if the genes were a near-duplicate and not stored.
+        """
+        genes = np.asarray(genes, dtype=float)
+        if self.count > 0:
+            distances = np.abs(self.genes[: self.count] - genes).sum(axis=1)
+            if distances.min() < self.config.hall_of_fame_min_distance:
+                return False
+
+        self.genes[self.position] = genes
+        self.allocations[self.position] = self.config.random_generator.multinomial(
+            self.config.armies_per_player,
+            genes,
+            size=self.config.hall_of_fame_bank_size,
+        )
+        self.position = (self.position + 1) % len(self.genes)
+        self.count = min(self.count + 1, len(self.genes))
+        return True
+
+    def sample_allocations(self, count: int) -> np.ndarray:
+        """
+        Draw allocations of uniformly chosen archive members.
+
+        Returns:
+            np.ndarray: Array of shape (count, num_castles).
+        """
+        if self.count == 0:
+            raise ValueError("Cannot sample from an empty hall of fame")
+        members = self.config.random_generator.integers(self.count, size=count)
+        rows = self.config.random_generator.integers(
+            self.config.hall_of_fame_bank_size, size=count
+        )
+        return self.allocations[members, rows]
@@ -0,0 +1,155 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+
+BACKENDS = ("auto", "numpy", "numba")
+
+
+class Kernels:
+    """
+    The hot loops of the game and the reinforcement player for one backend.
+
+    Every kernel has a pure NumPy implementation. When Numba is installed, the
+    "numba" backend JIT-compiles explicit loops with the same semantics. Kernels
+    take their random draws as arguments, so both backends give identical
+    results for the same draws.
+    """
+
+    def __init__(self, name, epsilon_greedy_allocation, q_update, score_allocations):
+        self.name = name
+        self.epsilon_greedy_allocation = epsilon_greedy_allocation
+        self.q_update = q_update
+        self.score_allocations = score_allocations
+
+
+def numpy_epsilon_greedy_allocation(qmatrix, explore, random_castles):
+    """
+    Place armies one at a time, exploring or exploiting the Q-matrix.
+
+    The greedy choice only depends on the number of armies left, so all steps
+    are evaluated at once.
+
+    Args:
+        qmatrix (np.ndarray): Q-values of shape (armies + 1, castles).
+        explore (np.ndarray): Per step, whether to pick a random castle.
+        random_castles (np.ndarray): Per step, the (0-based) random castle.
+
+    Returns:
+        tuple: (allocation per castle, 0-based castle chosen at each step).
+    """
+    armies_left = np.arange(len(explore), 0, -1)
+    greedy = np.argmax(qmatrix[armies_left], axis=1)
+    castles = np.where(explore, random_castles, greedy)
+    return np.bincount(castles, minlength=qmatrix.shape[1]), castles
+
+
+def numpy_q_update(
+    qmatrix, armies_left, castles, reward, learning_rate, discount_factor
+):
+    """
+    Q-learning update of one trajectory, from the last action to the first,
+    in place. Each action bootstraps from the (already updated) row of the
+    action that followed it, so the steps are inherently sequential.
+    """
+    num_actions = len(castles)
+    for step in range(num_actions - 1, -1, -1):
+        current_q = qmatrix[armies_left[step], castles[step]]
+        if step == num_actions - 1:
+            next_max_q = 0.0
+        else:
+            next_max_q = np.max(qmatrix[armies_left[step + 1]])
+        new_q = current_q + learning_rate * (
+            reward + discount_factor * next_max_q - current_q
+        )
+        qmatrix[armies_left[step], castles[step]] = max(0.0, new_q)
+
+
+def numpy_score_allocations(allocations1, allocations2, points):
+    """
+    Scores of many games, see Game.score_allocations.
+
+    Returns:
+        tuple: (player1_score, player2_score) arrays.
+    """
+    player1_score = (allocations1 > allocations2) @ points
+    player2_score = (allocations2 > allocations1) @ points
+    return player1_score, player2_score
+
+
+NUMPY_KERNELS = Kernels(
+    "numpy", numpy_epsilon_greedy_allocation, numpy_q_update, numpy_score_allocations
+)
+
+
+def build_numba_kernels():
+    @numba.njit
+    def epsilon_greedy_allocation(qmatrix, explore, random_castles):
+        num_armies = explore.shape[0]
+        allocation = np.zeros(qmatrix.shape[1], dtype=np.int64)
+        castles = np.empty(num_armies, dtype=np.int64)
+        for step in range(num_armies):
+            if explore[step]:
+                castle = random_castles[step]
+            else:
+                castle = np.argmax(qmatrix[num_armies - step])
+            allocation[castle] += 1
+            castles[step] = castle
+        return allocation, castles
+
+    @numba.njit
+    def q_update(qmatrix, armies_left, castles, reward, learning_rate, discount_factor):
+        num_actions = castles.shape[0]
+        for step in range(num_actions - 1, -1, -1):
+            current_q = qmatrix[armies_left[step], castles[step]]
+            if step == num_actions - 1:
+                next_max_q = 0.0
+            else:
+                next_max_q = np.max(qmatrix[armies_left[step + 1]])
+            new_q = current_q + learning_rate * (
+                reward + discount_factor * next_max_q - current_q
+            )
+            qmatrix[armies_left[step], castles[step]] = max(0.0, new_q)
+
+    @numba.njit
+    def score_allocations(allocations1, allocations2, points):
+        num_games, num_castles = allocations1.shape
+        player1_score = np.zeros(num_games, dtype=points.dtype)
+        player2_score = np.zeros(num_games, dtype=points.dtype)
+        for game in range(num_games):
+            for castle in range(num_castles):
+                if allocations1[game, castle] > allocations2[game, castle]:
+                    player1_score[game] += points[castle]
+                elif allocations2[game, castle] > allocations1[game, castle]:
+                    player2_score[game] += points[castle]
+        return player1_score, player2_score
+
+    return Kernels("numba", epsilon_greedy_allocation, q_update, score_allocations)
+
+
+_kernels = {"numpy": NUMPY_KERNELS}
+
+
+def available_backends():
+    """Names of the backends that can be used in this environment."""
+    return ["numpy", "numba"] if numba is not None else ["numpy"]
+
+
+def get_kernels(backend="auto") -> Kernels:
+    """
+    Return the kernels of the requested backend.
+
+    Raises:
+        ValueError: If the backend is unknown or not installed.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Invalid kernel backend: {backend}")
+    if backend == "auto":
+        backend = "numba" if numba is not None else "numpy"
+    if backend == "numba" and numba is None:
+        raise ValueError("The numba kernel backend requires numba to be installed")
+    if backend not in _kernels:
+        _kernels[backend] = build_numba_kernels()
+    return _kernels[backend]
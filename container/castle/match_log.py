@@ -0,0 +1,171 @@
+import json
+import os
+import numpy as np
+
+MATCH_LOG_VERSION = 1
+
+
+def record_dtype(num_castles):
+    """Fixed-width record of one match."""
+    return np.dtype(
+        [
+            ("round", "<i4"),
+            ("left_id", "<i8"),
+            ("right_id", "<i8"),
+            ("left_allocation", "<i4", (num_castles,)),
+            ("right_allocation", "<i4", (num_castles,)),
+            ("left_score", "<i4"),
+            ("right_score", "<i4"),
+            ("left_reward", "<f4"),
+            ("right_reward", "<f4"),
+        ]
+    )
+
+
+def metadata_path(path):
+    return f"{path}.json"
+
+
+class MatchLogWriter:
+    """
+    Append-only log of matches.
+
+    Records are collected in a fixed-size in-memory buffer and appended to the
+    log file one full chunk at a time, so logging a match costs one row
+    assignment. The number of castles and, if given, of armies per player are
+    stored in a JSON sidecar file next to the log; appending to an existing
+    log requires the same numbers.
+    """
+
+    def __init__(self, path, num_castles, chunk_size=65536, armies_per_player=None):
+        self.path = path
+        self.dtype = record_dtype(num_castles)
+        meta_path = metadata_path(path)
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                metadata = json.load(meta_file)
+            if metadata["num_castles"] != num_castles:
+                raise ValueError(
+                    f"Match log {path} has {metadata['num_castles']} castles, "
+                    f"not {num_castles}"
+                )
+            logged_armies = metadata.get("armies_per_player")
+            if None not in (logged_armies, armies_per_player) and (
+                logged_armies != armies_per_player
+            ):
+                raise ValueError(
+                    f"Match log {path} has {logged_armies} armies per player, "
+                    f"not {armies_per_player}"
+                )
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            metadata = {"version": MATCH_LOG_VERSION, "num_castles": num_castles}
+            if armies_per_player is not None:
+                metadata["armies_per_player"] = armies_per_player
+            with open(meta_path, "w") as meta_file:
+                json.dump(metadata, meta_file)
+        self.buffer = np.zeros(chunk_size, dtype=self.dtype)
+        self.size = 0
+        self.file = open(path, "ab")
+
+    def append(
+        self,
+        round_number,
+        left_id,
+        right_id,
+        left_allocation,
+        right_allocation,
+        left_score,
+        right_score,
+        left_reward,
+        right_reward,
+    ):
+        """Log a single match."""
+        self.buffer[self.size] = (
+            round_number,
+            left_id,
+            right_id,
+            left_allocation,
+            right_allocation,
+            left_score,
+            right_score,
+            left_reward,
+            right_reward,
+        )
+        self.size += 1
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def append_batch(self, **columns):
+        """
+        Log many matches at once.
+
+        Args:
+            **columns: One array (or scalar) per record field, e.g.
+                round=3, left_allocation=array of shape (matches, castles).
+        """
+        count = len(columns["left_allocation"])
+        records = np.zeros(count, dtype=self.dtype)
+        for name, values in columns.items():
+            records[name] = values
+        if self.size + count > len(self.buffer):
+            self.flush()
+        if count >= len(self.buffer):
+            self.file.write(records.tobytes())
+            return
+        self.buffer[self.size : self.size + count] = records
+        self.size += count
+
+    def flush(self):
+        """Write the buffered records to disk."""
+        if self.size > 0:
+            self.file.write(self.buffer[: self.size].tobytes())
+            self.size = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MatchLogReader:
+    """
+    Lazy reader of a match log.
+
+    The log is memory-mapped, so only the pages of the batches actually used
+    are read from disk; logs far larger than RAM can be streamed.
+    """
+
+    def __init__(self, path):
+        with open(metadata_path(path)) as meta_file:
+            metadata = json.load(meta_file)
+        self.num_castles = metadata["num_castles"]
+        # None for logs written without it
+        self.armies_per_player = metadata.get("armies_per_player")
+        self.dtype = record_dtype(self.num_castles)
+        if os.path.getsize(path) == 0:
+            self.records = np.zeros(0, dtype=self.dtype)
+        else:
+            self.records = np.memmap(path, dtype=self.dtype, mode="r")
+
+    def __len__(self):
+        return len(self.records)
+
+    def iter_batches(self, batch_size=65536, start=0, stop=None):
+        """
+        Yield consecutive batches of records as read-only views.
+
+        Args:
+            batch_size (int): Number of records per batch.
+            start (int): Index of the first record.
+            stop (int): Index after the last record, defaults to the end.
+        """
+        stop = len(self.records) if stop is None else min(stop, len(self.records))
+        for batch_start in range(start, stop, batch_size):
+            yield self.records[batch_start : min(batch_start + batch_size, stop)]
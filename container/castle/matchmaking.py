@@ -0,0 +1,157 @@
+import numpy as np
+
+# Strategies of `schedule_matches`. The trainer's default, "sequential", is not
+# one of them: it pairs the shuffled populations and plays match by match.
+MATCHMAKING_STRATEGIES = ("random", "stratified", "k_opponents")
+
+
+def schedule_matches(
+    strategy,
+    left_size,
+    right_size,
+    rng,
+    left_fitness=None,
+    right_fitness=None,
+    opponents=1,
+):
+    """
+    Pairings of a whole round as index arrays into the two populations.
+
+    Every player of the larger side plays `opponents` matches ("k_opponents")
+    or one match (the other strategies); the matches of the smaller side are
+    spread over its players as evenly as possible.
+
+    - "random": The larger side in random order meets the smaller side in
+      random order, repeated as often as needed.
+    - "stratified": Both sides are ranked by fitness and players meet
+      opponents of the same rank quantile, best against best. Ties are
+      ranked randomly.
+    - "k_opponents": As "random", for `opponents` rounds, each shifting the
+      smaller side by one place, so a player meets distinct opponents as
+      long as the smaller side has enough of them.
+
+    Args:
+        strategy (str): One of `MATCHMAKING_STRATEGIES`.
+        left_size (int): Players of the left population.
+        right_size (int): Players of the right population.
+        rng (np.random.Generator): Generator for the random orders.
+        left_fitness (np.ndarray): Fitness of every left player, required by
+            "stratified".
+        right_fitness (np.ndarray): Fitness of every right player, required by
+            "stratified".
+        opponents (int): Matches per player of the larger side with
+            "k_opponents".
+
+    Returns:
+        tuple: (left_indices, right_indices) integer arrays, one entry per
+        match.
+
+    Raises:
+        ValueError: For an unknown strategy, missing fitness values or fewer
+            than one opponent.
+    """
+    larger_is_left = left_size >= right_size
+    larger, smaller = (
+        (left_size, right_size) if larger_is_left else (right_size, left_size)
+    )
+    if strategy in ("random", "k_opponents"):
+        rounds = opponents if strategy == "k_opponents" else 1
+        if rounds < 1:
+            raise ValueError("k_opponents matchmaking needs at least one opponent")
+        larger_order = rng.permutation(larger)
+        smaller_order = rng.permutation(smaller)
+        positions = np.arange(larger)
+        larger_indices = np.tile(larger_order, rounds)
+        smaller_indices = smaller_order[
+            (positions[None, :] + np.arange(rounds)[:, None]).ravel() % smaller
+        ]
+    elif strategy == "stratified":
+        if left_fitness is None or right_fitness is None:
+            raise ValueError("Stratified matchmaking needs the fitness of both sides")
+        larger_fitness, smaller_fitness = (
+            (left_fitness, right_fitness)
+            if larger_is_left
+            else (right_fitness, left_fitness)
+        )
+        larger_indices = rank_players(larger_fitness, rng)
+        smaller_ranking = rank_players(smaller_fitness, rng)
+        smaller_indices = smaller_ranking[np.arange(larger) * smaller // larger]
+    else:
+        raise ValueError(f"Invalid matchmaking strategy: {strategy}")
+    if larger_is_left:
+        return larger_indices, smaller_indices
+    return smaller_indices, larger_indices
+
+
+def rank_players(fitness, rng) -> np.ndarray:
+    """Indices of the players from the fittest down, ties in random order."""
+    fitness = np.asarray(fitness, dtype=float)
+    shuffled = rng.permutation(len(fitness))
+    return shuffled[np.argsort(-fitness[shuffled], kind="stable")]
+
+
+def player_rows(indices):
+    """
+    Yield (player index, rows) of the matches of every scheduled player, in
+    the same order on every call for the same indices.
+    """
+    order = np.argsort(indices, kind="stable")
+    players, starts = np.unique(indices[order], return_index=True)
+    for player, rows in zip(players, np.split(order, starts[1:])):
+        yield player, rows
+
+
+def sample_scheduled(players, indices, num_castles):
+    """
+    Allocations of the scheduled matches of one side, drawn with a single
+    `sample_allocations` call per player.
+
+    Returns:
+        np.ndarray: Allocations of shape (len(indices), num_castles).
+    """
+    allocations = np.zeros((len(indices), num_castles), dtype=int)
+    for player, rows in player_rows(indices):
+        allocations[rows] = players[player].sample_allocations(len(rows))
+    return allocations
+
+
+def update_scheduled(players, indices, allocations, rewards, training_progress):
+    """
+    Hand every player of one side the allocations and rewards of all its
+    scheduled matches in a single `update_batch` call.
+    """
+    for player, rows in player_rows(indices):
+        players[player].update_batch(
+            allocations[rows], rewards[rows], training_progress=training_progress
+        )
+
+
+def index_players(players):
+    """
+    The distinct players of a list of players, by identity, and the index of
+    every entry among them.
+
+    Returns:
+        tuple: (distinct players, index array of the entries).
+    """
+    rows = {}
+    distinct = []
+    for player in players:
+        if id(player) not in rows:
+            rows[id(player)] = len(distinct)
+            distinct.append(player)
+    return distinct, np.array([rows[id(player)] for player in players], dtype=int)
+
+
+def combine_results(results):
+    """
+    One (player, mean reward) entry per distinct player of a round's
+    (player, reward) results, in the order the players first appear. With
+    several matches per player, selection and diversity statistics then see
+    every player once.
+    """
+    players, indices = index_players([player for player, _ in results])
+    rewards = np.array([reward for _, reward in results], dtype=float)
+    sums = np.bincount(indices, weights=rewards, minlength=len(players))
+    counts = np.bincount(indices, minlength=len(players))
+    return list(zip(players, sums / np.maximum(counts, 1)))
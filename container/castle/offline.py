@@ -0,0 +1,137 @@
+import math
+import numpy as np
+from castle.checkpoint import save_qmatrix
+from players.reinforcement import (
+    DISCOUNT_FACTOR,
+    ReinforcedPlayer,
+    allocations_to_trajectories,
+    batch_q_update,
+    normalize_rewards,
+)
+
+
+class OfflineTrainer:
+    """
+    Trains a ReinforcedPlayer from a recorded match log instead of live games.
+
+    The log is streamed in replay buffers of `config.offline_buffer_size`
+    matches. Each buffer is replayed in minibatches of
+    `config.offline_minibatch_size` trajectories, drawn uniformly with
+    replacement ("uniform") or in log order ("sequential"). Every minibatch is
+    applied as one vectorized Q-update.
+    """
+
+    def __init__(self, config, reader, player=None):
+        if reader.num_castles != config.num_castles:
+            raise ValueError(
+                f"Match log has {reader.num_castles} castles, "
+                f"config has {config.num_castles}"
+            )
+        if reader.armies_per_player not in (None, config.armies_per_player):
+            raise ValueError(
+                f"Match log has {reader.armies_per_player} armies per player, "
+                f"config has {config.armies_per_player}"
+            )
+        self.config = config
+        self.reader = reader
+        self.player = player if player is not None else ReinforcedPlayer(config)
+        self.updates = 0
+
+    def experience(self, records):
+        """
+        Allocations and rewards of the configured sides of the given matches.
+        Allocations that do not use exactly `armies_per_player` armies (e.g.
+        from a differently sized game) are skipped.
+
+        Returns:
+            tuple: (allocations, rewards) arrays.
+        """
+        sides = self.config.offline_sides
+        if sides not in ("left", "right", "both"):
+            raise ValueError(f"Invalid offline sides: {sides}")
+        allocations = []
+        rewards = []
+        if sides in ("left", "both"):
+            allocations.append(records["left_allocation"])
+            rewards.append(records["left_reward"])
+        if sides in ("right", "both"):
+            allocations.append(records["right_allocation"])
+            rewards.append(records["right_reward"])
+        allocations = np.concatenate(allocations)
+        rewards = np.concatenate(rewards)
+        valid = allocations.sum(axis=1) == self.config.armies_per_player
+        return allocations[valid], rewards[valid]
+
+    def minibatches(self, allocations):
+        """Yield index arrays of the minibatches to replay from a buffer."""
+        size = self.config.offline_minibatch_size
+        count = math.ceil(len(allocations) / size)
+        if self.config.offline_sampling == "uniform":
+            for _ in range(count):
+                yield self.config.random_generator.integers(len(allocations), size=size)
+        elif self.config.offline_sampling == "sequential":
+            for start in range(0, len(allocations), size):
+                yield np.arange(start, min(start + size, len(allocations)))
+        else:
+            raise ValueError(
+                f"Invalid offline sampling: {self.config.offline_sampling}"
+            )
+
+    def train(self, epochs=1, checkpoint_path=None):
+        """
+        Replay the whole log `epochs` times.
+
+        Args:
+            epochs (int): Number of passes over the log.
+            checkpoint_path (str): If given, the Q-matrix is saved here every
+                `config.offline_checkpoint_interval` minibatches and at the end.
+
+        Returns:
+            ReinforcedPlayer: The trained player.
+
+        Raises:
+            ValueError: If no logged allocation of the configured sides uses
+                `config.armies_per_player` armies.
+        """
+        qmatrix = self.player.get_qmatrix()
+        for epoch in range(epochs):
+            experience = 0
+            for records in self.reader.iter_batches(self.config.offline_buffer_size):
+                allocations, rewards = self.experience(records)
+                experience += len(allocations)
+                if len(allocations) == 0:
+                    continue
+                rewards = normalize_rewards(rewards, self.config)
+                for indices in self.minibatches(allocations):
+                    armies_left, castles = allocations_to_trajectories(
+                        allocations[indices], self.config.random_generator
+                    )
+                    batch_q_update(
+                        qmatrix,
+                        armies_left,
+                        castles,
+                        rewards[indices],
+                        self.config.learning_rate,
+                        DISCOUNT_FACTOR,
+                    )
+                    self.updates += 1
+                    if (
+                        checkpoint_path is not None
+                        and self.updates % self.config.offline_checkpoint_interval == 0
+                    ):
+                        save_qmatrix(checkpoint_path, qmatrix)
+            if experience == 0:
+                raise ValueError(
+                    f"None of the {len(self.reader)} logged matches has "
+                    f"{self.config.armies_per_player} armies per player on the "
+                    f"configured sides"
+                )
+            print(
+                f"\rEpoch {epoch + 1}/{epochs} - {self.updates} minibatch updates",
+                end="",
+                flush=True,
+            )
+        print()
+        if checkpoint_path is not None:
+            save_qmatrix(checkpoint_path, qmatrix)
+        return self.player
@@ -0,0 +1,117 @@
+import math
+import numpy as np
+
+
+class RacingEvaluator:
+    """
+    Estimates the fitness of a population with an adaptive number of matches.
+
+    Every individual first plays a few matches against sampled opponents. After
+    each stage, only the individuals whose Hoeffding-style confidence interval
+    still contains the selection boundary (the score between the last elite and
+    the first non-elite) keep racing, with a doubled number of matches per stage
+    (successive halving). The interval uses the pooled empirical reward spread
+    rather than the worst-case reward range, which would keep every individual
+    racing for many stages. Clear winners and clear losers are settled early, so
+    the matches are spent where they change the selection.
+    """
+
+    def __init__(self, config, game):
+        self.config = config
+        self.game = game
+
+    def sample_opponents(self, opponents):
+        """
+        Pre-sample a bank of opponent allocations.
+
+        Returns:
+            np.ndarray: Allocations of shape (samples, num_castles).
+        """
+        per_opponent = math.ceil(self.config.racing_opponent_samples / len(opponents))
+        return np.concatenate(
+            [opponent.sample_allocations(per_opponent) for opponent in opponents]
+        )
+
+    def play_matches(self, population, indices, matches, opponent_bank, left_side):
+        """
+        Play `matches` games for each of the given individuals.
+
+        Returns:
+            tuple: Arrays of reward sums and squared reward sums, shape (len(indices),).
+        """
+        allocations = np.concatenate(
+            [population[i].sample_allocations(matches) for i in indices]
+        )
+        opponent_rows = self.config.random_generator.integers(
+            len(opponent_bank), size=len(allocations)
+        )
+        opponent_allocations = opponent_bank[opponent_rows]
+        if left_side:
+            rewards, _ = self.game.score_rewards(
+                *self.game.score_allocations(allocations, opponent_allocations)
+            )
+        else:
+            # The right player is player 2 and wins ties, as in Game.calculate_score
+            _, rewards = self.game.score_rewards(
+                *self.game.score_allocations(opponent_allocations, allocations)
+            )
+        rewards = rewards.reshape(len(indices), matches)
+        return rewards.sum(axis=1), (rewards**2).sum(axis=1)
+
+    def evaluate(
+        self, population, opponents, survivors, left_side=True, max_matches=None
+    ):
+        """
+        Race the population against the given opponents.
+
+        Args:
+            population (list): Players whose fitness is estimated.
+            opponents (list): Players to sample opposing allocations from.
+            survivors (int): Number of individuals that will be selected; the
+                boundary between rank `survivors` and `survivors + 1` is raced.
+            left_side (bool): Whether the population plays as player 1.
+            max_matches (int): Upper bound of matches per individual, by
+                default `config.racing_max_matches`.
+
+        Returns:
+            tuple: (mean_rewards, match_counts) arrays, one entry per individual.
+        """
+        size = len(population)
+        survivors = min(max(1, survivors), size)
+        opponent_bank = self.sample_opponents(opponents)
+        sums = np.zeros(size)
+        squares = np.zeros(size)
+        counts = np.zeros(size, dtype=int)
+        width = math.sqrt(2 * math.log(2 / self.config.racing_confidence))
+
+        if max_matches is None:
+            max_matches = self.config.racing_max_matches
+        active = np.arange(size)
+        matches = min(self.config.racing_initial_matches, max_matches)
+        for _ in range(self.config.racing_stages + 1):
+            stage_sums, stage_squares = self.play_matches(
+                population, active, matches, opponent_bank, left_side
+            )
+            sums[active] += stage_sums
+            squares[active] += stage_squares
+            counts[active] += matches
+            means = sums / counts
+            if survivors == size:
+                break
+
+            spread = math.sqrt(
+                max(squares.sum() / counts.sum() - (sums.sum() / counts.sum()) ** 2, 0)
+            )
+            ranked = np.sort(means)[::-1]
+            boundary = (ranked[survivors - 1] + ranked[survivors]) / 2
+            radius = width * spread / np.sqrt(counts)
+            undecided = np.abs(means - boundary) <= radius
+            undecided &= counts < max_matches
+            active = np.flatnonzero(undecided)
+            if active.size == 0:
+                break
+            matches = min(2 * matches, max_matches - counts[active].max())
+            if matches <= 0:
+                break
+
+        return sums / counts, counts
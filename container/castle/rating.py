@@ -0,0 +1,78 @@
+import numpy as np
+
+# Mean rating of a new player, on the usual Elo/Glicko scale
+INITIAL_RATING = 1500.0
+# Glicko's scale factor, ln(10) / 400
+SCALE = np.log(10) / 400
+
+
+def initial_rating(config) -> np.ndarray:
+    """The [mean, variance] rating of a player without matches."""
+    return np.array([INITIAL_RATING, config.rating_initial_deviation**2])
+
+
+def rating_score(rating, config) -> float:
+    """
+    Conservative estimate of a player's strength used for selection: the
+    rating mean minus `config.rating_confidence` standard deviations, so
+    players with few matches do not outrank well-established ones by luck.
+    """
+    return float(rating[0] - config.rating_confidence * np.sqrt(rating[1]))
+
+
+def attenuation(variances) -> np.ndarray:
+    """Glicko's g: how much an opponent's uncertain rating dampens a result."""
+    return 1 / np.sqrt(1 + 3 * SCALE**2 * variances / np.pi**2)
+
+
+def expected_scores(means, opponent_means, opponent_variances) -> np.ndarray:
+    """Expected score of each player against its opponent."""
+    g = attenuation(opponent_variances)
+    return 1 / (1 + 10 ** (-g * (means - opponent_means) / 400))
+
+
+def glicko_update(ratings, first, second, outcomes, min_variance=0.0) -> np.ndarray:
+    """
+    One Glicko rating period over a batch of matches, for all players at
+    once. Every match contributes a constant number of terms, which are
+    summed per player with `np.bincount`; all expectations use the ratings
+    from before the batch.
+
+    Args:
+        ratings (np.ndarray): [mean, variance] per player, shape (players, 2).
+        first (np.ndarray): Row of the first player of each match.
+        second (np.ndarray): Row of the second player of each match.
+        outcomes (np.ndarray): Score of the first player of each match: 1
+            for a win, 0.5 for a draw and 0 for a loss.
+        min_variance (float): Lower bound of the updated variances, so the
+            ratings of long-lived players keep following their results.
+
+    Returns:
+        np.ndarray: The updated ratings, shape (players, 2). Players without
+        a match keep their rating.
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    outcomes = np.asarray(outcomes, dtype=float)
+    players = np.concatenate([first, second])
+    opponents = np.concatenate([second, first])
+    scores = np.concatenate([outcomes, 1 - outcomes])
+    means, variances = ratings[:, 0], ratings[:, 1]
+
+    g = attenuation(variances[opponents])
+    expected = expected_scores(means[players], means[opponents], variances[opponents])
+    size = len(ratings)
+    information = SCALE**2 * np.bincount(
+        players, weights=g**2 * expected * (1 - expected), minlength=size
+    )
+    gradient = SCALE * np.bincount(
+        players, weights=g * (scores - expected), minlength=size
+    )
+    precision = 1 / variances + information
+
+    updated = np.empty_like(ratings)
+    updated[:, 0] = means + gradient / precision
+    updated[:, 1] = np.maximum(1 / precision, min_variance)
+    # Players without a match keep their variance, even below the floor
+    unrated = information == 0
+    updated[unrated, 1] = variances[unrated]
+    return updated
@@ -0,0 +1,277 @@
+import asyncio
+import os
+import socket
+import struct
+import time
+import numpy as np
+from players.genetic import GeneticPlayer
+from players.reinforcement import ReinforcedPlayer
+from castle.checkpoint import atomic_save
+from castle.distributed import parse_address
+
+# Wire format of the policy server. A request is a header (policy name
+# length, number of allocations) followed by the UTF-8 policy name. A
+# response is a header (status, rows, castles) followed by rows * castles
+# little-endian int32 army counts.
+REQUEST = struct.Struct("<HI")
+RESPONSE = struct.Struct("<BII")
+ALLOCATION_DTYPE = np.dtype("<i4")
+
+OK = 0
+UNKNOWN_POLICY = 1
+INVALID_COUNT = 2
+
+
+class CompiledPolicy:
+    """
+    A trained strategy reduced to what serving needs: a bank of allocations
+    served in order, wrapping around at its end, so a request costs one
+    array take and no Python objects per allocation.
+
+    A genetic policy keeps its normalized gene vector and a bank sampled
+    from it. A reinforced policy keeps its greedy action table, the castle
+    picked for every number of armies left; the greedy allocation it
+    produces is the bank's only row.
+    """
+
+    __slots__ = ("kind", "bank", "genes", "greedy", "cursor")
+
+    def __init__(self, kind, bank, genes=None, greedy=None):
+        self.kind = kind
+        self.bank = np.ascontiguousarray(bank, dtype=ALLOCATION_DTYPE)
+        self.genes = genes
+        self.greedy = greedy
+        self.cursor = 0
+
+    @property
+    def num_castles(self) -> int:
+        return self.bank.shape[1]
+
+    def allocations(self, count) -> np.ndarray:
+        """
+        The next `count` allocations of the bank.
+
+        Returns:
+            np.ndarray: int32 array of shape (count, castles).
+        """
+        rows = np.arange(self.cursor, self.cursor + count)
+        self.cursor = (self.cursor + count) % len(self.bank)
+        return self.bank.take(rows, axis=0, mode="wrap")
+
+    def distribute_armies(self):
+        """One allocation as the {castle: armies} dict players return."""
+        allocation = self.allocations(1)[0]
+        return {castle: int(armies) for castle, armies in enumerate(allocation, 1)}
+
+
+def compile_policy(player, bank_size=None) -> CompiledPolicy:
+    """
+    Compile a trained player for serving.
+
+    Args:
+        player (GeneticPlayer | ReinforcedPlayer): The trained player.
+        bank_size (int): Allocations pre-sampled from a genetic player, by
+            default `config.serving_bank_size`.
+
+    Raises:
+        ValueError: If the player type cannot be compiled.
+    """
+    config = player.config
+    if isinstance(player, GeneticPlayer):
+        genes = player.chromosome.validated_genes()
+        bank = config.random_generator.multinomial(
+            config.armies_per_player,
+            genes,
+            size=bank_size or config.serving_bank_size,
+        )
+        return CompiledPolicy("genetic", bank, genes=genes)
+    if isinstance(player, ReinforcedPlayer):
+        qmatrix = np.asarray(player.get_qmatrix())
+        armies, castles = qmatrix.shape[0] - 1, qmatrix.shape[1]
+        # greedy[i] is the castle picked with armies - i armies left
+        greedy = np.argmax(qmatrix[np.arange(armies, 0, -1)], axis=1)
+        allocation = np.bincount(greedy, minlength=castles)
+        return CompiledPolicy("reinforced", allocation[None, :], greedy=greedy)
+    raise ValueError(f"Cannot compile a policy for {type(player).__name__}")
+
+
+def save_policy(path, policy):
+    """Atomically save a compiled policy as a .npz file."""
+    arrays = {"kind": np.array(policy.kind), "bank": policy.bank}
+    if policy.genes is not None:
+        arrays["genes"] = policy.genes
+    if policy.greedy is not None:
+        arrays["greedy"] = policy.greedy
+    atomic_save(path, lambda artifact: np.savez(artifact, **arrays))
+
+
+def load_policy(path) -> CompiledPolicy:
+    """Load a policy saved with save_policy."""
+    with np.load(path) as artifact:
+        return CompiledPolicy(
+            str(artifact["kind"]),
+            artifact["bank"],
+            genes=artifact["genes"] if "genes" in artifact else None,
+            greedy=artifact["greedy"] if "greedy" in artifact else None,
+        )
+
+
+class PolicyServer:
+    """
+    Serves allocations of compiled policies over TCP or a Unix socket with
+    asyncio. Every connection can send any number of requests; each request
+    names a policy and the number of allocations wanted.
+    """
+
+    def __init__(self, policies, max_batch=65536):
+        self.policies = dict(policies)
+        self.max_batch = max_batch
+        self.server = None
+        self.path = None
+
+    async def start(self, address):
+        """Start listening on "host:port" or "unix:/path"."""
+        family, sockaddr = parse_address(address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(sockaddr):
+                os.unlink(sockaddr)
+            self.path = sockaddr
+            self.server = await asyncio.start_unix_server(self.handle, sockaddr)
+        else:
+            self.server = await asyncio.start_server(self.handle, *sockaddr)
+        return self.server
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                name_size, count = REQUEST.unpack(
+                    await reader.readexactly(REQUEST.size)
+                )
+                name = (await reader.readexactly(name_size)).decode()
+                policy = self.policies.get(name)
+                if policy is None:
+                    writer.write(RESPONSE.pack(UNKNOWN_POLICY, 0, 0))
+                elif not 0 < count <= self.max_batch:
+                    writer.write(RESPONSE.pack(INVALID_COUNT, 0, 0))
+                else:
+                    allocations = policy.allocations(count)
+                    writer.write(RESPONSE.pack(OK, *allocations.shape))
+                    writer.write(allocations.data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class PolicyClient:
+    """A connection to a PolicyServer."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address) -> "PolicyClient":
+        family, sockaddr = parse_address(address)
+        if family == socket.AF_UNIX:
+            return cls(*await asyncio.open_unix_connection(sockaddr))
+        return cls(*await asyncio.open_connection(*sockaddr))
+
+    async def allocations(self, name, count) -> np.ndarray:
+        """
+        Request `count` allocations of a policy.
+
+        Raises:
+            KeyError: If the server has no policy of that name.
+            ValueError: If the server rejects the count.
+        """
+        encoded = name.encode()
+        self.writer.write(REQUEST.pack(len(encoded), count) + encoded)
+        status, rows, castles = RESPONSE.unpack(
+            await self.reader.readexactly(RESPONSE.size)
+        )
+        if status == UNKNOWN_POLICY:
+            raise KeyError(name)
+        if status != OK:
+            raise ValueError(f"Invalid allocation count: {count}")
+        data = await self.reader.readexactly(rows * castles * ALLOCATION_DTYPE.itemsize)
+        return np.frombuffer(data, ALLOCATION_DTYPE).reshape(rows, castles)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def load_test(address, name, requests, batch_size, concurrency) -> dict:
+    """
+    Send `requests` requests of `batch_size` allocations from `concurrency`
+    concurrent clients and measure the latencies.
+
+    Returns:
+        dict: Requests and allocations per second, and the mean and 99th
+        percentile latency in microseconds.
+    """
+    clients = [await PolicyClient.connect(address) for _ in range(concurrency)]
+    latencies = []
+
+    async def run_client(client, count):
+        for _ in range(count):
+            start = time.perf_counter()
+            await client.allocations(name, batch_size)
+            latencies.append(time.perf_counter() - start)
+
+    shares = [
+        requests // concurrency + (i < requests % concurrency)
+        for i in range(concurrency)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(run_client(client, count) for client, count in zip(clients, shares))
+    )
+    seconds = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+    latencies = np.array(latencies) * 1e6
+    return {
+        "requests_per_second": requests / seconds,
+        "allocations_per_second": requests * batch_size / seconds,
+        "mean_latency_us": float(latencies.mean()),
+        "p99_latency_us": float(np.percentile(latencies, 99)),
+    }
+
+
+def benchmark_serving(
+    policy, address, requests=10000, batch_size=1, concurrency=4
+) -> dict:
+    """
+    Time a compiled policy in process and behind a PolicyServer on
+    `address`, see `load_test`.
+
+    Returns:
+        dict: The `load_test` results plus the in-process cost of a request
+        in microseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(requests):
+        policy.allocations(batch_size)
+    in_process = (time.perf_counter() - start) / requests * 1e6
+
+    async def serve_and_load():
+        server = PolicyServer({"policy": policy}, max_batch=max(batch_size, 1))
+        await server.start(address)
+        try:
+            return await load_test(address, "policy", requests, batch_size, concurrency)
+        finally:
+            await server.close()
+
+    results = asyncio.run(serve_and_load())
+    results["in_process_us_per_request"] = in_process
+    return results
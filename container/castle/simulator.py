@@ -0,0 +1,252 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from castle.game import Game
+from players.player import RandomPlayer
+from players.genetic import GeneticPlayer
+from players.reinforcement import ReinforcedPlayer
+from players.equilibrium import EquilibriumPlayer
+from players.approximate import ApproximatePlayer
+
+
+class MultinomialStrategy:
+    """Draws allocations from a multinomial over castles, like a chromosome."""
+
+    def __init__(self, genes, armies):
+        self.genes = np.asarray(genes, dtype=float) / np.sum(genes)
+        self.armies = armies
+
+    def sample(self, count, rng) -> np.ndarray:
+        return rng.multinomial(self.armies, self.genes, size=count)
+
+
+class FixedStrategy:
+    """Always plays the same allocation."""
+
+    def __init__(self, allocation):
+        self.allocation = np.asarray(allocation)
+
+    def sample(self, count, rng) -> np.ndarray:
+        return np.tile(self.allocation, (count, 1))
+
+
+class MixedStrategy:
+    """Plays one of a set of allocations, drawn with the given weights."""
+
+    def __init__(self, allocations, weights):
+        self.allocations = np.asarray(allocations)
+        self.weights = np.asarray(weights, dtype=float) / np.sum(weights)
+
+    def sample(self, count, rng) -> np.ndarray:
+        return self.allocations[
+            rng.choice(len(self.allocations), size=count, p=self.weights)
+        ]
+
+
+class QPolicyStrategy:
+    """
+    Places armies one at a time epsilon-greedily on a Q-matrix, like a
+    ReinforcedPlayer. The greedy castle only depends on the number of armies
+    left, so all placements of all games are drawn at once.
+    """
+
+    def __init__(self, qmatrix, epsilon):
+        qmatrix = np.asarray(qmatrix)
+        self.num_castles = qmatrix.shape[1]
+        self.armies = qmatrix.shape[0] - 1
+        self.greedy = np.argmax(qmatrix[np.arange(self.armies, 0, -1)], axis=1)
+        self.epsilon = epsilon
+
+    def sample(self, count, rng) -> np.ndarray:
+        explore = rng.random((count, self.armies)) < self.epsilon
+        random_castles = rng.integers(self.num_castles, size=(count, self.armies))
+        castles = np.where(explore, random_castles, self.greedy)
+        entries = np.arange(count)[:, None] * self.num_castles + castles
+        return np.bincount(entries.ravel(), minlength=count * self.num_castles).reshape(
+            count, self.num_castles
+        )
+
+
+class SimulationResult:
+    """
+    Outcome counts of every pairing of two strategy sets. Entry [i, j] of
+    each array refers to strategy i of the first set against strategy j of
+    the second.
+    """
+
+    def __init__(self, shape):
+        self.matches = np.zeros(shape, dtype=np.int64)
+        self.wins = np.zeros(shape, dtype=np.int64)
+        self.ties = np.zeros(shape, dtype=np.int64)
+        self.score1 = np.zeros(shape)
+        self.score2 = np.zeros(shape)
+
+    @property
+    def losses(self) -> np.ndarray:
+        return self.matches - self.wins - self.ties
+
+    @property
+    def win_rate(self) -> np.ndarray:
+        return self.wins / np.maximum(self.matches, 1)
+
+    @property
+    def tie_rate(self) -> np.ndarray:
+        return self.ties / np.maximum(self.matches, 1)
+
+    @property
+    def mean_score1(self) -> np.ndarray:
+        return self.score1 / np.maximum(self.matches, 1)
+
+    @property
+    def mean_score2(self) -> np.ndarray:
+        return self.score2 / np.maximum(self.matches, 1)
+
+    def add(self, other: "SimulationResult"):
+        """Add the counts of another (partial) result in place."""
+        self.matches += other.matches
+        self.wins += other.wins
+        self.ties += other.ties
+        self.score1 += other.score1
+        self.score2 += other.score2
+        return self
+
+
+def sample_grouped(strategies, indices, rng) -> np.ndarray:
+    """Allocations of the given strategy per row, sampled per strategy in bulk."""
+    allocations = None
+    for index in np.unique(indices):
+        rows = np.flatnonzero(indices == index)
+        sampled = strategies[index].sample(len(rows), rng)
+        if allocations is None:
+            allocations = np.empty((len(indices), sampled.shape[1]), dtype=np.int64)
+        allocations[rows] = sampled
+    return allocations
+
+
+def simulate_chunk(config, strategies1, strategies2, num_matches, start, stop, seed):
+    """
+    Play the matches with flat indices [start, stop); match k is game
+    k % num_matches of pairing k // num_matches.
+
+    Returns:
+        SimulationResult: The counts of this chunk only.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (len(strategies1), len(strategies2))
+    pairings = np.arange(start, stop) // num_matches
+    first, second = np.divmod(pairings, shape[1])
+    won, score1, score2 = Game(config).score_allocations(
+        sample_grouped(strategies1, first, rng),
+        sample_grouped(strategies2, second, rng),
+    )
+    size = shape[0] * shape[1]
+
+    def per_pairing(weights=None):
+        return np.bincount(pairings, weights=weights, minlength=size).reshape(shape)
+
+    result = SimulationResult(shape)
+    result.matches[:] = per_pairing()
+    result.wins[:] = per_pairing(won)
+    result.ties[:] = per_pairing(score1 == score2)
+    result.score1[:] = per_pairing(score1)
+    result.score2[:] = per_pairing(score2)
+    return result
+
+
+def simulate(config, strategies1, strategies2, num_matches, workers=None):
+    """
+    Play every strategy of the first set against every strategy of the second
+    `num_matches` times.
+
+    Matches are played in chunks of `config.simulator_chunk_size`, so memory
+    use does not depend on the number of matches. Every chunk has its own
+    seed derived from the config's generator, so the result is the same for
+    any number of workers.
+
+    Args:
+        config (Config): Board, kernel backend and chunk size.
+        strategies1 (list): Strategies of player 1, see `as_strategies`.
+        strategies2 (list): Strategies of player 2.
+        num_matches (int): Matches per pairing.
+        workers (int): Number of processes to spread the chunks over; None
+            or 1 plays all chunks in this process.
+
+    Returns:
+        SimulationResult: Counts per pairing.
+    """
+    strategies1 = as_strategies(strategies1, config)
+    strategies2 = as_strategies(strategies2, config)
+    total = len(strategies1) * len(strategies2) * num_matches
+    chunk_size = config.simulator_chunk_size
+    starts = range(0, total, chunk_size)
+    seeds = np.random.SeedSequence(
+        int(config.random_generator.integers(2**63))
+    ).spawn(len(starts))
+    chunks = [
+        (
+            config,
+            strategies1,
+            strategies2,
+            num_matches,
+            start,
+            min(start + chunk_size, total),
+            seed,
+        )
+        for start, seed in zip(starts, seeds)
+    ]
+
+    result = SimulationResult((len(strategies1), len(strategies2)))
+    if workers is None or workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            result.add(simulate_chunk(*chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for partial in executor.map(simulate_chunk, *zip(*chunks)):
+                result.add(partial)
+    return result
+
+
+def as_strategies(strategies, config) -> list:
+    """
+    Accept a list of strategy objects, or an array with one strategy per
+    row: integer rows are fixed allocations, float rows gene vectors.
+    """
+    if isinstance(strategies, np.ndarray):
+        if np.issubdtype(strategies.dtype, np.integer):
+            return [FixedStrategy(row) for row in strategies]
+        return [
+            MultinomialStrategy(row, config.armies_per_player) for row in strategies
+        ]
+    return list(strategies)
+
+
+def strategy_from_player(player):
+    """
+    The strategy a player currently plays.
+
+    Raises:
+        ValueError: If the player type has no simulator strategy.
+    """
+    config = player.config
+    if isinstance(player, GeneticPlayer):
+        return MultinomialStrategy(
+            player.chromosome.validated_genes(), config.armies_per_player
+        )
+    if isinstance(player, ReinforcedPlayer):
+        return QPolicyStrategy(player.qmatrix, config.epsilon)
+    if isinstance(player, EquilibriumPlayer):
+        return MixedStrategy(player.strategies, player.weights)
+    if isinstance(player, ApproximatePlayer):
+        # Its placements depend on the armies already placed, so the policy
+        # is represented by a sample of its allocations
+        allocations = player.sample_allocations(config.simulator_policy_samples)
+        return MixedStrategy(allocations, np.ones(len(allocations)))
+    if isinstance(player, RandomPlayer):
+        return MultinomialStrategy(
+            np.ones(config.num_castles), config.armies_per_player
+        )
+    raise ValueError(f"No simulator strategy for {type(player).__name__}")
+
+
+def strategies_from_players(players) -> list:
+    """The strategies of a list of players, in order."""
+    return [strategy_from_player(player) for player in players]
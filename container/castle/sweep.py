@@ -0,0 +1,317 @@
+import contextlib
+import csv
+import hashlib
+import io
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from castle.game import Config, Game
+from castle.trainer import Trainer
+from castle.simulator import simulate, strategies_from_players
+
+# Parameters that select the players instead of configuring them
+PLAYER_PARAMETERS = {"left_player": "random", "right_player": "random"}
+METRIC_COLUMNS = ["left_win_rate", "rounds", "seconds", "error"]
+
+
+def load_spec(path):
+    """
+    Load a sweep specification from a JSON file.
+
+    The specification has the keys:
+    - "search": "grid" (default) or "random";
+    - "parameters": for a grid, a list of values per parameter; for a random
+      search, either a list to choose from or {"low", "high", "log", "integer"};
+    - "samples": number of random configurations (random search only);
+    - "base": parameters shared by all jobs;
+    - "seeds": list of seeds, every configuration runs once per seed.
+    """
+    with open(path) as spec_file:
+        return json.load(spec_file)
+
+
+def config_hash(params) -> str:
+    """Stable content hash of a job's parameters, independent of key order."""
+    encoded = json.dumps(params, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def job_hash(params, seed) -> str:
+    """
+    Hash of a job: the players and the content hash of the resulting Config,
+    so jobs that spell out default values are recognized as the same job.
+    Parameters that do not make a valid Config fall back to hashing the raw
+    parameters; such jobs fail when run.
+    """
+    try:
+        content_hash = build_config(params, seed).content_hash()
+    except ValueError:
+        return config_hash({**params, "seed": seed})
+    players = {name: params[name] for name in PLAYER_PARAMETERS}
+    return config_hash({**players, "config": content_hash})
+
+
+def sample_value(domain, rng):
+    if isinstance(domain, list):
+        return domain[rng.integers(len(domain))]
+    low, high = domain["low"], domain["high"]
+    if domain.get("log", False):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return int(round(value)) if domain.get("integer", False) else float(value)
+
+
+def expand_jobs(spec):
+    """
+    Turn a sweep specification into a list of jobs.
+
+    Returns:
+        list: Dicts with the job's "params", "seed" and content "hash".
+    """
+    parameters = spec.get("parameters", {})
+    search = spec.get("search", "grid")
+    if search == "grid":
+        names = sorted(parameters)
+        combinations = [
+            dict(zip(names, values))
+            for values in itertools.product(*(parameters[name] for name in names))
+        ]
+    elif search == "random":
+        rng = np.random.default_rng(spec.get("search_seed", 0))
+        combinations = [
+            {name: sample_value(domain, rng) for name, domain in parameters.items()}
+            for _ in range(spec["samples"])
+        ]
+    else:
+        raise ValueError(f"Invalid search type: {search}")
+
+    jobs = []
+    for combination in combinations:
+        for seed in spec.get("seeds", [0]):
+            params = {**PLAYER_PARAMETERS, **spec.get("base", {}), **combination}
+            jobs.append(
+                {
+                    "params": params,
+                    "seed": seed,
+                    "hash": job_hash(params, seed),
+                }
+            )
+    return jobs
+
+
+def build_config(params, seed=None):
+    """
+    Build a Config from sweep parameters.
+
+    Raises:
+        ValueError: If a parameter is not a Config attribute.
+    """
+    return Config.from_dict(
+        {
+            **{
+                name: value
+                for name, value in params.items()
+                if name not in PLAYER_PARAMETERS
+            },
+            "seed": seed,
+        }
+    )
+
+
+def apply_resource_limits(max_memory_mb=None, max_seconds=None):
+    """Limit the address space and CPU time of the current (job) process."""
+    import resource
+
+    if max_memory_mb is not None:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if max_seconds is not None:
+        resource.setrlimit(resource.RLIMIT_CPU, (max_seconds, max_seconds))
+
+
+def run_job(job):
+    """
+    Train and evaluate one configuration.
+
+    Returns:
+        dict: A results row with the job's parameters and metrics.
+    """
+    params = job["params"]
+    row = {"hash": job["hash"], "seed": job["seed"], **params}
+    start = time.perf_counter()
+    try:
+        np.random.seed(job["seed"])
+        config = build_config(params, seed=job["seed"])
+        game = Game(config)
+        trainer = Trainer(config, game, params["left_player"], params["right_player"])
+        # Keep the worker's progress output out of the sweep's output
+        with contextlib.redirect_stdout(io.StringIO()):
+            training_data = trainer.train()
+        left = trainer.best_player("left")
+        right = trainer.best_player("right")
+        evaluation = simulate(
+            config,
+            strategies_from_players([left]),
+            strategies_from_players([right]),
+            config.num_matches,
+        )
+        row.update(
+            status="ok",
+            left_win_rate=float(evaluation.win_rate[0, 0]),
+            rounds=len(training_data[0]),
+        )
+    except Exception as error:
+        row.update(status="failed", error=f"{type(error).__name__}: {error}")
+    row["seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_limited_job_process(job, max_memory_mb, max_seconds, connection):
+    """Entry point of a job's own process: apply the limits, then run the job."""
+    apply_resource_limits(max_memory_mb, max_seconds)
+    connection.send(run_job(job))
+    connection.close()
+
+
+def run_limited_job(job, max_memory_mb=None, max_seconds=None):
+    """
+    Run a job in a process of its own, so the resource limits apply to this
+    job alone and a job that exceeds them fails without affecting others.
+
+    Returns:
+        dict: The job's results row, or a failed row if its process died.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=run_limited_job_process,
+        args=(job, max_memory_mb, max_seconds, sender),
+    )
+    start = time.perf_counter()
+    process.start()
+    sender.close()
+    try:
+        row = receiver.recv()
+    except EOFError:
+        row = None
+    finally:
+        receiver.close()
+        process.join()
+    if row is None:
+        # The process died, e.g. because it exceeded its CPU time limit
+        row = {
+            "hash": job["hash"],
+            "seed": job["seed"],
+            **job["params"],
+            "status": "failed",
+            "error": f"Job process exited with code {process.exitcode}",
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    return row
+
+
+def completed_hashes(results_path):
+    """Hashes of the jobs that finished successfully in an earlier sweep."""
+    if not os.path.exists(results_path):
+        return set()
+    with open(results_path, newline="") as results_file:
+        return {
+            row["hash"]
+            for row in csv.DictReader(results_file)
+            if row.get("status") == "ok"
+        }
+
+
+def results_header(param_names):
+    """Columns of a results CSV whose jobs set the given parameters."""
+    return ["hash", "seed", "status"] + sorted(param_names) + METRIC_COLUMNS
+
+
+def prepare_results(results_path, params):
+    """
+    Make sure the results CSV has a column for every parameter of the jobs
+    about to run. A new file gets just the header; an existing file whose
+    header lacks some of the parameters, e.g. because the sweep added one,
+    is rewritten with the merged header, leaving those cells of the earlier
+    rows empty.
+
+    Args:
+        results_path (str): Path of the results CSV.
+        params (list): The parameter dicts of the jobs.
+
+    Returns:
+        list: The header of the results CSV.
+    """
+    names = set().union(*params)
+    if not os.path.exists(results_path) or os.path.getsize(results_path) == 0:
+        header = results_header(names)
+        os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+        with open(results_path, "w", newline="") as results_file:
+            csv.writer(results_file).writerow(header)
+        return header
+
+    with open(results_path, newline="") as results_file:
+        reader = csv.DictReader(results_file)
+        existing = reader.fieldnames
+        if names <= set(existing):
+            return existing
+        old_rows = list(reader)
+    fixed = set(results_header([]))
+    header = results_header(names | {name for name in existing if name not in fixed})
+    # Write the merged file next to the old one, so an interruption does not
+    # lose the earlier results
+    merged_path = f"{results_path}.merging"
+    with open(merged_path, "w", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(old_rows)
+    os.replace(merged_path, results_path)
+    return header
+
+
+def run_sweep(spec, results_path, workers=None, max_memory_mb=None, max_seconds=None):
+    """
+    Run all jobs of a sweep, at most `workers` at a time and each in its own
+    process with the given resource limits, appending each finished job to
+    the results CSV as soon as it completes. Jobs whose hash already
+    finished successfully in `results_path` are skipped.
+
+    Returns:
+        list: The result rows of the jobs run by this call.
+    """
+    done = completed_hashes(results_path)
+    all_jobs = expand_jobs(spec)
+    jobs = [job for job in all_jobs if job["hash"] not in done]
+    skipped = len(all_jobs) - len(jobs)
+    print(f"Running {len(jobs)} jobs, skipping {skipped} completed ones")
+    if not jobs:
+        return []
+
+    header = prepare_results(results_path, [job["params"] for job in jobs])
+
+    rows = []
+    # The threads only wait for the job processes
+    executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+    with executor, open(results_path, "a", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=header)
+        futures = [
+            executor.submit(run_limited_job, job, max_memory_mb, max_seconds)
+            for job in jobs
+        ]
+        for number, future in enumerate(as_completed(futures), start=1):
+            row = future.result()
+            writer.writerow(row)
+            results_file.flush()
+            rows.append(row)
+            print(
+                f"\rJob {number}/{len(jobs)} - {row['hash']}: {row['status']}",
+                end="",
+                flush=True,
+            )
+    print(f"\nSweep results written to {results_path}")
+    return rows
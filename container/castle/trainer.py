@@ -1,9 +1,52 @@
+import json
 import math
 import itertools
+import os
+import time
 import numpy as np
-from players.player import RandomPlayer
+from players.player import FitnessPlayer, RandomPlayer
 from players.reinforcement import ReinforcedPlayer
 from players.genetic import GeneticPlayer
+from players.equilibrium import EquilibriumPlayer
+from players.approximate import ApproximatePlayer
+from players.cmaes import CMAES, CMAESPlayer
+from players.operators import crossover_genes, mutate_genes, normalize_rows
+from castle.convergence import ConvergenceMonitor
+from castle.racing import RacingEvaluator
+from castle.distributed import Coordinator
+from castle.budget import TrainingBudget
+from castle.curriculum import curriculum_stages, transfer_player, transfer_strategy
+from castle.game import Game
+from castle.hall_of_fame import HallOfFame
+from castle.diversity import DistanceCache, gene_statistics, shared_fitness
+from castle.equilibrium import EquilibriumSolver
+from castle.match_log import MatchLogWriter
+from castle.best_response import exploitability
+from castle.simulator import strategy_from_player
+from castle.checkpoint import (
+    atomic_save,
+    load_elite_ratings,
+    load_elites,
+    save_elites,
+    save_qmatrix,
+)
+from castle.rating import glicko_update
+from castle.matchmaking import (
+    combine_results,
+    index_players,
+    sample_scheduled,
+    schedule_matches,
+    update_scheduled,
+)
+
+PLAYER_TYPES = [
+    "random",
+    "reinforced",
+    "genetic",
+    "equilibrium",
+    "approximate",
+    "cmaes",
+]
 
 
 def create_player(player_type, config):
@@ -13,6 +56,12 @@ def create_player(player_type, config):
         return ReinforcedPlayer(config)
     elif player_type == "genetic":
         return GeneticPlayer(config)
+    elif player_type == "equilibrium":
+        return EquilibriumPlayer(config)
+    elif player_type == "approximate":
+        return ApproximatePlayer(config)
+    elif player_type == "cmaes":
+        return CMAESPlayer(config)
     else:
         raise ValueError(f"Invalid player type: {player_type}")
 
@@ -26,40 +75,299 @@ class Trainer:
         self.initialize()
 
     def initialize(self):
+        # In self-play both sides are the same population, paired within itself
+        self.self_play = self.config.self_play
+        if self.self_play and (
+            self.player_left != self.player_right
+            or self.player_left not in self.config.population_players
+        ):
+            raise ValueError(
+                "Self-play needs the same population player type on both sides"
+            )
         self.population_left = self.create_population(self.player_left)
-        self.population_right = self.create_population(self.player_right)
+        self.population_right = (
+            self.population_left
+            if self.self_play
+            else self.create_population(self.player_right)
+        )
+        # Search distributions of the populations evolved by CMA-ES, per side
+        self.evolution_strategies = {}
+        for side, player_type, population in (
+            ("left", self.player_left, self.population_left),
+            ("right", self.player_right, self.population_right),
+        ):
+            if (
+                player_type != "cmaes"
+                or player_type not in self.config.population_players
+            ):
+                continue
+            if self.self_play and side == "right":
+                continue
+            strategy = CMAES(self.config, len(population))
+            for player, logits in zip(population, strategy.ask(len(population))):
+                player.set_logits(logits)
+            self.evolution_strategies[side] = strategy
         self.pop_size_left = len(self.population_left)
         self.pop_size_right = len(self.population_right)
         self.num_rounds = math.ceil(
             self.config.num_training_rounds
             / max(self.pop_size_left, self.pop_size_right)
         )
+        # Mutation parameters handed to offspring; the convergence monitor
+        # raises them when progress stalls and convergence_action is "adapt".
+        self.mutation_rate = self.config.point_mutation_rate
+        self.mutation_amount = self.config.mutation_std_dev
+        self.adaptations = 0
+        self.monitors = {}
+        if self.config.early_stopping:
+            # Random players never learn, so there is nothing to converge
+            self.monitors = {
+                side: ConvergenceMonitor(self.config, self.game)
+                for side, player_type in (
+                    ("left", self.player_left),
+                    ("right", self.player_right),
+                )
+                if player_type != "random"
+            }
+            if self.self_play:
+                del self.monitors["right"]
+        # Diversity statistics of every generation per side, and the pairwise
+        # distances they are computed from when those are enabled
+        self.diversity_history = {"left": [], "right": []}
+        # (round, exploitability) of the best player per side, see
+        # record_exploitability
+        self.exploitability_history = {"left": [], "right": []}
+        self.distance_caches = {
+            "left": DistanceCache(self.config),
+            "right": DistanceCache(self.config),
+        }
+        self.match_log = None
+        # Set by train when a time or match budget is given
+        self.budget = None
+        # (armies, rounds played) of every curriculum stage trained first
+        self.curriculum_history = []
+        self.racing_evaluator = (
+            RacingEvaluator(self.config, self.game) if self.config.racing else None
+        )
+        # Evaluates population players on remote workers, listening once
+        # training starts
+        self.coordinator = (
+            Coordinator(self.config)
+            if self.config.distributed_address is not None
+            else None
+        )
+        # Archives of past best players, only used when both sides evolve
+        self.hall_of_fame = {}
+        if (
+            self.config.hall_of_fame_size > 0
+            and self.player_left in self.config.population_players
+            and self.player_right in self.config.population_players
+        ):
+            self.hall_of_fame = {
+                "left": HallOfFame(self.config),
+                "right": HallOfFame(self.config),
+            }
 
     def create_population(self, player_type):
         if player_type in self.config.population_players:
             print(
                 f"Creating a population of {self.config.population_size} {player_type} players"
             )
-            return [
+            population = [
                 create_player(player_type, self.config)
                 for _ in range(self.config.population_size)
             ]
+            if player_type == "genetic" and self.config.warm_start_elites:
+                self.seed_population(
+                    population,
+                    load_elites(self.config.warm_start_elites),
+                    load_elite_ratings(self.config.warm_start_elites),
+                )
+            return population
         print(f"Creating a single {player_type} player")
-        return [create_player(player_type, self.config)]
+        player = create_player(player_type, self.config)
+        if player_type == "reinforced" and self.config.warm_start_qmatrix:
+            print(f"Loading Q-matrix from {self.config.warm_start_qmatrix}")
+            player.set_qmatrix(self.config.warm_start_qmatrix)
+        return [player]
+
+    def seed_population(self, population, elites, ratings=None):
+        """
+        Replace the genes of the first `config.warm_start_fraction` of a
+        population with saved elites. The elites are copied once unchanged,
+        with their saved ratings if given; further copies get gaussian noise
+        of `config.warm_start_noise`. The rest of the population keeps its
+        random genes.
+
+        Raises:
+            ValueError: If the elites were saved for another number of castles.
+        """
+        if elites.shape[1] != self.config.num_castles:
+            raise ValueError(
+                f"Elites have {elites.shape[1]} castles, config has {self.config.num_castles}"
+            )
+        count = round(self.config.warm_start_fraction * len(population))
+        genes = elites[np.arange(count) % len(elites)]
+        noise = self.config.random_generator.normal(
+            0, self.config.warm_start_noise, genes.shape
+        )
+        noise[: len(elites)] = 0
+        genes = normalize_rows(genes + noise)
+        print(f"Seeding {count} players from {len(elites)} saved elites")
+        for player, player_genes in zip(population, genes):
+            player.chromosome.genes = player_genes
+        if ratings is not None:
+            for player, rating in zip(population[:count], ratings):
+                player.rating = rating.copy()
+
+    def save_checkpoint(self, directory):
+        """
+        Atomically save the best players of both sides: the elites of genetic
+        populations, or the search distribution's mean of CMA-ES populations,
+        as `<side>_elites.npz` and the Q-matrix of reinforced players as
+        `<side>_qmatrix.npy`, plus the config as `config.json`.
+        """
+        for side, player_type, population in (
+            ("left", self.player_left, self.population_left),
+            ("right", self.player_right, self.population_right),
+        ):
+            path = os.path.join(directory, f"{side}_elites.npz")
+            if player_type == "cmaes" and player_type in self.config.population_players:
+                # The other CMA-ES players are unranked samples drawn after
+                # the last update, so only the distribution's mean is saved
+                mean_player = population[0]
+                save_elites(
+                    path,
+                    [mean_player.chromosome.genes],
+                    ratings=[mean_player.rating],
+                    source="cmaes_mean",
+                )
+            elif player_type in self.config.population_players:
+                # Genetic evolution puts the elites at the front, ranked by
+                # their selection fitness
+                elites = population[: self.elitism_count(population)]
+                save_elites(
+                    path,
+                    [player.chromosome.genes for player in elites],
+                    [player.fitness() for player in elites],
+                    [player.rating for player in elites],
+                )
+            elif player_type == "reinforced":
+                save_qmatrix(
+                    os.path.join(directory, f"{side}_qmatrix.npy"),
+                    self.best_player(side).get_qmatrix(),
+                )
+        atomic_save(
+            os.path.join(directory, "config.json"),
+            lambda config_file: config_file.write(
+                json.dumps(self.config.to_dict(), indent=2).encode()
+            ),
+        )
 
     def train(self):
         print(
             f"Training {self.player_left.capitalize()} against {self.player_right.capitalize()}..."
         )
 
+        if self.config.curriculum_armies:
+            self.train_curriculum()
+
+        # Time and match budgets replace the round count when given; the
+        # clock starts before the equilibria are solved
+        self.budget = (
+            TrainingBudget(self.config)
+            if self.config.time_budget is not None
+            or self.config.match_budget is not None
+            else None
+        )
+
+        self.solve_equilibria()
+
+        if self.config.match_log_path is not None:
+            self.match_log = MatchLogWriter(
+                self.config.match_log_path,
+                self.config.num_castles,
+                self.config.match_log_chunk_size,
+                self.config.armies_per_player,
+            )
+        if self.coordinator is not None:
+            self.coordinator.start()
+        try:
+            training_data = self.train_rounds()
+            if self.config.checkpoint_dir is not None:
+                self.save_checkpoint(self.config.checkpoint_dir)
+            return training_data
+        finally:
+            if self.match_log is not None:
+                self.match_log.close()
+                self.match_log = None
+            if self.coordinator is not None:
+                self.coordinator.close()
+
+    def train_curriculum(self):
+        """
+        Train the reduced stages of the curriculum in turn, each continuing
+        from the players of the one before, and continue from the last
+        stage's players at full size.
+        """
+        previous = None
+        for stage_config in curriculum_stages(self.config):
+            print(f"Curriculum stage with {stage_config.armies_per_player} armies")
+            stage = Trainer(
+                stage_config,
+                Game(stage_config),
+                self.player_left,
+                self.player_right,
+            )
+            if previous is not None:
+                stage.inherit(previous)
+            left_wins, _ = stage.train()
+            self.curriculum_history.append(
+                (stage_config.armies_per_player, len(left_wins))
+            )
+            previous = stage
+        self.inherit(previous)
+
+    def inherit(self, source):
+        """Take over the players and search distributions of another trainer."""
+        for source_population, population in (
+            (source.population_left, self.population_left),
+            (source.population_right, self.population_right),
+        ):
+            for source_player, player in zip(source_population, population):
+                transfer_player(source_player, player)
+        for side, strategy in source.evolution_strategies.items():
+            self.evolution_strategies[side] = transfer_strategy(strategy, self.config)
+
+    def train_rounds(self):
         left_wins = []
         right_wins = []
+        last_checkpoint = -math.inf
 
-        for round_number in range(self.num_rounds):
+        rounds = range(self.num_rounds) if self.budget is None else itertools.count()
+        for round_number in rounds:
+            if self.budget is not None and self.budget.exhausted():
+                print(f"\nBudget used up after {round_number} rounds.")
+                break
             left_results, right_results = self.play_round(round_number)
             self.evolve_populations(left_results, right_results)
+            if self.budget is not None:
+                self.budget.record_round(self.round_matches)
             self.print_progress(round_number, left_results, right_results)
 
+            # Keep the best players of the run so far available to readers
+            if (
+                self.config.checkpoint_dir is not None
+                and time.monotonic() - last_checkpoint
+                >= self.config.checkpoint_interval
+            ):
+                self.save_checkpoint(self.config.checkpoint_dir)
+                last_checkpoint = time.monotonic()
+
+            interval = self.config.exploitability_interval
+            if interval > 0 and (round_number + 1) % interval == 0:
+                self.record_exploitability(round_number)
+
             # Count wins for each side in this round
             left_round_wins = sum(1 for _, score in left_results if score > 0)
             right_round_wins = sum(1 for _, score in right_results if score > 0)
@@ -67,25 +375,133 @@ class Trainer:
             left_wins.append(left_round_wins)
             right_wins.append(right_round_wins)
 
-        print(f"\nTraining completed after {self.num_rounds} rounds.")
+            if self.monitors and self.check_convergence(
+                round_number, left_results, right_results
+            ):
+                print(f"\nConverged after {round_number + 1} rounds.")
+                break
+
+        print(f"\nTraining completed after {len(left_wins)} rounds.")
         return [left_wins, right_wins]
 
+    def record_exploitability(self, round_number):
+        """
+        Record the exploitability of the current best player of each side:
+        the expected point margin an exact best response would achieve
+        against it.
+        """
+        for side in ("left", "right"):
+            value = exploitability(
+                strategy_from_player(self.best_player(side)), self.config
+            )
+            self.exploitability_history[side].append((round_number, value))
+
+    def solve_equilibria(self):
+        """Solve the mixed strategy of every equilibrium player before the rounds."""
+        for player_type, population in (
+            (self.player_left, self.population_left),
+            (self.player_right, self.population_right),
+        ):
+            if player_type != "equilibrium":
+                continue
+            solver = EquilibriumSolver(self.config, self.game)
+            solved_exploitability = solver.solve(population[0])
+            print(
+                f"Solved equilibrium over {self.config.equilibrium_strategies} "
+                f"allocations with {solver.games_played} games "
+                f"(exploitability {solved_exploitability:.3f})"
+            )
+
     def play_round(self, round_number):
         left_results = []
         right_results = []
-        training_progress = (round_number + 1) / self.num_rounds
-        # Ensure everyone has a match by shuffling and pairing
-        shuffled_left = self.config.random_generator.permutation(self.population_left)
-        shuffled_right = self.config.random_generator.permutation(self.population_right)
-
-        # Pair players, repeating the smaller population if necessary
-        for left_player, right_player in zip(
-            shuffled_left,
-            itertools.cycle(shuffled_right)
-            if len(shuffled_right) < len(shuffled_left)
-            else shuffled_right,
-        ):
+        training_progress = self.training_progress(round_number)
+        if self.match_log is not None:
+            # Match log ids are the players' indices in their population
+            self.player_ids = {
+                id(player): index
+                for population in (self.population_left, self.population_right)
+                for index, player in enumerate(population)
+            }
+        if self.config.matchmaking != "sequential" and not self.self_play:
+            archive_pairs = self.play_scheduled_matches(
+                round_number, training_progress, left_results, right_results
+            )
+        else:
+            archive_pairs = self.play_sequential_matches(
+                round_number, training_progress, left_results, right_results
+            )
+
+        if archive_pairs:
+            archive_left, archive_right = self.play_archive_matches(
+                archive_pairs, round_number, training_progress
+            )
+            left_results.extend(archive_left)
+            right_results.extend(archive_right)
+
+        if self.racing_evaluator is not None:
+            left_results, right_results = self.race_populations(
+                left_results, right_results
+            )
+        if self.coordinator is not None:
+            left_results, right_results = self.evaluate_distributed(
+                left_results, right_results
+            )
+        # Calculate the percentage of positive scores for the left population
+        positive_left_scores = sum(1 for _, score in left_results if score > 0)
+        total_left_scores = len(left_results)
+        positive_percentage = (
+            (positive_left_scores / total_left_scores) * 100
+            if total_left_scores > 0
+            else 0
+        )
+
+        return left_results, right_results
+
+    def play_sequential_matches(
+        self, round_number, training_progress, left_results, right_results
+    ):
+        """
+        Pair the shuffled populations, repeating the smaller one, and play
+        the pairs one game at a time, updating both players after every game.
+        The results are appended to `left_results` and `right_results`.
+
+        Returns:
+            list: The pairs that play the archive instead of each other.
+        """
+        if self.self_play:
+            pairs = self.self_play_pairs()
+        else:
+            # Ensure everyone has a match by shuffling and pairing
+            shuffled_left = self.config.random_generator.permutation(
+                self.population_left
+            )
+            shuffled_right = self.config.random_generator.permutation(
+                self.population_right
+            )
+
+            # Pair players, repeating the smaller population if necessary
+            pairs = list(
+                zip(
+                    shuffled_left,
+                    itertools.cycle(shuffled_right)
+                    if len(shuffled_right) < len(shuffled_left)
+                    else shuffled_right,
+                )
+            )
+
+        # Some pairs play against the archived opponents instead of each other
+        to_archive = self.archive_mask(len(pairs))
+        archive_pairs = [pair for pair, archived in zip(pairs, to_archive) if archived]
+        pairs = [pair for pair, archived in zip(pairs, to_archive) if not archived]
+
+        # Matches played this round, for the training budget
+        self.round_matches = len(pairs) + len(archive_pairs)
+        left_won = []
+        for left_player, right_player in pairs:
             player1_reward, player2_reward = self.play_game(left_player, right_player)
+            # The winner's bonus always lifts its reward above the loser's
+            left_won.append(player1_reward > player2_reward)
             self.update_players(
                 left_player,
                 right_player,
@@ -93,19 +509,370 @@ class Trainer:
                 player2_reward,
                 training_progress,
             )
+            if self.match_log is not None:
+                self.log_match(
+                    round_number,
+                    left_player,
+                    right_player,
+                    player1_reward,
+                    player2_reward,
+                )
             left_results.append((left_player, player1_reward))
             right_results.append((right_player, player2_reward))
-        # Calculate the percentage of positive scores for the left population
-        positive_left_scores = sum(1 for _, score in left_results if score > 0)
-        total_left_scores = len(left_results)
-        positive_percentage = (
-            (positive_left_scores / total_left_scores) * 100
-            if total_left_scores > 0
-            else 0
+
+        if self.config.rating_fitness and pairs:
+            self.update_ratings(pairs, left_won)
+        return archive_pairs
+
+    def play_scheduled_matches(
+        self, round_number, training_progress, left_results, right_results
+    ):
+        """
+        Schedule the whole round with `config.matchmaking`, score each side's
+        matches in one batch and hand every player the rewards of all its
+        matches in one `update_batch` call, so a single agent facing a whole
+        population learns once per round instead of once per game. The
+        results are appended to `left_results` and `right_results`.
+
+        Returns:
+            list: The pairs that play the archive instead of each other.
+        """
+        fitness = {}
+        if self.config.matchmaking == "stratified":
+            fitness = {
+                "left_fitness": self.matchmaking_fitness(self.population_left),
+                "right_fitness": self.matchmaking_fitness(self.population_right),
+            }
+        left_indices, right_indices = schedule_matches(
+            self.config.matchmaking,
+            len(self.population_left),
+            len(self.population_right),
+            self.config.random_generator,
+            # A budget scales the round itself through the opponent count
+            opponents=self.evaluation_matches(self.config.matchmaking_opponents),
+            **fitness,
+        )
+
+        # Some matches are played against the archived opponents instead
+        to_archive = self.archive_mask(len(left_indices))
+        archive_pairs = [
+            (self.population_left[left], self.population_right[right])
+            for left, right in zip(left_indices[to_archive], right_indices[to_archive])
+        ]
+        left_indices = left_indices[~to_archive]
+        right_indices = right_indices[~to_archive]
+        self.round_matches = len(left_indices) + len(archive_pairs)
+
+        num_castles = self.config.num_castles
+        left_allocations = sample_scheduled(
+            self.population_left, left_indices, num_castles
+        )
+        right_allocations = sample_scheduled(
+            self.population_right, right_indices, num_castles
+        )
+        scores = self.game.score_allocations(left_allocations, right_allocations)
+        left_rewards, right_rewards = self.game.score_rewards(*scores)
+        if self.match_log is not None:
+            self.match_log.append_batch(
+                round=round_number,
+                left_id=left_indices,
+                right_id=right_indices,
+                left_allocation=left_allocations,
+                right_allocation=right_allocations,
+                left_score=scores[1],
+                right_score=scores[2],
+                left_reward=left_rewards,
+                right_reward=right_rewards,
+            )
+        update_scheduled(
+            self.population_left,
+            left_indices,
+            left_allocations,
+            left_rewards,
+            training_progress,
+        )
+        update_scheduled(
+            self.population_right,
+            right_indices,
+            right_allocations,
+            right_rewards,
+            training_progress,
+        )
+
+        left_players = [self.population_left[index] for index in left_indices]
+        right_players = [self.population_right[index] for index in right_indices]
+        left_results.extend(zip(left_players, left_rewards))
+        right_results.extend(zip(right_players, right_rewards))
+        if self.config.rating_fitness and len(left_players):
+            self.update_ratings(list(zip(left_players, right_players)), scores[0])
+        return archive_pairs
+
+    def archive_mask(self, matches):
+        """Which of the round's matches are played against the hall of fame."""
+        if self.hall_of_fame and len(self.hall_of_fame["left"]) > 0:
+            return (
+                self.config.random_generator.random(matches)
+                < self.config.hall_of_fame_fraction
+            )
+        return np.zeros(matches, dtype=bool)
+
+    def matchmaking_fitness(self, population):
+        """Fitness of every player for stratified matchmaking, 0 without one."""
+        return np.array(
+            [
+                player.fitness() if isinstance(player, FitnessPlayer) else 0.0
+                for player in population
+            ]
+        )
+
+    def training_progress(self, round_number):
+        """
+        Fraction of training done once this round is played: of the rounds,
+        or of the tightest budget when training is budgeted.
+        """
+        if self.budget is not None:
+            return min(1.0, self.budget.progress() + self.budget.round_cost())
+        return (round_number + 1) / self.num_rounds
+
+    def evaluation_matches(self, matches):
+        """Per-individual evaluation matches, scaled to fit the budget."""
+        if self.budget is not None:
+            return self.budget.scaled_matches(matches)
+        return matches
+
+    def update_ratings(self, pairs, left_won):
+        """
+        Rate the round's matches in one batched Glicko update. A player that
+        played several matches, like a single opponent facing a whole
+        population, gets one update from all of them.
+        """
+        rows = {}
+        players = []
+        for player in itertools.chain.from_iterable(pairs):
+            if id(player) not in rows:
+                rows[id(player)] = len(players)
+                players.append(player)
+        first = np.array([rows[id(left)] for left, _ in pairs])
+        second = np.array([rows[id(right)] for _, right in pairs])
+        ratings = glicko_update(
+            np.array([player.rating for player in players]),
+            first,
+            second,
+            np.array(left_won, dtype=float),
+            self.config.rating_min_deviation**2,
+        )
+        for player, rating in zip(players, ratings):
+            player.rating = rating
+
+    def self_play_pairs(self):
+        """
+        Pair the self-play population within itself, so every player plays
+        one match per round and both players of a match learn from it. With
+        an odd population size, the player left over meets a random opponent
+        that plays a second match.
+        """
+        shuffled = self.config.random_generator.permutation(self.population_left)
+        half = len(shuffled) // 2
+        pairs = list(zip(shuffled[:half], shuffled[half : 2 * half]))
+        if len(shuffled) % 2:
+            opponent = shuffled[
+                self.config.random_generator.integers(len(shuffled) - 1)
+            ]
+            pairs.append((shuffled[-1], opponent))
+        return pairs
+
+    def self_play_results(self, left_results, right_results):
+        """
+        Results of the self-play population: both sides of every match, one
+        entry per player (the last one for a player that played twice).
+        """
+        return list(
+            {
+                id(player): (player, reward)
+                for player, reward in left_results + right_results
+            }.values()
+        )
+
+    def log_match(
+        self, round_number, left_player, right_player, player1_reward, player2_reward
+    ):
+        """Append the match just played by self.game to the match log."""
+        castles = sorted(self.config.points_per_castle)
+        _, player1_score, player2_score = self.game.calculate_score()
+        self.match_log.append(
+            round_number,
+            self.player_ids[id(left_player)],
+            self.player_ids[id(right_player)],
+            [self.game.player1_distribution.get(castle, 0) for castle in castles],
+            [self.game.player2_distribution.get(castle, 0) for castle in castles],
+            player1_score,
+            player2_score,
+            player1_reward,
+            player2_reward,
+        )
+
+    def play_archive_matches(self, pairs, round_number, training_progress):
+        """
+        Play both members of every pair against the opposing side's hall of
+        fame, scoring all matches of a side in one batch.
+
+        Returns:
+            tuple: (left_results, right_results) lists of (player, reward).
+        """
+        left_players = [left_player for left_player, _ in pairs]
+        right_players = [right_player for _, right_player in pairs]
+        left_distinct, left_indices = index_players(left_players)
+        right_distinct, right_indices = index_players(right_players)
+        num_castles = self.config.num_castles
+        left_allocations = sample_scheduled(left_distinct, left_indices, num_castles)
+        right_allocations = sample_scheduled(right_distinct, right_indices, num_castles)
+
+        right_archive_allocations = self.hall_of_fame["right"].sample_allocations(
+            len(pairs)
+        )
+        left_scores = self.game.score_allocations(
+            left_allocations, right_archive_allocations
+        )
+        left_rewards, left_archive_rewards = self.game.score_rewards(*left_scores)
+        left_archive_allocations = self.hall_of_fame["left"].sample_allocations(
+            len(pairs)
+        )
+        right_scores = self.game.score_allocations(
+            left_archive_allocations, right_allocations
+        )
+        right_archive_rewards, right_rewards = self.game.score_rewards(*right_scores)
+
+        if self.match_log is not None:
+            # Archived opponents have no population index and are logged as -1
+            self.match_log.append_batch(
+                round=round_number,
+                left_id=[self.player_ids[id(player)] for player in left_players],
+                right_id=-1,
+                left_allocation=left_allocations,
+                right_allocation=right_archive_allocations,
+                left_score=left_scores[1],
+                right_score=left_scores[2],
+                left_reward=left_rewards,
+                right_reward=left_archive_rewards,
+            )
+            self.match_log.append_batch(
+                round=round_number,
+                left_id=-1,
+                right_id=[self.player_ids[id(player)] for player in right_players],
+                left_allocation=left_archive_allocations,
+                right_allocation=right_allocations,
+                left_score=right_scores[1],
+                right_score=right_scores[2],
+                left_reward=right_archive_rewards,
+                right_reward=right_rewards,
+            )
+
+        update_scheduled(
+            left_distinct,
+            left_indices,
+            left_allocations,
+            left_rewards,
+            training_progress,
+        )
+        update_scheduled(
+            right_distinct,
+            right_indices,
+            right_allocations,
+            right_rewards,
+            training_progress,
+        )
+        return list(zip(left_players, left_rewards)), list(
+            zip(right_players, right_rewards)
+        )
+
+    def race_populations(self, left_results, right_results):
+        """
+        Replace the single-match rewards of population players by the mean
+        reward of a racing evaluation against the opposing side.
+
+        Returns:
+            tuple: The updated (left_results, right_results).
+        """
+        if self.self_play:
+            results = self.race_population(
+                self.population_left, self.population_left, left_side=True
+            )
+            return results, results
+        if self.player_left in self.config.population_players:
+            left_results = self.race_population(
+                self.population_left, self.population_right, left_side=True
+            )
+        if self.player_right in self.config.population_players:
+            right_results = self.race_population(
+                self.population_right, self.population_left, left_side=False
+            )
+        return left_results, right_results
+
+    def race_population(self, population, opponents, left_side):
+        survivors = self.elitism_count(population)
+        mean_rewards, counts = self.racing_evaluator.evaluate(
+            population,
+            opponents,
+            survivors,
+            left_side=left_side,
+            max_matches=self.evaluation_matches(self.config.racing_max_matches),
         )
+        self.round_matches += int(counts.sum())
+        return list(zip(population, mean_rewards))
 
+    def evaluate_distributed(self, left_results, right_results):
+        """
+        Replace the single-match rewards of population players by their mean
+        reward over `config.distributed_matches` matches against the opposing
+        side, played by the coordinator's workers.
+
+        Returns:
+            tuple: The updated (left_results, right_results).
+        """
+        if self.self_play:
+            results = self.evaluate_population_distributed(
+                self.population_left, self.population_left, left_side=True
+            )
+            return results, results
+        if self.player_left in self.config.population_players:
+            left_results = self.evaluate_population_distributed(
+                self.population_left, self.population_right, left_side=True
+            )
+        if self.player_right in self.config.population_players:
+            right_results = self.evaluate_population_distributed(
+                self.population_right, self.population_left, left_side=False
+            )
         return left_results, right_results
 
+    def evaluate_population_distributed(self, population, opponents, left_side):
+        per_opponent = math.ceil(
+            self.config.distributed_opponent_samples / len(opponents)
+        )
+        opponent_allocations = np.concatenate(
+            [opponent.sample_allocations(per_opponent) for opponent in opponents]
+        )
+        genes = np.array([player.chromosome.validated_genes() for player in population])
+        matches = self.evaluation_matches(self.config.distributed_matches)
+        mean_rewards = self.coordinator.evaluate(
+            genes, opponent_allocations, matches, left_side=left_side
+        )
+        self.round_matches += len(population) * matches
+        return list(zip(population, mean_rewards))
+
+    def elitism_count(self, population):
+        """Number of players kept unchanged: the top 10% of the population."""
+        return max(1, int(0.1 * len(population)))
+
+    def selection_fitness(self, player, score):
+        """
+        The value population players are ranked by during evolution: the raced
+        or distributed mean reward when either is enabled, the player's own
+        fitness otherwise.
+        """
+        if self.racing_evaluator is not None or self.coordinator is not None:
+            return score
+        return player.fitness()
+
     def play_game(self, left_player, right_player):
         player1_won, player1_score, player2_score = self.game.play_game(
             left_player, right_player
@@ -132,28 +899,120 @@ class Trainer:
         right_player.update(player2_reward, training_progress=training_progress)
 
     def evolve_populations(self, left_results, right_results):
-        if self.player_left in self.config.population_players:
+        if self.self_play:
+            # A single evolution step over the results of both sides
             self.population_left = self.evolve_population(
-                self.population_left, left_results, "left"
+                self.population_left,
+                self.self_play_results(left_results, right_results),
+                "left",
             )
+            self.population_right = self.population_left
+            self.best_right_player = self.best_left_player
+        else:
+            # Players with several matches enter selection once, with their
+            # mean reward
+            if self.player_left in self.config.population_players:
+                self.population_left = self.evolve_population(
+                    self.population_left, combine_results(left_results), "left"
+                )
 
-        if self.player_right in self.config.population_players:
-            self.population_right = self.evolve_population(
-                self.population_right, right_results, "right"
+            if self.player_right in self.config.population_players:
+                self.population_right = self.evolve_population(
+                    self.population_right, combine_results(right_results), "right"
+                )
+
+        if self.hall_of_fame:
+            self.hall_of_fame["left"].add(self.best_left_player.chromosome.genes)
+            self.hall_of_fame["right"].add(self.best_right_player.chromosome.genes)
+
+    def check_convergence(self, round_number, left_results, right_results):
+        """
+        Feed the round to the convergence monitors and react to a plateau.
+
+        Returns:
+            bool: True if training should stop.
+        """
+        if self.self_play:
+            left_results = self.self_play_results(left_results, right_results)
+        for side, results in (("left", left_results), ("right", right_results)):
+            if side not in self.monitors:
+                continue
+            results = combine_results(results)
+            population = [player for player, _ in results]
+            self.monitors[side].observe(
+                round_number, population, results, self.best_player(side)
             )
 
+        if not all(monitor.stalled() for monitor in self.monitors.values()):
+            return False
+
+        if (
+            self.config.convergence_action == "adapt"
+            and self.adaptations < self.config.max_adaptations
+        ):
+            self.adaptations += 1
+            self.mutation_rate = min(
+                1.0, self.mutation_rate * self.config.mutation_boost
+            )
+            self.mutation_amount *= self.config.mutation_boost
+            for monitor in self.monitors.values():
+                monitor.reset()
+            return False
+        return True
+
     def print_progress(self, round_number, left_results, right_results):
         avg_left_score = np.mean([r[1] for r in left_results])
         avg_right_score = np.mean([r[1] for r in right_results])
+        if self.budget is not None:
+            # Budgeted runs have no round count, only a used fraction
+            round_text = (
+                f"Round {round_number + 1} ({self.budget.progress():.0%} of budget)"
+            )
+        else:
+            round_text = f"Round {round_number + 1}/{self.num_rounds}"
         print(
-            f"\rRound {round_number + 1}/{self.num_rounds} - {self.player_left} avg score: {avg_left_score:.2f}, {self.player_right} avg score: {avg_right_score:.2f}",
+            f"\r{round_text} - {self.player_left} avg score: {avg_left_score:.2f}, {self.player_right} avg score: {avg_right_score:.2f}",
             end="",
             flush=True,
         )
 
+    def population_fitness(self, results, left_or_right):
+        """
+        Selection fitness of every player of a finished round. Records the
+        generation's diversity and applies fitness sharing when enabled.
+
+        Returns:
+            np.ndarray: Fitness per player, in the order of `results`.
+        """
+        fitness = np.array([self.selection_fitness(*result) for result in results])
+        chromosomes = [player.chromosome for player, _ in results]
+        diversity = gene_statistics([chromosome.genes for chromosome in chromosomes])
+        if self.config.diversity_pairwise or self.config.fitness_sharing:
+            distances = self.distance_caches[left_or_right].update(chromosomes)
+            size = len(chromosomes)
+            diversity["mean_distance"] = (
+                float(distances.sum() / (size * (size - 1))) if size > 1 else 0.0
+            )
+            if self.config.fitness_sharing:
+                fitness, niche_counts = shared_fitness(
+                    fitness,
+                    distances,
+                    self.config.sharing_radius,
+                    self.config.sharing_alpha,
+                )
+                diversity["mean_niche_count"] = float(np.mean(niche_counts))
+        self.diversity_history[left_or_right].append(diversity)
+        return fitness
+
     def evolve_population(self, population, results, left_or_right):
+        if left_or_right in self.evolution_strategies:
+            return self.evolve_strategy(population, results, left_or_right)
+
         # Sort players by their fitness
-        sorted_players = sorted(results, key=lambda x: x[0].fitness(), reverse=True)
+        fitness = self.population_fitness(results, left_or_right)
+        order = np.argsort(-fitness, kind="stable")
+        sorted_players = [results[i] for i in order]
+        sorted_fitness = fitness[order]
 
         # Save the best player
         best_player = sorted_players[0][0]
@@ -165,31 +1024,65 @@ class Trainer:
         new_population = []
 
         # Elitism: Keep top 10% unchanged and use them for reproduction
-        elitism_count = max(1, int(0.1 * len(population)))
+        elitism_count = self.elitism_count(population)
         elite_players = [player for player, _ in sorted_players[:elitism_count]]
         new_population.extend(elite_players)
 
         # Fill the rest of the population
-        while len(new_population) < len(population):
+        parents1 = []
+        parents2 = []
+        while len(new_population) + len(parents1) < len(population):
             # Tournament selection
             tournament_size = 5
             tournament_indices = self.config.random_generator.choice(
                 len(sorted_players), tournament_size, replace=False
             )
-            tournament = [sorted_players[i] for i in tournament_indices]
-            parent1 = max(tournament, key=lambda x: x[0].fitness())[0]
+            winner = tournament_indices[np.argmax(sorted_fitness[tournament_indices])]
+            parents1.append(sorted_players[winner][0])
 
             # Select second parent from elite players
-            parent2 = self.config.random_generator.choice(elite_players)
+            parents2.append(self.config.random_generator.choice(elite_players))
 
-            # Create offspring
-            offspring = parent1.copy()
-            offspring.crossover(parent2)
-            offspring.mutate()
-            new_population.append(offspring)
+        # Create all offspring at once from the parents' gene matrices
+        if parents1:
+            genes = crossover_genes(
+                [parent.chromosome.genes for parent in parents1],
+                [parent.chromosome.genes for parent in parents2],
+                self.config,
+            )
+            genes = mutate_genes(
+                genes,
+                self.config,
+                mutation_rate=self.mutation_rate,
+                mutation_amount=self.mutation_amount,
+            )
+            for parent, offspring_genes in zip(parents1, genes):
+                offspring = parent.copy()
+                offspring.chromosome.genes = offspring_genes
+                new_population.append(offspring)
 
         return new_population
 
+    def evolve_strategy(self, population, results, left_or_right):
+        """
+        Evolve a CMA-ES population: update the side's search distribution
+        from the ranked results and draw new logits for every player. The
+        first player plays the distribution's mean, the best estimate of the
+        optimum with noisy single-match fitness, and is the side's best player.
+        """
+        fitness = self.population_fitness(results, left_or_right)
+        strategy = self.evolution_strategies[left_or_right]
+        strategy.tell([player.logits for player, _ in results], fitness)
+
+        population[0].set_logits(strategy.mean)
+        for player, logits in zip(population[1:], strategy.ask(len(population) - 1)):
+            player.set_logits(logits)
+        if left_or_right == "left":
+            self.best_left_player = population[0]
+        else:
+            self.best_right_player = population[0]
+        return population
+
     def best_player(self, left_or_right):
         """
         Returns the best player from either the left or right population.
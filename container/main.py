@@ -1,26 +1,99 @@
+import dataclasses
 import math
+import typing
 from players.player import RandomPlayer
 from players.reinforcement import ReinforcedPlayer
 from players.genetic import GeneticPlayer
-from castle.game import Game, Config
-from castle.trainer import Trainer
+from castle.game import Game, Config, env_values, read_config_file
+from castle.trainer import Trainer, PLAYER_TYPES
+from castle.sweep import load_spec, run_sweep
+from castle.kernels import BACKENDS, get_kernels
+from castle.benchmark import benchmark_kernels
+from castle.match_log import MatchLogReader
+from castle.offline import OfflineTrainer
+from castle.best_response import exploitability
+from castle.simulator import strategy_from_player
+from castle.distributed import run_worker
+from castle.checkpoint import load_elites
+from castle.serving import (
+    PolicyServer,
+    benchmark_serving,
+    compile_policy,
+    load_policy,
+    save_policy,
+)
+import os
+import asyncio
 import click
 import numpy as np
 import itertools
 import seaborn as sns
 import matplotlib.pyplot as plt
 
+# Config fields set by a hand-written option of the main command, by option
+OPTION_FIELDS = {
+    "num_matches": "num_matches",
+    "num_training_rounds": "num_training_rounds",
+    "early_stopping": "early_stopping",
+    "match_log": "match_log_path",
+}
+
+
+def config_options(command):
+    """
+    Add a --field-name option for every other Config field, typed after the
+    field's type hint. The options default to None, meaning "not given".
+    """
+    hints = typing.get_type_hints(Config)
+    for field in reversed(dataclasses.fields(Config)):
+        if not field.init or field.name in OPTION_FIELDS.values():
+            continue
+        option = "--" + field.name.replace("_", "-")
+        help_text = f"Config.{field.name} (default: {field.default})"
+        hint = hints[field.name]
+        if typing.get_origin(hint) is typing.Union:
+            hint = next(arg for arg in typing.get_args(hint) if arg is not type(None))
+        if hint is bool:
+            option = f"{option}/--no-{option[2:]}"
+            command = click.option(option, field.name, default=None, help=help_text)(
+                command
+            )
+        else:
+            click_type = {int: click.INT, float: click.FLOAT}.get(hint, click.STRING)
+            command = click.option(
+                option, field.name, type=click_type, default=None, help=help_text
+            )(command)
+    return command
+
+
+def load_config(ctx, config_file, values) -> Config:
+    """
+    Build the Config from, in increasing priority: the defaults of the
+    hand-written options, the config file, CASTLE_* environment variables and
+    the options given on the command line.
+    """
+    defaults = {}
+    given = {}
+    for name, value in values.items():
+        if value is None:
+            continue
+        source = ctx.get_parameter_source(name)
+        target = defaults if source == click.core.ParameterSource.DEFAULT else given
+        target[OPTION_FIELDS.get(name, name)] = value
+    file_values = read_config_file(config_file) if config_file else {}
+    return Config.from_dict({**defaults, **file_values, **env_values(), **given})
 
-@click.command()
+
+@click.group(invoke_without_command=True)
 @click.option(
     "--left-player",
-    type=click.Choice(["random", "reinforced", "genetic"]),
+    type=click.Choice(PLAYER_TYPES),
     default="random",
     help="Type of left player",
 )
 @click.option(
     "--right-player",
-    type=click.Choice(["random", "reinforced", "genetic"]),
+    type=click.Choice(PLAYER_TYPES),
     default="random",
     help="Type of right player",
 )
@@ -31,12 +104,36 @@ import matplotlib.pyplot as plt
     default=False,
     help="Whether to train the players before matches",
 )
-def main(left_player, right_player, num_matches, num_training_rounds, train):
-    config = Config(num_matches=num_matches, num_training_rounds=num_training_rounds)
+@click.option(
+    "--early-stopping/--no-early-stopping",
+    default=False,
+    help="Stop training once fitness, diversity and baseline win rate plateau",
+)
+@click.option(
+    "--match-log",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Append every training match to this memory-mappable log file",
+)
+@click.option(
+    "--config",
+    "config_file",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON or YAML file of Config values",
+)
+@config_options
+@click.pass_context
+def main(ctx, left_player, right_player, train, config_file, **config_values):
+    if ctx.invoked_subcommand is not None:
+        return
+
+    config = load_config(ctx, config_file, config_values)
     print(f"Number of castles: {config.num_castles}")
     print(f"Points per castle: {config.points_per_castle}")
     print(f"Armies per player: {config.armies_per_player}")
-    print(f"Number of training rounds: {num_training_rounds}")
+    print(f"Number of training rounds: {config.num_training_rounds}")
+    print(f"Kernel backend: {get_kernels(config.kernel_backend).name}")
 
     game = Game(config)
     trainer = Trainer(config, game, left_player, right_player)
@@ -66,11 +163,217 @@ def main(left_player, right_player, num_matches, num_training_rounds, train):
     print(
         f"\n{left_player.capitalize()} vs {right_player.capitalize()} ({config.num_matches} matches): {left_player.capitalize()} win percentage: {player1_win_percentage:.2f}%"
     )
+    for player_type, player in ((left_player, player1), (right_player, player2)):
+        print(
+            f"{player_type.capitalize()} Player exploitability: "
+            f"{exploitability(strategy_from_player(player), config):.2f} points"
+        )
     plot_training_results(
         training_data, left_player, right_player, player1_win_percentage
     )
 
 
+@main.command()
+@click.argument("spec", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--results",
+    default="output/sweep_results.csv",
+    help="CSV file the results are appended to; completed jobs in it are skipped",
+)
+@click.option(
+    "--workers", default=os.cpu_count(), help="Number of jobs run in parallel"
+)
+@click.option("--max-memory-mb", type=int, default=None, help="Memory limit per worker")
+@click.option("--max-seconds", type=int, default=None, help="CPU time limit per worker")
+def sweep(spec, results, workers, max_memory_mb, max_seconds):
+    """Run a grid or random hyperparameter sweep described by a JSON SPEC."""
+    run_sweep(load_spec(spec), results, workers, max_memory_mb, max_seconds)
+
+
+@main.command()
+@click.option(
+    "--backend",
+    type=click.Choice(BACKENDS),
+    default="auto",
+    help="Kernel backend to benchmark",
+)
+@click.option("--num-games", default=100000, help="Number of games to score")
+def benchmark(backend, num_games):
+    """Time the game and reinforcement kernels of a backend."""
+    config = Config(kernel_backend=backend)
+    results = benchmark_kernels(config, num_games=num_games)
+    print(f"Kernel backend: {results['backend']}")
+    print(f"Games scored per second: {results['games_scored_per_second']:,.0f}")
+    print(
+        f"Reinforced distribute+update per second: {results['reinforced_games_per_second']:,.0f}"
+    )
+
+
+@main.command("offline-train")
+@click.option(
+    "--log",
+    "log_path",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="Match log recorded with --match-log",
+)
+@click.option(
+    "--output",
+    default="output/offline_qmatrix.npy",
+    help="File the trained Q-matrix is checkpointed to",
+)
+@click.option("--epochs", default=1, help="Number of passes over the log")
+@click.option("--minibatch-size", default=256, help="Trajectories per Q-update")
+@click.option(
+    "--sampling",
+    type=click.Choice(["uniform", "sequential"]),
+    default="uniform",
+    help="Draw minibatches uniformly with replacement or in log order",
+)
+@click.option(
+    "--sides",
+    type=click.Choice(["left", "right", "both"]),
+    default="both",
+    help="Which players' allocations to learn from",
+)
+@click.option(
+    "--armies-per-player",
+    type=int,
+    default=None,
+    help="Armies per player of the logged games, for logs that do not record it",
+)
+def offline_train(
+    log_path, output, epochs, minibatch_size, sampling, sides, armies_per_player
+):
+    """Train a reinforced player from a recorded match log."""
+    reader = MatchLogReader(log_path)
+    if armies_per_player is None:
+        armies_per_player = reader.armies_per_player
+    if armies_per_player is None:
+        raise click.UsageError(
+            f"{log_path} does not record the armies per player; "
+            "pass --armies-per-player"
+        )
+    config = Config(
+        num_castles=reader.num_castles,
+        armies_per_player=armies_per_player,
+        offline_minibatch_size=minibatch_size,
+        offline_sampling=sampling,
+        offline_sides=sides,
+    )
+    print(f"Replaying {len(reader)} matches from {log_path}")
+    OfflineTrainer(config, reader).train(epochs=epochs, checkpoint_path=output)
+    print(f"Q-matrix written to {output}")
+
+
+@main.command()
+@click.option(
+    "--address",
+    required=True,
+    help='Coordinator address, "host:port" or "unix:/path/to/socket"',
+)
+@click.option(
+    "--retry-interval", default=1.0, help="Seconds between connection attempts"
+)
+@click.option(
+    "--max-failures",
+    type=int,
+    default=None,
+    help="Give up after this many failed connections in a row",
+)
+def worker(address, retry_interval, max_failures):
+    """Evaluate population shards for a training run with --distributed-address."""
+    print(f"Worker connecting to {address}")
+    evaluated = run_worker(address, retry_interval, max_failures)
+    print(f"Worker evaluated {evaluated} shards")
+
+
+@main.command("export-policy")
+@click.argument("checkpoint", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--output",
+    default="output/policy.npz",
+    help="File the compiled policy is written to",
+)
+@click.option(
+    "--bank-size", type=int, default=None, help="Allocations pre-sampled from genes"
+)
+def export_policy(checkpoint, output, bank_size):
+    """Compile a checkpointed *_elites.npz or *_qmatrix.npy for serving."""
+    config_path = os.path.join(os.path.dirname(checkpoint), "config.json")
+    config = Config.from_file(config_path) if os.path.exists(config_path) else None
+    if checkpoint.endswith(".npz"):
+        genes = load_elites(checkpoint)[0]
+        config = config or Config(num_castles=len(genes))
+        player = GeneticPlayer(config)
+        player.chromosome.genes = genes
+    else:
+        qmatrix = np.load(checkpoint)
+        config = config or Config(
+            num_castles=qmatrix.shape[1], armies_per_player=qmatrix.shape[0] - 1
+        )
+        player = ReinforcedPlayer(config)
+        player.set_qmatrix(qmatrix)
+    save_policy(output, compile_policy(player, bank_size))
+    print(f"Compiled {type(player).__name__} policy written to {output}")
+
+
+@main.command()
+@click.option(
+    "--policy",
+    "policies",
+    multiple=True,
+    required=True,
+    help="NAME=PATH of a compiled policy to serve, repeatable",
+)
+@click.option(
+    "--address",
+    default="127.0.0.1:7000",
+    help='Address to listen on, "host:port" or "unix:/path/to/socket"',
+)
+@click.option("--max-batch", default=65536, help="Most allocations per request")
+def serve(policies, address, max_batch):
+    """Serve allocations of compiled policies."""
+    server = PolicyServer(
+        {
+            name: load_policy(path)
+            for name, path in (policy.split("=", 1) for policy in policies)
+        },
+        max_batch,
+    )
+
+    async def run():
+        await server.start(address)
+        print(f"Serving {', '.join(server.policies)} on {address}")
+        await server.server.serve_forever()
+
+    asyncio.run(run())
+
+
+@main.command("benchmark-serving")
+@click.argument("policy", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--address",
+    default="127.0.0.1:7001",
+    help="Address of the temporary server",
+)
+@click.option("--requests", default=10000, help="Number of requests to send")
+@click.option("--batch-size", default=1, help="Allocations per request")
+@click.option("--concurrency", default=4, help="Number of concurrent clients")
+def benchmark_serving_command(policy, address, requests, batch_size, concurrency):
+    """Load-test a compiled policy in process and behind a local server."""
+    results = benchmark_serving(
+        load_policy(policy), address, requests, batch_size, concurrency
+    )
+    print(f"In process: {results['in_process_us_per_request']:.2f} us per request")
+    print(f"Server requests per second: {results['requests_per_second']:,.0f}")
+    print(f"Server allocations per second: {results['allocations_per_second']:,.0f}")
+    print(
+        f"Server latency: {results['mean_latency_us']:.0f} us mean, "
+        f"{results['p99_latency_us']:.0f} us p99"
+    )
+
+
 def plot_training_results(
     training_data, left_player, right_player, final_left_win_percentage
 ):
@@ -0,0 +1,339 @@
+import numpy as np
+from typing import Dict
+from players.player import Player
+from players.reinforcement import (
+    DISCOUNT_FACTOR,
+    normalize_rewards,
+    placement_counts,
+)
+from castle.game import Config
+
+# Features shared by all castles, before the one-hot castle indicator
+NUM_SHARED_FEATURES = 8
+# Initial Q-value weights of the castle value and placed share features
+PRIOR_VALUE_WEIGHT = 1.0
+PRIOR_SHARE_WEIGHT = -3.0
+
+
+def prior_weights(num_castles) -> np.ndarray:
+    """
+    Linear weights the Q-functions start from: the castle value minus a
+    multiple of the share already placed on it. Greedy placement then
+    spreads the armies roughly in proportion to castle value, a reasonable
+    policy to learn from instead of piling every army on one castle.
+    """
+    weights = np.zeros(NUM_SHARED_FEATURES + num_castles)
+    weights[2] = PRIOR_VALUE_WEIGHT
+    weights[3] = PRIOR_SHARE_WEIGHT
+    return weights
+
+
+def placement_features(armies_left, placed, castle_values, num_armies):
+    """
+    Features of placing the next army on each castle.
+
+    Args:
+        armies_left (np.ndarray): Armies still to place, shape (states,).
+        placed (np.ndarray): Armies already placed on each castle, shape
+            (states, castles).
+        castle_values (np.ndarray): Castle points scaled to at most 1.
+        num_armies (int): Armies per player.
+
+    Returns:
+        np.ndarray: Array of shape (states, castles, features): a bias, the
+        fraction of armies left, the castle value, the fraction of armies
+        already on the castle, their pairwise products, the squared placed
+        fraction, and a one-hot castle indicator.
+    """
+    placed = np.asarray(placed, dtype=float)
+    states, castles = placed.shape
+    left = (np.asarray(armies_left) / num_armies)[:, None]
+    share = placed / num_armies
+    features = np.zeros((states, castles, NUM_SHARED_FEATURES + castles))
+    features[..., 0] = 1
+    features[..., 1] = left
+    features[..., 2] = castle_values
+    features[..., 3] = share
+    features[..., 4] = left * castle_values
+    features[..., 5] = share * castle_values
+    features[..., 6] = share * left
+    features[..., 7] = share**2
+    features[:, np.arange(castles), NUM_SHARED_FEATURES + np.arange(castles)] = 1
+    return features
+
+
+class LinearQFunction:
+    """Q-values linear in the placement features."""
+
+    __slots__ = ("weights",)
+
+    def __init__(self, prior, rng):
+        self.weights = prior + rng.uniform(0, 0.01, len(prior))
+
+    def predict(self, features) -> np.ndarray:
+        return features @ self.weights
+
+    def update(self, features, errors, learning_rate):
+        """Semi-gradient step moving the predictions of `features` by `errors`."""
+        self.weights += learning_rate * errors @ features / len(errors)
+
+
+class MLPQFunction:
+    """
+    Q-values from a linear part plus a network with one tanh hidden layer.
+    The network's output starts close to 0, so initially the linear part
+    alone decides.
+    """
+
+    __slots__ = (
+        "linear_weights",
+        "hidden_weights",
+        "hidden_bias",
+        "output_weights",
+        "output_bias",
+    )
+
+    def __init__(self, prior, hidden_units, rng):
+        num_features = len(prior)
+        self.linear_weights = prior.copy()
+        self.hidden_weights = rng.normal(
+            0, 1 / np.sqrt(num_features), (num_features, hidden_units)
+        )
+        self.hidden_bias = np.zeros(hidden_units)
+        self.output_weights = rng.normal(0, 0.01, hidden_units)
+        self.output_bias = 0.0
+
+    def hidden(self, features) -> np.ndarray:
+        return np.tanh(features @ self.hidden_weights + self.hidden_bias)
+
+    def predict(self, features) -> np.ndarray:
+        return (
+            features @ self.linear_weights
+            + self.hidden(features) @ self.output_weights
+            + self.output_bias
+        )
+
+    def update(self, features, errors, learning_rate):
+        """Semi-gradient step moving the predictions of `features` by `errors`."""
+        hidden = self.hidden(features)
+        output_step = learning_rate * errors / len(errors)
+        hidden_step = np.outer(output_step, self.output_weights) * (1 - hidden**2)
+        self.linear_weights += output_step @ features
+        self.output_weights += output_step @ hidden
+        self.output_bias += output_step.sum()
+        self.hidden_weights += features.T @ hidden_step
+        self.hidden_bias += hidden_step.sum(axis=0)
+
+
+class ApproximatePlayer(Player):
+    """
+    Q-learner with a function approximation instead of a Q-table.
+
+    Like ReinforcedPlayer, it places armies one at a time epsilon-greedily,
+    but the Q-value of a placement is computed from features of the state
+    (see `placement_features`), so the number of parameters does not grow
+    with the number of armies and what is learned for one army count carries
+    over to its neighbours. Finished games are collected and learned from in
+    batches of `config.approximate_batch_size` trajectories.
+    """
+
+    __slots__ = (
+        "num_castles",
+        "num_armies",
+        "castle_values",
+        "qfunction",
+        "last_castles",
+        "sampled_castles",
+        "batch_castles",
+        "batch_rewards",
+    )
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self.num_castles = self.config.num_castles
+        self.num_armies = self.config.armies_per_player
+        points = np.array(
+            [
+                self.config.points_per_castle[castle]
+                for castle in sorted(self.config.points_per_castle)
+            ],
+            dtype=float,
+        )
+        self.castle_values = points / points.max()
+        prior = prior_weights(self.num_castles)
+        if self.config.approximate_model == "linear":
+            self.qfunction = LinearQFunction(prior, self.config.random_generator)
+        elif self.config.approximate_model == "mlp":
+            self.qfunction = MLPQFunction(
+                prior,
+                self.config.approximate_hidden_units,
+                self.config.random_generator,
+            )
+        else:
+            raise ValueError(
+                f"Invalid approximate model: {self.config.approximate_model}"
+            )
+        # 0-based castle of every placement of the last distribution
+        self.last_castles = np.empty(0, dtype=int)
+        # 0-based castles of every placement of the last sample_allocations
+        self.sampled_castles = np.empty((0, self.num_armies), dtype=int)
+        # Trajectories and rewards waiting for the next batched update
+        self.batch_castles = []
+        self.batch_rewards = []
+
+    def trajectory_features(self, castles) -> np.ndarray:
+        """
+        Placement features of every step of a batch of trajectories.
+
+        Args:
+            castles (np.ndarray): 0-based castles, shape (trajectories, steps).
+
+        Returns:
+            np.ndarray: Array of shape (trajectories, steps, castles, features).
+        """
+        trajectories, steps = castles.shape
+        one_hot = np.eye(self.num_castles)[castles]
+        placed = np.cumsum(one_hot, axis=1) - one_hot
+        armies_left = np.tile(np.arange(steps, 0, -1), trajectories)
+        features = placement_features(
+            armies_left,
+            placed.reshape(-1, self.num_castles),
+            self.castle_values,
+            self.num_armies,
+        )
+        return features.reshape(trajectories, steps, self.num_castles, -1)
+
+    def train_batch(self, castles, rewards, learning_rate):
+        """
+        One Q-learning step on a batch of trajectories. As in
+        `batch_q_update`, every placement is moved towards the normalized
+        reward plus the discounted best value of the next placement, with
+        all targets computed before the update.
+
+        Args:
+            castles (np.ndarray): 0-based castles, shape (trajectories, steps).
+            rewards (np.ndarray): Normalized reward of every trajectory.
+            learning_rate (float): Step size of the update.
+        """
+        castles = np.asarray(castles)
+        trajectories, steps = castles.shape
+        features = self.trajectory_features(castles)
+        num_features = features.shape[-1]
+        qvalues = self.qfunction.predict(features.reshape(-1, num_features)).reshape(
+            trajectories, steps, self.num_castles
+        )
+        next_max_q = np.zeros((trajectories, steps))
+        next_max_q[:, :-1] = qvalues[:, 1:].max(axis=2)
+
+        placements = np.arange(trajectories * steps)
+        chosen = castles.ravel()
+        current_q = qvalues.reshape(-1, self.num_castles)[placements, chosen]
+        errors = (
+            np.repeat(rewards, steps) + DISCOUNT_FACTOR * next_max_q.ravel() - current_q
+        )
+        self.qfunction.update(
+            features.reshape(-1, self.num_castles, num_features)[placements, chosen],
+            errors,
+            learning_rate,
+        )
+
+    def update(self, reward: float, training_progress: float):
+        """
+        Queue the last trajectory with its reward and learn from the queued
+        trajectories once a batch is full.
+        """
+        if len(self.last_castles) == 0:
+            return
+        self.batch_castles.append(self.last_castles)
+        self.batch_rewards.append(reward)
+        self.last_castles = np.empty(0, dtype=int)
+        if len(self.batch_castles) < self.config.approximate_batch_size:
+            return
+        learning_rate = self.config.approximate_learning_rate * (1 - training_progress)
+        self.train_batch(
+            np.array(self.batch_castles),
+            normalize_rewards(self.batch_rewards, self.config),
+            learning_rate,
+        )
+        self.batch_castles = []
+        self.batch_rewards = []
+
+    def update_batch(self, allocations, rewards, training_progress: float):
+        """
+        Queue a batch of trajectories with their rewards and learn from all
+        queued trajectories in one step once a batch is full. Placements
+        recorded by the last `sample_allocations` are used when they belong
+        to these allocations; others are not learned from, as the order of
+        their placements is unknown.
+        """
+        castles = self.sampled_castles
+        self.sampled_castles = np.empty((0, self.num_armies), dtype=int)
+        if len(castles) != len(allocations) or not np.array_equal(
+            placement_counts(castles, self.num_castles), allocations
+        ):
+            return
+        self.batch_castles.extend(castles)
+        self.batch_rewards.extend(rewards)
+        if len(self.batch_castles) < self.config.approximate_batch_size:
+            return
+        learning_rate = self.config.approximate_learning_rate * (1 - training_progress)
+        self.train_batch(
+            np.array(self.batch_castles),
+            normalize_rewards(self.batch_rewards, self.config),
+            learning_rate,
+        )
+        self.batch_castles = []
+        self.batch_rewards = []
+
+    def sample_allocations(self, count: int) -> np.ndarray:
+        """
+        Draw `count` epsilon-greedy distributions at once, placing the same
+        army of all of them in one step. The placements are kept for
+        `update_batch`.
+        """
+        rng = self.config.random_generator
+        explore = rng.random((count, self.num_armies)) < self.config.epsilon
+        random_castles = rng.integers(self.num_castles, size=(count, self.num_armies))
+        placed = np.zeros((count, self.num_castles), dtype=int)
+        castles = np.empty((count, self.num_armies), dtype=int)
+        rows = np.arange(count)
+        for step in range(self.num_armies):
+            features = placement_features(
+                np.full(count, self.num_armies - step),
+                placed,
+                self.castle_values,
+                self.num_armies,
+            )
+            greedy = np.argmax(self.qfunction.predict(features), axis=1)
+            castles[:, step] = np.where(
+                explore[:, step], random_castles[:, step], greedy
+            )
+            placed[rows, castles[:, step]] += 1
+        self.sampled_castles = castles
+        return placed
+
+    def distribute_armies(self) -> Dict[int, int]:
+        explore = (
+            self.config.random_generator.random(self.num_armies) < self.config.epsilon
+        )
+        random_castles = self.config.random_generator.integers(
+            self.num_castles, size=self.num_armies
+        )
+        placed = np.zeros(self.num_castles, dtype=int)
+        castles = np.empty(self.num_armies, dtype=int)
+        for step in range(self.num_armies):
+            if explore[step]:
+                castle = random_castles[step]
+            else:
+                features = placement_features(
+                    [self.num_armies - step],
+                    placed[None, :],
+                    self.castle_values,
+                    self.num_armies,
+                )
+                castle = np.argmax(self.qfunction.predict(features[0]))
+            castles[step] = castle
+            placed[castle] += 1
+
+        self.last_castles = castles
+        return {castle: int(armies) for castle, armies in enumerate(placed, start=1)}
@@ -1,18 +1,86 @@
 import numpy as np
 import copy
 from castle.game import Config
+from .player import SharedConfigCopy
+from .operators import crossover_genes, gaussian_mutation, mutate_genes, swap_mutation
+
+
+class Chromosome(SharedConfigCopy):
+    __slots__ = (
+        "config",
+        "num_castles",
+        "_genes",
+        "_bank",
+        "_bank_index",
+        "_bank_armies",
+        "_validated",
+        "version",
+    )
 
-
-class Chromosome:
     def __init__(self, config: Config):
         self.config = config
         self.num_castles = config.num_castles
-        self.genes = [
-            self.config.random_generator.random()
-            for _ in range(self.config.num_castles)
-        ]
+        self._bank = None
+        self._bank_index = 0
+        self._bank_armies = None
+        self._validated = False
+        # Incremented on every change of the genes, see DistanceCache
+        self.version = 0
+        self.genes = self.config.random_generator.random(self.config.num_castles)
         self.normalize()
 
+    @property
+    def genes(self):
+        return self._genes
+
+    @genes.setter
+    def genes(self, genes):
+        self._genes = genes
+        self.invalidate()
+
+    def __copy__(self):
+        new = super().__copy__()
+        new._bank = None
+        return new
+
+    def __deepcopy__(self, memo):
+        # The bank of pre-drawn allocations is not copied, so a copy draws
+        # its own allocations instead of replaying the original's
+        new = super().__deepcopy__(memo)
+        new._bank = None
+        return new
+
+    def invalidate(self):
+        """
+        Forget the cached validation and the pre-drawn allocations.
+
+        Assigning to `genes` does this automatically; call it explicitly after
+        modifying the gene array in place.
+        """
+        self._validated = False
+        self._bank = None
+        self._bank_index = 0
+        self.version += 1
+
+    def validated_genes(self) -> np.ndarray:
+        """
+        Return the normalized genes, normalizing and validating them only when
+        they changed since the last call.
+        """
+        if not self._validated:
+            # Ensure genes are valid probabilities
+            self.normalize()
+
+            # Check for any remaining issues
+            if (
+                np.any(np.isnan(self.genes))
+                or np.any(self.genes < 0)
+                or np.any(self.genes > 1)
+            ):
+                raise ValueError("Invalid gene values detected after normalization")
+            self._validated = True
+        return self._genes
+
     def normalize(self):
         """Normalize the genes to ensure they sum to 1 and are valid probabilities."""
         self.genes = np.clip(self.genes, 0, None)  # Ensure all values are non-negative
@@ -25,48 +93,72 @@ class Chromosome:
 
     def point_mutation(self, mutation_rate: float):
         """Perform point mutations on the chromosome."""
-        for i in range(self.num_castles):
-            if self.config.random_generator.random() < mutation_rate:
-                self.genes[i] += self.config.random_generator.normal(
-                    0, self.config.mutation_std_dev
-                )
-        self.normalize()
+        self.genes = gaussian_mutation(
+            self.genes[None, :],
+            self.config.random_generator,
+            mutation_rate,
+            self.config.mutation_std_dev,
+        )[0]
 
     def swap_mutation(self, swap_probability: float):
         """Swap entire regions of the chromosome."""
-        if self.config.random_generator.random() < swap_probability:
-            idx1, idx2 = self.config.random_generator.choice(
-                self.num_castles, size=2, replace=False
-            )
-            self.genes[idx1], self.genes[idx2] = self.genes[idx2], self.genes[idx1]
+        self.genes = swap_mutation(
+            self.genes[None, :], self.config.random_generator, swap_probability
+        )[0]
 
-    def mutate(self):
-        """Perform both point mutations and region swaps."""
-        self.point_mutation(self.config.point_mutation_rate)
-        self.swap_mutation(self.config.swap_probability)
+    def mutate(self, mutation_rate=None, mutation_amount=None):
+        """
+        Apply the mutation operators selected by `config.mutation_operators`.
+
+        Args:
+            mutation_rate (float): Per-gene probability of a point mutation,
+                defaults to `config.point_mutation_rate`.
+            mutation_amount (float): Standard deviation of a point mutation,
+                defaults to `config.mutation_std_dev`.
+        """
+        self.genes = mutate_genes(
+            self.genes[None, :], self.config, mutation_rate, mutation_amount
+        )[0]
 
     def get_distribution(self, total_armies: int) -> np.ndarray:
         """
         Get the distribution of armies based on the chromosome.
 
+        Allocations are drawn in bulk into a bank of `config.sample_bank_size`
+        rows, so most calls only advance an index into the bank. The bank is
+        discarded whenever the genes change.
+
         Args:
             total_armies (int): Total number of armies to distribute.
 
         Returns:
             np.ndarray: Array of integers representing the army distribution.
         """
-        # Ensure genes are valid probabilities
-        self.normalize()
-
-        # Check for any remaining issues
         if (
-            np.any(np.isnan(self.genes))
-            or np.any(self.genes < 0)
-            or np.any(self.genes > 1)
+            self._bank is None
+            or self._bank_index >= len(self._bank)
+            or self._bank_armies != total_armies
         ):
-            raise ValueError("Invalid gene values detected after normalization")
+            self._bank = self.get_distributions(
+                total_armies, self.config.sample_bank_size
+            )
+            self._bank_index = 0
+            self._bank_armies = total_armies
+
+        distribution = self._bank[self._bank_index]
+        self._bank_index += 1
+        return distribution
+
+    def get_distributions(self, total_armies: int, count: int) -> np.ndarray:
+        """
+        Draw several army distributions in a single multinomial call.
 
-        return self.config.random_generator.multinomial(total_armies, self.genes)
+        Returns:
+            np.ndarray: Array of shape (count, num_castles).
+        """
+        return self.config.random_generator.multinomial(
+            total_armies, self.validated_genes(), size=count
+        )
 
     def __str__(self):
         return f"Chromosome(genes={self.genes})"
@@ -84,33 +176,9 @@ class Chromosome:
         # Ensure both chromosomes have the same length
         assert len(self.genes) == len(other.genes)
 
-        # Choose a random crossover point
-        crossover_point = self.config.random_generator.integers(1, len(self.genes))
-
-        # Create a new chromosome
         new_chromosome = copy.deepcopy(self)
-
-        # Perform crossover
-        new_chromosome.genes = np.concatenate(
-            [self.genes[:crossover_point], other.genes[crossover_point:]]
-        )
-
-        # Normalize the new chromosome
-        new_chromosome.normalize()
+        new_chromosome.genes = crossover_genes(
+            self.genes[None, :], other.genes[None, :], self.config
+        )[0]
 
         return new_chromosome
-
-    def mutate(self, mutation_rate=0.1, mutation_amount=0.1):
-        """Perform both point mutations and region swaps."""
-        mask = np.random.random(self.genes.shape) < mutation_rate
-        mutation = np.random.normal(0, mutation_amount, self.genes.shape)
-        self.genes[mask] += mutation[mask]
-        self.genes = np.clip(self.genes, 0, 1)
-        self.genes /= self.genes.sum()
-
-        # Ensure at least one gene is mutated
-        if not np.any(mask):
-            index = np.random.randint(0, len(self.genes))
-            self.genes[index] += np.random.normal(0, mutation_amount)
-            self.genes = np.clip(self.genes, 0, 1)
-            self.genes /= self.genes.sum()
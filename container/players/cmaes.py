@@ -0,0 +1,155 @@
+import numpy as np
+from castle.game import Config
+from castle.rating import initial_rating
+from .genetic import GeneticPlayer
+
+
+def softmax_rows(logits) -> np.ndarray:
+    """Row-wise softmax of a logit matrix."""
+    logits = np.asarray(logits, dtype=float)
+    exponentials = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exponentials / exponentials.sum(axis=1, keepdims=True)
+
+
+class CMAES:
+    """
+    Covariance matrix adaptation evolution strategy over allocation logits.
+
+    Candidates are drawn from a multivariate normal distribution in logit
+    space; their genes are the softmax of the logits, so every candidate is a
+    valid allocation distribution without clipping or renormalizing. After
+    each generation the better half of the candidates moves the mean, and
+    the covariance and step size adapt to the successful steps. Sampling,
+    ranking and the covariance update are matrix operations over the whole
+    population. Parameters follow Hansen's defaults for the given
+    population size.
+    """
+
+    def __init__(self, config: Config, population_size):
+        self.config = config
+        dimension = config.num_castles
+        self.dimension = dimension
+        self.population_size = population_size
+        self.parents = max(1, population_size // 2)
+        weights = np.log(self.parents + 0.5) - np.log(np.arange(1, self.parents + 1))
+        self.weights = weights / weights.sum()
+        self.mu_eff = 1 / np.sum(self.weights**2)
+
+        self.c_sigma = (self.mu_eff + 2) / (dimension + self.mu_eff + 5)
+        self.d_sigma = (
+            1
+            + 2 * max(0, np.sqrt((self.mu_eff - 1) / (dimension + 1)) - 1)
+            + self.c_sigma
+        )
+        self.c_c = (4 + self.mu_eff / dimension) / (
+            dimension + 4 + 2 * self.mu_eff / dimension
+        )
+        self.c_1 = 2 / ((dimension + 1.3) ** 2 + self.mu_eff)
+        self.c_mu = min(
+            1 - self.c_1,
+            2
+            * (self.mu_eff - 2 + 1 / self.mu_eff)
+            / ((dimension + 2) ** 2 + self.mu_eff),
+        )
+        self.chi_n = np.sqrt(dimension) * (
+            1 - 1 / (4 * dimension) + 1 / (21 * dimension**2)
+        )
+
+        self.mean = np.zeros(dimension)
+        self.sigma = config.cmaes_sigma
+        self.covariance = np.eye(dimension)
+        self.eigenvectors = np.eye(dimension)
+        self.eigenvalues = np.ones(dimension)
+        self.path_sigma = np.zeros(dimension)
+        self.path_c = np.zeros(dimension)
+        self.generation = 0
+
+    def ask(self, count) -> np.ndarray:
+        """
+        Draw `count` candidate logit vectors.
+
+        Returns:
+            np.ndarray: Logits of shape (count, castles).
+        """
+        normal = self.config.random_generator.standard_normal((count, self.dimension))
+        steps = (normal * np.sqrt(self.eigenvalues)) @ self.eigenvectors.T
+        return self.mean + self.sigma * steps
+
+    def tell(self, logits, fitness):
+        """
+        Update the distribution from evaluated candidates.
+
+        Args:
+            logits (np.ndarray): Candidate logits of shape (candidates, castles).
+            fitness (np.ndarray): Fitness per candidate, higher is better.
+        """
+        logits = np.asarray(logits, dtype=float)
+        order = np.argsort(-np.asarray(fitness), kind="stable")[: self.parents]
+        weights = self.weights[: len(order)] / self.weights[: len(order)].sum()
+        steps = (logits[order] - self.mean) / self.sigma
+        mean_step = weights @ steps
+        self.mean = self.mean + self.sigma * mean_step
+
+        inverse_sqrt = (
+            self.eigenvectors / np.sqrt(self.eigenvalues)
+        ) @ self.eigenvectors.T
+        self.path_sigma = (1 - self.c_sigma) * self.path_sigma + np.sqrt(
+            self.c_sigma * (2 - self.c_sigma) * self.mu_eff
+        ) * (inverse_sqrt @ mean_step)
+        self.generation += 1
+        path_norm = np.linalg.norm(self.path_sigma)
+        # The evolution path of the covariance stalls while the step size path
+        # is unusually long, e.g. right after a large change of the step size
+        short_path = (
+            path_norm / np.sqrt(1 - (1 - self.c_sigma) ** (2 * self.generation))
+            < (1.4 + 2 / (self.dimension + 1)) * self.chi_n
+        )
+        self.path_c = (1 - self.c_c) * self.path_c + short_path * np.sqrt(
+            self.c_c * (2 - self.c_c) * self.mu_eff
+        ) * mean_step
+
+        rank_one = (
+            np.outer(self.path_c, self.path_c)
+            + (1 - short_path) * self.c_c * (2 - self.c_c) * self.covariance
+        )
+        rank_mu = np.einsum("i,ij,ik->jk", weights, steps, steps)
+        self.covariance = (
+            (1 - self.c_1 - self.c_mu) * self.covariance
+            + self.c_1 * rank_one
+            + self.c_mu * rank_mu
+        )
+        self.sigma *= np.exp(
+            (self.c_sigma / self.d_sigma) * (path_norm / self.chi_n - 1)
+        )
+
+        self.covariance = (self.covariance + self.covariance.T) / 2
+        eigenvalues, self.eigenvectors = np.linalg.eigh(self.covariance)
+        self.eigenvalues = np.maximum(eigenvalues, 1e-20)
+
+    def mean_genes(self) -> np.ndarray:
+        """The genes of the distribution's mean."""
+        return softmax_rows(self.mean[None, :])[0]
+
+
+class CMAESPlayer(GeneticPlayer):
+    """
+    A GeneticPlayer whose genes are the softmax of logits drawn by CMAES.
+    The trainer evolves populations of these with CMAES instead of
+    crossover and mutation.
+    """
+
+    __slots__ = ("logits",)
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        self.set_logits(np.zeros(config.num_castles))
+
+    def set_logits(self, logits):
+        """
+        Replace the logits and the genes derived from them, forgetting
+        rewards and rating.
+        """
+        self.logits = np.asarray(logits, dtype=float)
+        self.chromosome.genes = softmax_rows(self.logits[None, :])[0]
+        self.rewards = []
+        self.rating = initial_rating(self.config)
@@ -0,0 +1,73 @@
+from typing import Dict
+import numpy as np
+from castle.game import Config
+from .player import Player
+
+
+class EquilibriumPlayer(Player):
+    """
+    Plays a mixed strategy over a fixed set of allocations.
+
+    A fresh player mixes uniformly over randomly drawn allocations; the
+    equilibrium solver replaces the set and its weights with an approximate
+    Nash equilibrium of the game restricted to that set.
+    """
+
+    __slots__ = ("strategies", "weights")
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        num_castles = config.num_castles
+        genes = config.random_generator.dirichlet(
+            np.ones(num_castles), size=config.equilibrium_strategies
+        )
+        self.strategies = np.array(
+            [
+                config.random_generator.multinomial(config.armies_per_player, p)
+                for p in genes
+            ]
+        )
+        self.weights = np.full(len(self.strategies), 1 / len(self.strategies))
+
+    def set_strategy(self, strategies, weights):
+        """
+        Replace the mixed strategy, dropping allocations without weight.
+
+        Args:
+            strategies (np.ndarray): Allocations of shape (k, num_castles).
+            weights (np.ndarray): Probability of playing each allocation.
+        """
+        weights = np.asarray(weights, dtype=float)
+        keep = weights > 0
+        self.strategies = np.asarray(strategies)[keep]
+        self.weights = weights[keep] / weights[keep].sum()
+
+    def sample_allocations(self, count: int) -> np.ndarray:
+        indices = self.config.random_generator.choice(
+            len(self.strategies), size=count, p=self.weights
+        )
+        return self.strategies[indices]
+
+    def distribute_armies(self) -> Dict[int, int]:
+        """
+        Draw one allocation from the mixed strategy.
+
+        Returns:
+            Dict[int, int]: A dictionary where keys are castle numbers
+            and values are the number of armies placed in each castle.
+        """
+        allocation = self.sample_allocations(1)[0]
+        return {castle: int(armies) for castle, armies in enumerate(allocation, 1)}
+
+    def update(self, reward: float, training_progress: float):
+        """
+        The mixed strategy is computed by the solver, not learned from games.
+
+        Args:
+            reward (float): The reward received for the last action.
+            training_progress (float): The current training progress.
+        """
+        pass
+
+    def __str__(self):
+        return f"EquilibriumPlayer(strategies={len(self.strategies)})"
@@ -1,11 +1,15 @@
 from typing import Dict
+import numpy as np
 from castle.game import Config
+from castle.rating import rating_score
 from .player import FitnessPlayer
 from .chromosome import Chromosome
 import copy
 
 
 class GeneticPlayer(FitnessPlayer):
+    __slots__ = ("chromosome", "rewards")
+
     def __init__(self, config: Config):
         super().__init__(config)
         self.config = config
@@ -23,7 +27,13 @@ class GeneticPlayer(FitnessPlayer):
         distribution_array = self.chromosome.get_distribution(
             self.config.armies_per_player
         )
-        return {castle: int(armies) for castle, armies in enumerate(distribution_array)}
+        return {
+            castle: int(armies)
+            for castle, armies in enumerate(distribution_array, start=1)
+        }
+
+    def sample_allocations(self, count: int) -> np.ndarray:
+        return self.chromosome.get_distributions(self.config.armies_per_player, count)
 
     def update(self, reward: float, training_progress: float):
         """
@@ -39,9 +49,12 @@ class GeneticPlayer(FitnessPlayer):
             adjusted_reward = reward + self.config.reinforced_lose_penalty
         else:
             adjusted_reward = reward
+        if self.config.rating_fitness:
+            # The trainer rates the matches; no reward history is kept
+            return
         self.rewards.append(adjusted_reward)  # Store the adjusted reward
 
-    def mutate(self, mutation_rate=0.1, mutation_amount=0.1):
+    def mutate(self, mutation_rate=None, mutation_amount=None):
         self.chromosome.mutate(mutation_rate, mutation_amount)
 
     def __str__(self):
@@ -50,6 +63,10 @@ class GeneticPlayer(FitnessPlayer):
     def copy(self):
         new_player = copy.deepcopy(self)
         new_player.rewards = []  # Reset rewards for the new copy
+        # Offspring start from the parent's rating, with a new player's doubt
+        new_player.rating = np.array(
+            [self.rating[0], self.config.rating_initial_deviation**2]
+        )
         return new_player
 
     def get_average_reward(self):
@@ -79,8 +96,11 @@ class GeneticPlayer(FitnessPlayer):
         Calculate and return the fitness of the player.
 
         Returns:
-            float: The calculated fitness score.
+            float: The calculated fitness score, the conservative rating
+            when `config.rating_fitness` is set.
         """
+        if self.config.rating_fitness:
+            return rating_score(self.rating, self.config)
         recent_performance = self.get_recent_performance()
         win_ratio = (
             sum(1 for r in self.rewards if r > 0) / len(self.rewards)
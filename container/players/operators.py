@@ -0,0 +1,147 @@
+import numpy as np
+
+# Genetic operators on gene matrices of shape (chromosomes, castles). A single
+# chromosome is a matrix with one row, so individual and batched evolution
+# share the same code. All randomness comes from the generator passed in.
+
+
+def normalize_rows(genes) -> np.ndarray:
+    """
+    Clip genes at zero and scale every row to sum to 1. Rows without any
+    positive gene become uniform.
+    """
+    genes = np.clip(np.asarray(genes, dtype=float), 0, None)
+    totals = genes.sum(axis=1, keepdims=True)
+    uniform = np.full_like(genes, 1.0 / genes.shape[1])
+    return np.divide(genes, totals, out=uniform, where=totals > 0)
+
+
+def gaussian_mutation(genes, rng, mutation_rate, mutation_amount) -> np.ndarray:
+    """
+    Add normal noise to each gene with probability `mutation_rate`. Rows in
+    which no gene was selected get one random gene mutated, so every
+    offspring differs from its parent.
+    """
+    rows, castles = genes.shape
+    mask = rng.random((rows, castles)) < mutation_rate
+    unmutated = ~mask.any(axis=1)
+    mask[np.flatnonzero(unmutated), rng.integers(castles, size=unmutated.sum())] = True
+    noise = rng.normal(0, mutation_amount, (rows, castles))
+    return normalize_rows(genes + noise * mask)
+
+
+def swap_mutation(genes, rng, swap_probability) -> np.ndarray:
+    """Swap two distinct genes in each row with probability `swap_probability`."""
+    rows, castles = genes.shape
+    genes = genes.copy()
+    swapped = np.flatnonzero(rng.random(rows) < swap_probability)
+    first = rng.integers(castles, size=len(swapped))
+    # An offset in [1, castles) guarantees the second gene is a different one
+    second = (first + rng.integers(1, castles, size=len(swapped))) % castles
+    genes[swapped, first], genes[swapped, second] = (
+        genes[swapped, second],
+        genes[swapped, first],
+    )
+    return genes
+
+
+def dirichlet_mutation(genes, rng, probability, concentration) -> np.ndarray:
+    """
+    With probability `probability`, resample a row from a Dirichlet
+    distribution centred on it. A higher `concentration` keeps the sample
+    closer to the original genes.
+    """
+    genes = genes.copy()
+    resampled = np.flatnonzero(rng.random(len(genes)) < probability)
+    if len(resampled):
+        # Gamma draws normalized per row are Dirichlet samples, for all rows at once
+        alphas = genes[resampled] * concentration + 1e-3
+        genes[resampled] = normalize_rows(rng.gamma(alphas))
+    return genes
+
+
+def single_point_crossover(genes1, genes2, rng) -> np.ndarray:
+    """Take the genes before a random point from the first parent."""
+    rows, castles = genes1.shape
+    points = rng.integers(1, castles, size=(rows, 1))
+    return np.where(np.arange(castles) < points, genes1, genes2)
+
+
+def uniform_crossover(genes1, genes2, rng) -> np.ndarray:
+    """Take each gene from either parent with equal probability."""
+    return np.where(rng.random(genes1.shape) < 0.5, genes1, genes2)
+
+
+def blend_crossover(genes1, genes2, rng) -> np.ndarray:
+    """Interpolate between the parents with a random weight per row."""
+    weights = rng.random((len(genes1), 1))
+    return weights * genes1 + (1 - weights) * genes2
+
+
+MUTATION_OPERATORS = {
+    "gaussian": lambda genes, config, rate, amount: gaussian_mutation(
+        genes, config.random_generator, rate, amount
+    ),
+    "swap": lambda genes, config, rate, amount: swap_mutation(
+        genes, config.random_generator, config.swap_probability
+    ),
+    "dirichlet": lambda genes, config, rate, amount: dirichlet_mutation(
+        genes,
+        config.random_generator,
+        config.dirichlet_probability,
+        config.dirichlet_concentration,
+    ),
+}
+
+CROSSOVER_OPERATORS = {
+    "single_point": single_point_crossover,
+    "uniform": uniform_crossover,
+    "blend": blend_crossover,
+}
+
+
+def mutate_genes(genes, config, mutation_rate=None, mutation_amount=None):
+    """
+    Apply the operators of `config.mutation_operators` in order.
+
+    Args:
+        genes (np.ndarray): Gene matrix of shape (chromosomes, castles).
+        config (Config): Selects the operators and their parameters.
+        mutation_rate (float): Per-gene probability of a gaussian mutation,
+            defaults to `config.point_mutation_rate`.
+        mutation_amount (float): Standard deviation of a gaussian mutation,
+            defaults to `config.mutation_std_dev`.
+
+    Returns:
+        np.ndarray: The mutated, normalized gene matrix.
+
+    Raises:
+        ValueError: If an operator is unknown.
+    """
+    if mutation_rate is None:
+        mutation_rate = config.point_mutation_rate
+    if mutation_amount is None:
+        mutation_amount = config.mutation_std_dev
+    genes = np.asarray(genes, dtype=float)
+    for name in config.mutation_operators:
+        if name not in MUTATION_OPERATORS:
+            raise ValueError(f"Invalid mutation operator: {name}")
+        genes = MUTATION_OPERATORS[name](genes, config, mutation_rate, mutation_amount)
+    return normalize_rows(genes)
+
+
+def crossover_genes(genes1, genes2, config) -> np.ndarray:
+    """
+    Combine two gene matrices row by row with `config.crossover_operator`.
+
+    Raises:
+        ValueError: If the operator is unknown.
+    """
+    if config.crossover_operator not in CROSSOVER_OPERATORS:
+        raise ValueError(f"Invalid crossover operator: {config.crossover_operator}")
+    offspring = CROSSOVER_OPERATORS[config.crossover_operator](
+        np.asarray(genes1, dtype=float),
+        np.asarray(genes2, dtype=float),
+        config.random_generator,
+    )
+    return normalize_rows(offspring)
@@ -1,11 +1,71 @@
 from abc import ABC, abstractmethod
+import copy
+import functools
 from typing import Dict
+import numpy as np
 from castle.game import Config
+from castle.rating import initial_rating
 
 
-class Player(ABC):
+@functools.lru_cache(maxsize=None)
+def slot_names(cls):
+    """Names of all instance attributes declared in `__slots__` of a class hierarchy."""
+    names = []
+    for klass in reversed(cls.__mro__):
+        slots = klass.__dict__.get("__slots__", ())
+        names.extend([slots] if isinstance(slots, str) else slots)
+    return tuple(name for name in names if name not in ("__dict__", "__weakref__"))
+
+
+def slot_state(obj):
+    """The set slots of an object as a dict."""
+    return {
+        name: getattr(obj, name) for name in slot_names(type(obj)) if hasattr(obj, name)
+    }
+
+
+def restore_slots(cls, state):
+    """Create an instance of `cls` from a slot state without calling __init__."""
+    obj = cls.__new__(cls)
+    for name, value in state.items():
+        setattr(obj, name, value)
+    return obj
+
+
+class SharedConfigCopy:
+    """
+    Copying and pickling for slotted classes that hold a Config.
+
+    Copies share the config (and with it the random generator) by reference
+    instead of deep-copying it, and only the object's own arrays are copied.
+    Pickling a whole population stores the shared config once, since pickle
+    memoizes objects that are referenced repeatedly.
+    """
+
+    __slots__ = ()
+
+    def __copy__(self):
+        return restore_slots(type(self), slot_state(self))
+
+    def __deepcopy__(self, memo):
+        new = type(self).__new__(type(self))
+        memo[id(self)] = new
+        memo[id(self.config)] = self.config
+        for name, value in slot_state(self).items():
+            setattr(new, name, copy.deepcopy(value, memo))
+        return new
+
+    def __reduce__(self):
+        return restore_slots, (type(self), slot_state(self))
+
+
+class Player(SharedConfigCopy, ABC):
+    __slots__ = ("config", "last_distribution", "rating")
+
     def __init__(self, config: Config):
         self.config = config
+        # [mean, variance] of the Glicko rating, see castle.rating
+        self.rating = initial_rating(config)
 
     @abstractmethod
     def distribute_armies(self) -> Dict[int, int]:
@@ -29,6 +89,21 @@ class Player(ABC):
         """
         pass
 
+    def update_batch(self, allocations, rewards, training_progress: float):
+        """
+        Update the player from a batch of matches played with allocations
+        from `sample_allocations`. By default every reward is applied as a
+        separate update.
+
+        Args:
+            allocations (np.ndarray): The player's allocations, shape
+                (matches, num_castles).
+            rewards (np.ndarray): The reward of every match.
+            training_progress (float): The current progress of training.
+        """
+        for reward in rewards:
+            self.update(reward, training_progress=training_progress)
+
     def sanitize_distribute_armies(self) -> Dict[int, int]:
         """
         Sanitize the army distribution to ensure it adheres to the total number of armies
@@ -54,8 +129,25 @@ class Player(ABC):
         self.last_distribution = sanitized
         return sanitized
 
+    def sample_allocations(self, count: int) -> np.ndarray:
+        """
+        Draw several allocations at once for batched scoring.
+
+        Returns:
+            np.ndarray: Integer array of shape (count, num_castles) where column
+            i holds the armies placed in castle i + 1.
+        """
+        castles = sorted(self.config.points_per_castle)
+        allocations = np.zeros((count, len(castles)), dtype=int)
+        for row in range(count):
+            distribution = self.sanitize_distribute_armies()
+            allocations[row] = [distribution.get(castle, 0) for castle in castles]
+        return allocations
+
 
 class FitnessPlayer(Player):
+    __slots__ = ()
+
     @abstractmethod
     def fitness(self) -> float:
         """
@@ -68,6 +160,8 @@ class FitnessPlayer(Player):
 
 
 class RandomPlayer(Player):
+    __slots__ = ()
+
     def distribute_armies(self) -> Dict[int, int]:
         """
         Distribute armies randomly among castles using the config's random generator.
@@ -93,6 +187,12 @@ class RandomPlayer(Player):
 
         return distribution
 
+    def sample_allocations(self, count: int) -> np.ndarray:
+        num_castles = len(self.config.points_per_castle)
+        return self.config.random_generator.multinomial(
+            self.config.armies_per_player, [1 / num_castles] * num_castles, size=count
+        )
+
     def update(self, reward: float, training_progress: float):
         """
         A dummy update method that does nothing.
@@ -102,3 +202,6 @@ class RandomPlayer(Player):
             training_progress (float): The current training progress.
         """
         pass
+
+    def update_batch(self, allocations, rewards, training_progress: float):
+        pass
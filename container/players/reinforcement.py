@@ -1,10 +1,114 @@
+import os
 import numpy as np
 from typing import Dict
 from players.player import Player
 from castle.game import Config
+from castle.kernels import get_kernels
+from castle.checkpoint import load_qmatrix
+
+# Discount of the next placement's value in the Q-learning target
+DISCOUNT_FACTOR = 0.9
+
+
+def normalize_rewards(rewards, config: Config):
+    """Scale rewards like ReinforcedPlayer.update, for arrays of rewards."""
+    rewards = np.asarray(rewards, dtype=float)
+    return np.where(
+        rewards > 0,
+        rewards / config.reinforced_win_reward,
+        rewards / config.reinforced_lose_penalty,
+    )
+
+
+def allocations_to_trajectories(allocations, rng):
+    """
+    Turn allocations into placement sequences the Q-learner can replay.
+
+    The order in which armies were placed is not recorded, so each
+    allocation's armies are placed in a random order.
+
+    Args:
+        allocations (np.ndarray): Allocations of shape (matches, castles),
+            every row summing to the same number of armies.
+        rng (np.random.Generator): Generator for the placement order.
+
+    Returns:
+        tuple: (armies_left, castles) arrays of shape (matches, armies), with
+        0-based castles.
+    """
+    allocations = np.asarray(allocations)
+    matches, num_castles = allocations.shape
+    num_armies = int(allocations[0].sum()) if matches else 0
+    castles = np.repeat(
+        np.tile(np.arange(num_castles), matches), allocations.ravel()
+    ).reshape(matches, num_armies)
+    order = np.argsort(rng.random((matches, num_armies)), axis=1)
+    castles = np.take_along_axis(castles, order, axis=1)
+    armies_left = np.broadcast_to(np.arange(num_armies, 0, -1), castles.shape)
+    return armies_left, castles
+
+
+def placement_counts(castles, num_castles) -> np.ndarray:
+    """
+    Allocations of placement sequences.
+
+    Args:
+        castles (np.ndarray): 0-based castles, shape (matches, armies).
+        num_castles (int): Number of castles.
+
+    Returns:
+        np.ndarray: Armies per castle, shape (matches, num_castles).
+    """
+    matches = len(castles)
+    entries = np.arange(matches)[:, None] * num_castles + castles
+    return np.bincount(entries.ravel(), minlength=matches * num_castles).reshape(
+        matches, num_castles
+    )
+
+
+def batch_q_update(
+    qmatrix, armies_left, castles, rewards, learning_rate, discount_factor
+):
+    """
+    Vectorized Q-learning update of many trajectories at once, in place.
+
+    Unlike the sequential update of a single game, all targets are computed
+    from the Q-matrix before the update, as in a minibatch of experience
+    replay. Updates that hit the same (armies_left, castle) entry are averaged.
+
+    Args:
+        qmatrix (np.ndarray): Q-values of shape (armies + 1, castles).
+        armies_left (np.ndarray): States of shape (trajectories, steps).
+        castles (np.ndarray): 0-based actions of shape (trajectories, steps).
+        rewards (np.ndarray): Normalized reward of every trajectory.
+        learning_rate (float): Step size of the update.
+        discount_factor (float): Weight of the next state's value.
+    """
+    next_max_q = np.zeros(castles.shape)
+    next_max_q[:, :-1] = qmatrix[armies_left[:, 1:]].max(axis=2)
+    current_q = qmatrix[armies_left, castles]
+    errors = np.asarray(rewards)[:, None] + discount_factor * next_max_q - current_q
+
+    entries = (armies_left * qmatrix.shape[1] + castles).ravel()
+    error_sums = np.bincount(entries, weights=errors.ravel(), minlength=qmatrix.size)
+    counts = np.bincount(entries, minlength=qmatrix.size)
+    updated = np.flatnonzero(counts)
+    rows, columns = np.divmod(updated, qmatrix.shape[1])
+    qmatrix[rows, columns] = np.maximum(
+        0,
+        qmatrix[rows, columns] + learning_rate * error_sums[updated] / counts[updated],
+    )
 
 
 class ReinforcedPlayer(Player):
+    __slots__ = (
+        "num_castles",
+        "num_armies",
+        "qmatrix",
+        "last_actions",
+        "sampled_castles",
+    )
+
     def __init__(self, config: Config):
         super().__init__(config)
         self.num_castles = self.config.num_castles
@@ -13,9 +117,23 @@ class ReinforcedPlayer(Player):
         self.qmatrix = np.random.uniform(
             0, 0.1, (self.num_armies + 1, self.num_castles)
         )
-        self.last_actions = []
+        # (armies_left, castle) pairs of the last distribution
+        self.last_actions = np.empty((0, 2), dtype=int)
+        # 0-based castles of every placement of the last sample_allocations
+        self.sampled_castles = np.empty((0, self.num_armies), dtype=int)
 
     def set_qmatrix(self, qmatrix):
+        """
+        Replace the Q-matrix.
+
+        Args:
+            qmatrix (np.ndarray or str): The Q-matrix, or the path of a .npy
+                file saved with `castle.checkpoint.save_qmatrix`. Files larger
+                than `config.mmap_threshold` bytes are memory-mapped
+                copy-on-write.
+        """
+        if isinstance(qmatrix, (str, os.PathLike)):
+            qmatrix = load_qmatrix(qmatrix, self.config.mmap_threshold)
         self.qmatrix = qmatrix
 
     def get_qmatrix(self):
@@ -32,7 +150,7 @@ class ReinforcedPlayer(Player):
         Update the Q-matrix based on the last action and received reward.
         """
         learning_rate = self.config.learning_rate * (1 - training_progress)
-        discount_factor = 0.9  # You can adjust this
+        discount_factor = DISCOUNT_FACTOR
 
         # Normalize reward
         if reward > 0:
@@ -40,29 +158,18 @@ class ReinforcedPlayer(Player):
         else:
             normalized_reward = reward / self.config.reinforced_lose_penalty
 
-        # Reverse the actions to update from last to first
-        for i, (armies_left, castle) in enumerate(reversed(self.last_actions)):
-            castle_index = castle - 1
-            current_q = self.qmatrix[armies_left, castle_index]
-
-            if i == 0:  # Last action
-                next_max_q = 0
-            else:
-                next_armies_left, next_castle = self.last_actions[-i]
-                next_max_q = np.max(self.qmatrix[next_armies_left])
-
-            # Q-learning update rule
-            new_q = current_q + learning_rate * (
-                normalized_reward + discount_factor * next_max_q - current_q
-            )
-            self.qmatrix[armies_left, castle_index] = max(
-                0, new_q
-            )  # Ensure non-negative
+        if len(self.last_actions) == 0:
+            return
+        get_kernels(self.config.kernel_backend).q_update(
+            self.qmatrix,
+            self.last_actions[:, 0],
+            self.last_actions[:, 1] - 1,
+            normalized_reward,
+            learning_rate,
+            discount_factor,
+        )
 
     def distribute_armies(self) -> Dict[int, int]:
-        distribution = {castle: 0 for castle in range(1, self.num_castles + 1)}
-        armies_left = self.num_armies
-        self.last_actions = []
         # This approach creates a pseudo-state by considering the number of
         # armies left to distribute as part of the state. While there's no
         # traditional state progression in this single-decision game, this
@@ -71,17 +178,69 @@ class ReinforcedPlayer(Player):
         # 1. It captures the diminishing returns of placing armies.
         # 2. It allows for more nuanced decision-making as the distribution progresses.
         # 3. It can learn to prioritize certain castles early or late in the distribution.
+        #
+        # Each army is placed by an epsilon-greedy choice; the random draws for
+        # all armies are made up front and the placement loop runs in a kernel.
+        explore = (
+            self.config.random_generator.random(self.num_armies) < self.config.epsilon
+        )
+        random_castles = self.config.random_generator.integers(
+            self.num_castles, size=self.num_armies
+        )
+        allocation, castles = get_kernels(
+            self.config.kernel_backend
+        ).epsilon_greedy_allocation(self.qmatrix, explore, random_castles)
 
-        while armies_left > 0:
-            if self.config.random_generator.random() < self.config.epsilon:
-                # Exploration: choose a random castle
-                castle = self.config.random_generator.choice(self.num_castles) + 1
-            else:
-                # Exploitation: choose the castle with the highest Q-value
-                castle = np.argmax(self.qmatrix[armies_left]) + 1
+        armies_left = np.arange(self.num_armies, 0, -1)
+        self.last_actions = np.column_stack([armies_left, castles + 1])
+        return {
+            castle: int(armies) for castle, armies in enumerate(allocation, start=1)
+        }
 
-            distribution[castle] += 1
-            self.last_actions.append((armies_left, castle))
-            armies_left -= 1
+    def sample_allocations(self, count: int) -> np.ndarray:
+        """
+        Draw `count` epsilon-greedy distributions at once. The greedy castle
+        only depends on the number of armies left, so all placements of all
+        distributions are drawn together. The placements are kept for
+        `update_batch`.
+        """
+        rng = self.config.random_generator
+        explore = rng.random((count, self.num_armies)) < self.config.epsilon
+        random_castles = rng.integers(self.num_castles, size=(count, self.num_armies))
+        greedy = np.argmax(self.qmatrix[np.arange(self.num_armies, 0, -1)], axis=1)
+        castles = np.where(explore, random_castles, greedy)
+        self.sampled_castles = castles
+        if count:
+            armies_left = np.arange(self.num_armies, 0, -1)
+            self.last_actions = np.column_stack([armies_left, castles[-1] + 1])
+        return placement_counts(castles, self.num_castles)
 
-        return distribution
+    def update_batch(self, allocations, rewards, training_progress: float):
+        """
+        Learn from a batch of matches in one vectorized Q-update, see
+        `batch_q_update`. The placements recorded by the last
+        `sample_allocations` are replayed when they belong to these
+        allocations, otherwise the armies are replayed in a random order.
+        """
+        allocations = np.asarray(allocations)
+        if len(allocations) == 0:
+            return
+        castles = self.sampled_castles
+        if len(castles) == len(allocations) and np.array_equal(
+            placement_counts(castles, self.num_castles), allocations
+        ):
+            armies_left = np.broadcast_to(
+                np.arange(self.num_armies, 0, -1), castles.shape
+            )
+        else:
+            armies_left, castles = allocations_to_trajectories(
+                allocations, self.config.random_generator
+            )
+        batch_q_update(
+            self.qmatrix,
+            armies_left,
+            castles,
+            normalize_rewards(rewards, self.config),
+            self.config.learning_rate * (1 - training_progress),
+            DISCOUNT_FACTOR,
+        )
@@ -0,0 +1,115 @@
+import itertools
+import unittest
+import numpy as np
+from castle.best_response import (
+    best_response,
+    binomial_marginals,
+    castle_values,
+    empirical_marginals,
+    exploitability,
+    knapsack_allocation,
+    qpolicy_marginals,
+    strategy_marginals,
+)
+from castle.game import Config, Game
+from castle.simulator import (
+    FixedStrategy,
+    MixedStrategy,
+    MultinomialStrategy,
+    QPolicyStrategy,
+    simulate,
+)
+
+
+class TestMarginals(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def assert_matches_samples(self, strategy, armies):
+        sampled = empirical_marginals(strategy.sample(100000, self.rng), armies)
+        marginals = strategy_marginals(strategy, armies)
+        np.testing.assert_allclose(marginals.sum(axis=1), 1)
+        np.testing.assert_allclose(marginals, sampled, atol=0.01)
+
+    def test_multinomial(self):
+        self.assert_matches_samples(MultinomialStrategy([1, 2, 3, 4], 12), 12)
+
+    def test_q_policy(self):
+        qmatrix = self.rng.random((13, 4))
+        self.assert_matches_samples(QPolicyStrategy(qmatrix, 0.3), 12)
+
+    def test_degenerate_genes(self):
+        marginals = binomial_marginals([0, 1, 0], 5)
+        np.testing.assert_allclose(marginals[0], [1, 0, 0, 0, 0, 0])
+        np.testing.assert_allclose(marginals[1], [0, 0, 0, 0, 0, 1])
+
+    def test_greedy_q_policy(self):
+        qmatrix = np.zeros((6, 3))
+        qmatrix[:, 2] = 1
+        marginals = qpolicy_marginals(QPolicyStrategy(qmatrix, 0.0))
+        np.testing.assert_array_equal(marginals[2], [0, 0, 0, 0, 0, 1])
+
+    def test_weighted_allocations(self):
+        strategy = MixedStrategy([[3, 0], [1, 2]], [1, 3])
+        np.testing.assert_allclose(
+            strategy_marginals(strategy, 3), [[0, 0.75, 0, 0.25], [0.25, 0, 0.75, 0]]
+        )
+
+    def test_too_many_armies(self):
+        with self.assertRaises(ValueError):
+            empirical_marginals([[4, 0]], 3)
+
+
+class TestBestResponse(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=4, armies_per_player=7, seed=1)
+        self.points = Game(self.config).castle_points()
+        self.strategy = MultinomialStrategy([0.1, 0.2, 0.3, 0.4], 7)
+
+    def test_matches_brute_force(self):
+        marginals = strategy_marginals(self.strategy, 7)
+        for objective in ("points", "margin"):
+            values = castle_values(marginals, self.points, 7, objective)
+            expected = max(
+                values[np.arange(4), allocation].sum()
+                for allocation in itertools.product(range(8), repeat=4)
+                if sum(allocation) == 7
+            )
+            allocation, value = best_response(self.strategy, self.config, objective)
+            self.assertEqual(allocation.sum(), 7)
+            self.assertAlmostEqual(value, expected)
+            self.assertAlmostEqual(values[np.arange(4), allocation].sum(), value)
+
+    def test_blocked_dynamic_program(self):
+        values = np.random.default_rng(2).random((5, 31))
+        np.testing.assert_array_equal(
+            knapsack_allocation(values, 30)[0],
+            knapsack_allocation(values, 30, max_entries=40)[0],
+        )
+
+    def test_expected_points_match_simulation(self):
+        allocation, value = best_response(self.strategy, self.config)
+        result = simulate(
+            self.config, [FixedStrategy(allocation)], [self.strategy], 40000
+        )
+        self.assertAlmostEqual(result.mean_score1[0, 0], value, delta=0.05)
+
+    def test_invalid_objective(self):
+        with self.assertRaises(ValueError):
+            best_response(self.strategy, self.config, "wins")
+
+    def test_exploitability(self):
+        config = Config(num_castles=3, armies_per_player=6)
+        # Outbidding a fixed allocation on the castles worth 2 and 3 points
+        # gives up the castle worth 1: a margin of 5 - 1
+        self.assertAlmostEqual(exploitability(FixedStrategy([2, 2, 2]), config), 4)
+        self.assertGreater(exploitability(MultinomialStrategy([1, 1, 1], 6), config), 0)
+
+    def test_scales_to_default_board(self):
+        config = Config(seed=0)
+        allocation, _ = best_response(MultinomialStrategy(np.ones(10), 100), config)
+        self.assertEqual(allocation.sum(), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from castle.budget import MIN_DEPTH, TrainingBudget
+from castle.game import Config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTrainingBudget(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_match_budget_stops_before_overrun(self):
+        budget = TrainingBudget(Config(match_budget=100), self.clock)
+        rounds = 0
+        while not budget.exhausted():
+            budget.record_round(30)
+            rounds += 1
+        self.assertEqual(rounds, 3)
+        self.assertEqual(budget.matches, 90)
+        self.assertAlmostEqual(budget.progress(), 0.9)
+
+    def test_time_budget(self):
+        budget = TrainingBudget(Config(time_budget=10.0), self.clock)
+        self.assertFalse(budget.exhausted())
+        self.clock.now = 4.0
+        budget.record_round(0)
+        self.assertAlmostEqual(budget.progress(), 0.4)
+        self.assertFalse(budget.exhausted())
+        self.clock.now = 8.0
+        budget.record_round(0)
+        # Another 4 second round would end after 12 seconds
+        self.assertTrue(budget.exhausted())
+
+    def test_tightest_budget_counts(self):
+        budget = TrainingBudget(
+            Config(time_budget=100.0, match_budget=1000), self.clock
+        )
+        self.clock.now = 10.0
+        budget.record_round(500)
+        self.assertAlmostEqual(budget.progress(), 0.5)
+        self.assertAlmostEqual(budget.round_cost(), 0.5)
+
+    def test_depth_shrinks_and_recovers(self):
+        budget = TrainingBudget(
+            Config(match_budget=10000, budget_min_rounds=20), self.clock
+        )
+        # 1000 matches per round only leave room for 10 rounds
+        budget.record_round(1000)
+        self.assertLess(budget.depth, 1.0)
+        self.assertLess(budget.scaled_matches(64), 64)
+        self.assertGreaterEqual(budget.scaled_matches(1), 1)
+        for _ in range(5):
+            budget.record_round(10)
+        self.assertEqual(budget.depth, 1.0)
+
+    def test_depth_is_bounded(self):
+        budget = TrainingBudget(
+            Config(match_budget=1000, budget_min_rounds=1000), self.clock
+        )
+        budget.record_round(500)
+        self.assertEqual(budget.depth, MIN_DEPTH)
+
+
+if __name__ == "__main__":
+    unittest.main()
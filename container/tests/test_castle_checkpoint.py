@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from castle.checkpoint import load_elites, load_qmatrix, save_elites, save_qmatrix
+from castle.game import Config
+from players.reinforcement import ReinforcedPlayer
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_elites_roundtrip(self):
+        path = os.path.join(self.directory.name, "elites.npz")
+        genes = np.array([[0.5, 0.5], [0.25, 0.75]])
+        save_elites(path, genes, fitness=[2.0, 1.0])
+        np.testing.assert_array_equal(load_elites(path), genes)
+
+    def test_large_qmatrix_is_memory_mapped(self):
+        path = os.path.join(self.directory.name, "qmatrix.npy")
+        save_qmatrix(path, np.ones((11, 3)))
+        self.assertNotIsInstance(load_qmatrix(path), np.memmap)
+        qmatrix = load_qmatrix(path, mmap_threshold=10)
+        self.assertIsInstance(qmatrix, np.memmap)
+        # Copy-on-write: updates never reach the file
+        qmatrix[0, 0] = 5
+        np.testing.assert_array_equal(load_qmatrix(path), np.ones((11, 3)))
+
+    def test_set_qmatrix_from_path(self):
+        config = Config(num_castles=3, armies_per_player=10, mmap_threshold=0)
+        path = os.path.join(self.directory.name, "qmatrix.npy")
+        saved = np.random.default_rng(0).random((11, 3))
+        save_qmatrix(path, saved)
+        player = ReinforcedPlayer(config)
+        player.set_qmatrix(path)
+        np.testing.assert_array_equal(player.get_qmatrix(), saved)
+        player.distribute_armies()
+        player.update(config.reinforced_win_reward, 0.5)
+        np.testing.assert_array_equal(load_qmatrix(path), saved)
+
+
+if __name__ == "__main__":
+    unittest.main()
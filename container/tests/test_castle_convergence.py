@@ -0,0 +1,115 @@
+import unittest
+from castle.game import Config, Game
+from castle.convergence import ConvergenceMonitor, wilson_interval
+from castle.trainer import Trainer
+from players.genetic import GeneticPlayer
+
+
+class TestWilsonInterval(unittest.TestCase):
+    def test_interval_contains_proportion(self):
+        lower, upper = wilson_interval(30, 100)
+        self.assertLess(lower, 0.3)
+        self.assertGreater(upper, 0.3)
+
+    def test_interval_narrows_with_trials(self):
+        small = wilson_interval(5, 10)
+        large = wilson_interval(500, 1000)
+        self.assertLess(large[1] - large[0], small[1] - small[0])
+
+    def test_no_trials(self):
+        self.assertEqual(wilson_interval(0, 0), (0.0, 1.0))
+
+
+class TestConvergenceMonitor(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=5,
+            armies_per_player=20,
+            convergence_window=3,
+            baseline_eval_interval=0,
+        )
+        self.game = Game(self.config)
+        self.monitor = ConvergenceMonitor(self.config, self.game)
+        self.population = [GeneticPlayer(self.config) for _ in range(4)]
+
+    def observe_constant(self, rounds, reward):
+        for player in self.population:
+            player.rewards = [reward]
+        results = [(player, reward) for player in self.population]
+        for round_number in range(rounds):
+            self.monitor.observe(
+                round_number, self.population, results, self.population[0]
+            )
+
+    def test_not_stalled_without_history(self):
+        self.observe_constant(2, 10)
+        self.assertFalse(self.monitor.fitness_stalled())
+
+    def test_stalled_on_plateau(self):
+        self.observe_constant(6, 10)
+        self.assertTrue(self.monitor.fitness_stalled())
+        self.assertTrue(self.monitor.stalled())
+
+    def test_not_stalled_while_improving(self):
+        self.observe_constant(3, 10)
+        self.observe_constant(3, 20)
+        self.assertFalse(self.monitor.fitness_stalled())
+
+    def test_diversity_collapse(self):
+        genes = self.population[0].chromosome.genes
+        for player in self.population:
+            player.chromosome.genes = genes.copy()
+        self.observe_constant(1, 10)
+        self.assertTrue(self.monitor.diversity_collapsed())
+
+    def test_baseline_stalled(self):
+        self.monitor.config = self.config.replace(baseline_eval_interval=1)
+        self.monitor.baseline_intervals = [(0.4, 0.6), (0.45, 0.65)]
+        self.assertTrue(self.monitor.baseline_stalled())
+        self.monitor.baseline_intervals = [(0.4, 0.6), (0.7, 0.9)]
+        self.assertFalse(self.monitor.baseline_stalled())
+
+    def test_reset(self):
+        self.observe_constant(6, 10)
+        self.monitor.reset()
+        self.assertFalse(self.monitor.fitness_stalled())
+
+
+class TestTrainerEarlyStopping(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=5,
+            armies_per_player=20,
+            num_training_rounds=2000,
+            early_stopping=True,
+            population_size=10,
+            convergence_window=2,
+            convergence_tolerance=1000,
+            baseline_eval_interval=0,
+        )
+        self.game = Game(self.config)
+
+    def test_train_stops_early(self):
+        trainer = Trainer(self.config, self.game, "genetic", "random")
+        left_wins, right_wins = trainer.train()
+        self.assertEqual(len(left_wins), 2 * self.config.convergence_window)
+        self.assertLess(len(left_wins), trainer.num_rounds)
+
+    def test_mutation_starts_from_config(self):
+        config = self.config.replace(point_mutation_rate=0.25, mutation_std_dev=0.3)
+        trainer = Trainer(config, Game(config), "genetic", "random")
+        self.assertEqual(trainer.mutation_rate, 0.25)
+        self.assertEqual(trainer.mutation_amount, 0.3)
+
+    def test_adapt_raises_mutation(self):
+        config = self.config.replace(convergence_action="adapt", max_adaptations=1)
+        trainer = Trainer(config, Game(config), "genetic", "random")
+        initial_amount = trainer.mutation_amount
+        left_wins, _ = trainer.train()
+        self.assertEqual(trainer.adaptations, 1)
+        self.assertGreater(trainer.mutation_amount, initial_amount)
+        self.assertEqual(len(left_wins), 4 * self.config.convergence_window)
+
+
+if __name__ == "__main__":
+    unittest.main()
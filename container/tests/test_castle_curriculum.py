@@ -0,0 +1,144 @@
+import unittest
+import numpy as np
+from castle.curriculum import (
+    curriculum_stages,
+    transfer_player,
+    transfer_strategy,
+    upsample_qmatrix,
+)
+from castle.game import Config, Game
+from castle.trainer import Trainer
+from players.approximate import ApproximatePlayer
+from players.cmaes import CMAES, CMAESPlayer
+from players.genetic import GeneticPlayer
+from players.reinforcement import ReinforcedPlayer
+
+
+class TestCurriculumStages(unittest.TestCase):
+    def test_stages(self):
+        config = Config(
+            armies_per_player=100,
+            curriculum_armies=(10, 30),
+            curriculum_rounds=(500, 200),
+            checkpoint_dir="output/run",
+            time_budget=60.0,
+            match_budget=2000,
+        )
+        stages = curriculum_stages(config)
+        self.assertEqual([stage.armies_per_player for stage in stages], [10, 30])
+        self.assertEqual([stage.num_training_rounds for stage in stages], [500, 200])
+        for stage in stages:
+            self.assertEqual(stage.curriculum_armies, ())
+            self.assertIsNone(stage.checkpoint_dir)
+            self.assertIsNone(stage.time_budget)
+            self.assertIsNone(stage.match_budget)
+            self.assertEqual(stage.num_castles, config.num_castles)
+
+    def test_invalid_stages(self):
+        for armies, rounds in (
+            ((10, 30), (500,)),
+            ((30, 10), (1, 1)),
+            ((10, 100), (1, 1)),
+            ((0,), (1,)),
+        ):
+            config = Config(
+                armies_per_player=100,
+                curriculum_armies=armies,
+                curriculum_rounds=rounds,
+            )
+            with self.assertRaises(ValueError):
+                curriculum_stages(config)
+
+
+class TestTransfer(unittest.TestCase):
+    def setUp(self):
+        self.small = Config(num_castles=4, armies_per_player=10, seed=0)
+        self.large = self.small.replace(armies_per_player=40)
+
+    def test_upsample_qmatrix(self):
+        qmatrix = np.array([[0.0, 1.0], [2.0, 3.0], [4.0, 5.0]])
+        upsampled = upsample_qmatrix(qmatrix, 4)
+        np.testing.assert_allclose(upsampled, [[0, 1], [1, 2], [2, 3], [3, 4], [4, 5]])
+        np.testing.assert_allclose(upsample_qmatrix(qmatrix, 2), qmatrix)
+
+    def test_upsampled_greedy_policy_keeps_its_shape(self):
+        # Small boards learn to put the first armies on the top castle
+        qmatrix = np.zeros((11, 4))
+        qmatrix[6:, 3] = 1
+        qmatrix[:6, 2] = 1
+        player = ReinforcedPlayer(self.small)
+        player.set_qmatrix(qmatrix)
+        target = ReinforcedPlayer(self.large)
+        transfer_player(player, target)
+        greedy = np.argmax(target.get_qmatrix(), axis=1)
+        self.assertEqual(target.get_qmatrix().shape, (41, 4))
+        self.assertTrue(np.all(greedy[25:] == 3))
+        self.assertTrue(np.all(greedy[:22] == 2))
+
+    def test_gene_players(self):
+        source = GeneticPlayer(self.small)
+        target = GeneticPlayer(self.large)
+        transfer_player(source, target)
+        np.testing.assert_array_equal(target.chromosome.genes, source.chromosome.genes)
+        self.assertEqual(sum(target.distribute_armies().values()), 40)
+
+        source = CMAESPlayer(self.small)
+        source.set_logits(np.arange(4.0))
+        target = CMAESPlayer(self.large)
+        transfer_player(source, target)
+        np.testing.assert_array_equal(target.logits, source.logits)
+        np.testing.assert_allclose(target.chromosome.genes, source.chromosome.genes)
+
+    def test_approximate_player(self):
+        source = ApproximatePlayer(self.small)
+        target = ApproximatePlayer(self.large)
+        transfer_player(source, target)
+        np.testing.assert_array_equal(
+            target.qfunction.weights, source.qfunction.weights
+        )
+        self.assertIsNot(target.qfunction, source.qfunction)
+
+    def test_transfer_strategy(self):
+        strategy = CMAES(self.small, 6)
+        strategy.tell(strategy.ask(6), np.arange(6))
+        transferred = transfer_strategy(strategy, self.large)
+        self.assertIs(transferred.config, self.large)
+        np.testing.assert_array_equal(transferred.mean, strategy.mean)
+        self.assertEqual(transferred.sigma, strategy.sigma)
+
+
+class TestTrainerCurriculum(unittest.TestCase):
+    def test_curriculum_then_full_size(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=20,
+            num_training_rounds=40,
+            population_size=10,
+            curriculum_armies=(5, 10),
+            curriculum_rounds=(40, 20),
+        )
+        trainer = Trainer(config, Game(config), "cmaes", "reinforced")
+        left_wins, _ = trainer.train()
+        self.assertEqual(len(left_wins), 4)
+        self.assertEqual(trainer.curriculum_history, [(5, 4), (10, 2)])
+        self.assertEqual(trainer.population_right[0].get_qmatrix().shape, (21, 4))
+        self.assertIs(trainer.evolution_strategies["left"].config, config)
+        self.assertGreater(trainer.evolution_strategies["left"].generation, 6)
+
+    def test_budget_applies_to_the_full_size_run(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=20,
+            population_size=10,
+            match_budget=2000,
+            curriculum_armies=(5,),
+            curriculum_rounds=(40,),
+        )
+        trainer = Trainer(config, Game(config), "genetic", "random")
+        trainer.train()
+        self.assertEqual(trainer.curriculum_history, [(5, 4)])
+        self.assertLessEqual(trainer.budget.matches, 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
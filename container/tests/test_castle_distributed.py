@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import unittest
+import numpy as np
+from castle.distributed import (
+    Coordinator,
+    evaluate_shard,
+    parse_address,
+    receive_message,
+    run_worker,
+    send_message,
+)
+from castle.game import Config, Game
+from castle.trainer import Trainer
+
+
+class TestProtocol(unittest.TestCase):
+    def test_parse_address(self):
+        self.assertEqual(
+            parse_address("unix:/tmp/castle.sock"), (socket.AF_UNIX, "/tmp/castle.sock")
+        )
+        self.assertEqual(
+            parse_address("localhost:5000"), (socket.AF_INET, ("localhost", 5000))
+        )
+        with self.assertRaises(ValueError):
+            parse_address("localhost")
+
+    def test_message_round_trip(self):
+        genes = np.random.default_rng(0).random((3, 5))
+        allocations = np.arange(10, dtype=np.int64).reshape(2, 5)
+        first, second = socket.socketpair()
+        with first, second:
+            send_message(first, 2, {"seed": 7}, [genes, allocations])
+            kind, metadata, arrays = receive_message(second)
+        self.assertEqual(kind, 2)
+        self.assertEqual(metadata, {"seed": 7})
+        np.testing.assert_array_equal(arrays[0], genes)
+        np.testing.assert_array_equal(arrays[1], allocations)
+        self.assertEqual(arrays[1].dtype, np.int64)
+
+    def test_closed_connection(self):
+        first, second = socket.socketpair()
+        first.close()
+        with second, self.assertRaises(ConnectionError):
+            receive_message(second)
+
+
+class TestEvaluateShard(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=5, armies_per_player=20)
+        self.opponents = np.random.default_rng(1).multinomial(20, np.ones(5) / 5, 50)
+
+    def test_deterministic_per_seed(self):
+        genes = np.full((4, 5), 0.2)
+        first = evaluate_shard(self.config, genes, self.opponents, 8, True, 3)
+        second = evaluate_shard(self.config, genes, self.opponents, 8, True, 3)
+        self.assertEqual(first.shape, (4,))
+        np.testing.assert_array_equal(first, second)
+
+    def test_strong_genes_score_higher(self):
+        # Spreading armies in proportion to castle points beats piling them
+        # on the least valuable castle
+        genes = np.array([[1.0, 0, 0, 0, 0], np.arange(1, 6) / 15])
+        rewards = evaluate_shard(self.config, genes, self.opponents, 50, False, 0)
+        self.assertLess(rewards[0], rewards[1])
+
+
+class TestCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.address = "unix:" + os.path.join(self.directory.name, "castle.sock")
+        self.config = Config(
+            num_castles=5,
+            armies_per_player=20,
+            seed=0,
+            distributed_address=self.address,
+            distributed_shard_size=4,
+            distributed_timeout=10.0,
+        )
+        self.genes = np.random.default_rng(2).dirichlet(np.ones(5), 18)
+        self.opponents = np.random.default_rng(3).multinomial(20, np.ones(5) / 5, 40)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def start_workers(self, count, **kwargs):
+        workers = [
+            multiprocessing.Process(
+                target=run_worker, args=(self.address, 0.05), kwargs=kwargs
+            )
+            for _ in range(count)
+        ]
+        for worker in workers:
+            worker.start()
+        return workers
+
+    def wait_for_workers(self, coordinator, count):
+        with coordinator.condition:
+            self.assertTrue(
+                coordinator.condition.wait_for(
+                    lambda: coordinator.workers >= count, timeout=10
+                )
+            )
+
+    def test_matches_local_evaluation(self):
+        local = Coordinator(self.config).evaluate(self.genes, self.opponents, 6)
+        workers = self.start_workers(3)
+        with Coordinator(self.config.replace()) as coordinator:
+            self.wait_for_workers(coordinator, 3)
+            remote = coordinator.evaluate(self.genes, self.opponents, 6)
+        for worker in workers:
+            worker.join(timeout=10)
+            self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(coordinator.shards_local, 0)
+        self.assertEqual(coordinator.shards_by_worker, 5)
+        np.testing.assert_array_equal(remote, local)
+
+    def test_failed_worker_shard_is_reassigned(self):
+        coordinator = Coordinator(self.config)
+        coordinator.start()
+        try:
+            # A worker that takes a shard and disconnects without answering
+            family, address = parse_address(self.address)
+            failing = socket.socket(family, socket.SOCK_STREAM)
+            failing.connect(address)
+            receive_message(failing)
+            self.wait_for_workers(coordinator, 1)
+            result = {}
+            evaluation = threading.Thread(
+                target=lambda: result.update(
+                    rewards=coordinator.evaluate(self.genes, self.opponents, 6)
+                )
+            )
+            evaluation.start()
+            receive_message(failing)
+            # A thread, as a forked process would inherit the failing socket
+            worker = threading.Thread(target=run_worker, args=(self.address, 0.05))
+            worker.start()
+            self.wait_for_workers(coordinator, 2)
+            failing.close()
+            evaluation.join(timeout=30)
+            self.assertEqual(result["rewards"].shape, (18,))
+            self.assertGreater(coordinator.shards_by_worker, 0)
+        finally:
+            coordinator.close()
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive())
+
+    def test_worker_connects_once_the_coordinator_starts(self):
+        workers = self.start_workers(2)
+        with Coordinator(self.config) as coordinator:
+            self.wait_for_workers(coordinator, 2)
+            coordinator.evaluate(self.genes, self.opponents, 2)
+        for worker in workers:
+            worker.join(timeout=10)
+            self.assertEqual(worker.exitcode, 0)
+
+    def test_worker_gives_up_without_coordinator(self):
+        self.assertEqual(run_worker(self.address, 0.01, max_failures=3), 0)
+
+
+class TestTrainerDistributed(unittest.TestCase):
+    def test_play_round_uses_distributed_scores(self):
+        config = Config(
+            num_castles=5,
+            armies_per_player=20,
+            num_training_rounds=20,
+            population_size=10,
+            distributed_matches=4,
+            distributed_opponent_samples=16,
+            distributed_address="unix:unused.sock",
+        )
+        trainer = Trainer(config, Game(config), "genetic", "random")
+        # Without connected workers the coordinator evaluates locally
+        left_results, right_results = trainer.play_round(0)
+        self.assertEqual(
+            [player for player, _ in left_results], trainer.population_left
+        )
+        self.assertEqual(trainer.coordinator.shards_local, 1)
+        trainer.evolve_populations(left_results, right_results)
+        self.assertEqual(len(trainer.population_left), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import numpy as np
+from castle.diversity import (
+    DistanceCache,
+    gene_statistics,
+    pairwise_distances,
+    shared_fitness,
+)
+from castle.game import Config
+from players.chromosome import Chromosome
+
+
+class TestDiversity(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=4, seed=0, diversity_block_size=3)
+
+    def test_gene_statistics(self):
+        identical = gene_statistics(np.full((5, 4), 0.25))
+        self.assertEqual(identical["gene_variance"], 0)
+        self.assertEqual(identical["centroid_distance"], 0)
+        self.assertAlmostEqual(identical["entropy"], np.log(4))
+        spread = gene_statistics(np.eye(4))
+        self.assertGreater(spread["gene_variance"], 0)
+        self.assertEqual(spread["entropy"], 0)
+
+    def test_pairwise_distances_blocked(self):
+        genes = self.config.random_generator.random((10, 4))
+        expected = np.abs(genes[:, None, :] - genes[None, :, :]).sum(axis=2)
+        np.testing.assert_allclose(pairwise_distances(genes, genes, 3), expected)
+
+    def test_shared_fitness_penalizes_crowding(self):
+        distances = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0], [1.0, 1.0, 0.0]])
+        fitness, niche_counts = shared_fitness([2.0, 2.0, 1.0], distances, 0.5)
+        np.testing.assert_array_equal(niche_counts, [2, 2, 1])
+        # The two identical players share their niche
+        np.testing.assert_array_equal(fitness, [0.5, 0.5, 0.0])
+
+    def test_cache_recomputes_changed_rows_only(self):
+        chromosomes = [Chromosome(self.config) for _ in range(8)]
+        cache = DistanceCache(self.config)
+        cache.update(chromosomes)
+        self.assertEqual(cache.recomputed_rows, 8)
+
+        # Reorder, replace one chromosome and mutate another in place
+        chromosomes = chromosomes[::-1]
+        chromosomes[0] = Chromosome(self.config)
+        chromosomes[3].mutate()
+        distances = cache.update(chromosomes)
+        self.assertEqual(cache.recomputed_rows, 2)
+
+        genes = np.array([chromosome.genes for chromosome in chromosomes])
+        np.testing.assert_allclose(distances, pairwise_distances(genes, genes))
+        cache.update(chromosomes)
+        self.assertEqual(cache.recomputed_rows, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
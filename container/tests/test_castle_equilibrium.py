@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from castle.game import Config, Game
+from castle.equilibrium import EquilibriumSolver
+from castle.trainer import Trainer
+from players.equilibrium import EquilibriumPlayer
+from players.player import RandomPlayer
+
+ROCK_PAPER_SCISSORS = np.array([[0, -1, 1], [1, 0, -1], [-1, 1, 0]], dtype=float)
+
+
+class TestEquilibriumSolver(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=3,
+            armies_per_player=6,
+            equilibrium_strategies=30,
+            equilibrium_iterations=500,
+        )
+        self.game = Game(self.config)
+        self.solver = EquilibriumSolver(self.config, self.game)
+
+    def test_regret_matching_rock_paper_scissors(self):
+        strategy = self.solver.regret_matching(ROCK_PAPER_SCISSORS, 2000)
+        np.testing.assert_allclose(strategy, [1 / 3] * 3, atol=0.02)
+
+    def test_fictitious_play_rock_paper_scissors(self):
+        strategy = self.solver.fictitious_play(ROCK_PAPER_SCISSORS, 3000)
+        np.testing.assert_allclose(strategy, [1 / 3] * 3, atol=0.05)
+
+    def test_payoff_matrix_is_antisymmetric(self):
+        player = EquilibriumPlayer(self.config)
+        # Force several chunks
+        self.solver.config = self.config.replace(equilibrium_chunk_size=100)
+        payoffs = self.solver.payoff_matrix(player.strategies)
+        np.testing.assert_array_equal(payoffs, -payoffs.T)
+        self.assertEqual(self.solver.games_played, 30 * 30)
+
+    def test_solve_lowers_exploitability(self):
+        player = EquilibriumPlayer(self.config)
+        payoffs = self.solver.payoff_matrix(player.strategies)
+        uniform = np.full(len(payoffs), 1 / len(payoffs))
+        exploitability = self.solver.solve(player)
+        self.assertLess(exploitability, self.solver.exploitability(payoffs, uniform))
+        self.assertLess(exploitability, 0.1)
+        self.assertAlmostEqual(player.weights.sum(), 1.0)
+
+    def test_invalid_method(self):
+        self.solver.config = self.config.replace(equilibrium_method="minimax")
+        with self.assertRaises(ValueError):
+            self.solver.solve(EquilibriumPlayer(self.config))
+
+
+class TestEquilibriumPlayer(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=4, armies_per_player=20, equilibrium_strategies=10
+        )
+        self.player = EquilibriumPlayer(self.config)
+
+    def test_distribute_armies(self):
+        distribution = self.player.sanitize_distribute_armies()
+        self.assertEqual(sum(distribution.values()), 20)
+        self.assertEqual(sorted(distribution), [1, 2, 3, 4])
+
+    def test_set_strategy_drops_unused(self):
+        weights = np.zeros(10)
+        weights[3] = 2.0
+        self.player.set_strategy(self.player.strategies, weights)
+        self.assertEqual(len(self.player.strategies), 1)
+        allocations = self.player.sample_allocations(5)
+        self.assertTrue((allocations == allocations[0]).all())
+
+    def test_trainer_solves_before_rounds(self):
+        config = self.config.replace(num_training_rounds=2)
+        trainer = Trainer(config, Game(config), "equilibrium", "random")
+        trainer.train()
+        self.assertLess(len(trainer.best_player("left").strategies), 10 + 1)
+        self.assertIsInstance(trainer.best_player("right"), RandomPlayer)
+
+
+if __name__ == "__main__":
+    unittest.main()
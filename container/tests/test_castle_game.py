@@ -1,5 +1,11 @@
+import dataclasses
+import json
+import os
+import pickle
+import tempfile
 import unittest
-from castle.game import Config, Game
+import numpy as np
+from castle.game import Config, Game, env_values
 from players.player import Player
 
 
@@ -57,6 +63,34 @@ class TestCastleGame(unittest.TestCase):
         self.assertEqual(player1_score, 1)  # Player 1 wins castle 1
         self.assertEqual(player2_score, 2)  # Player 2 wins castle 2
 
+    def test_score_allocations(self):
+        allocations1 = [[10, 20, 15, 5, 0], [25, 25, 0, 0, 0]]
+        allocations2 = [[15, 15, 10, 10, 0], [20, 30, 0, 0, 0]]
+        player1_won, player1_score, player2_score = self.game.score_allocations(
+            allocations1, allocations2
+        )
+        np.testing.assert_array_equal(player1_won, [False, False])
+        np.testing.assert_array_equal(player1_score, [5, 1])
+        np.testing.assert_array_equal(player2_score, [5, 2])
+
+    def test_score_allocations_matches_play_game(self):
+        player1 = MockPlayer(self.config, {1: 10, 2: 10, 3: 10, 4: 10, 5: 10})
+        player2 = MockPlayer(self.config, {1: 0, 2: 0, 3: 20, 4: 15, 5: 15})
+        expected = self.game.play_game(player1, player2)
+        batched = self.game.score_allocations(
+            player1.sample_allocations(1), player2.sample_allocations(1)
+        )
+        self.assertEqual(expected, tuple(value[0] for value in batched))
+
+    def test_score_rewards(self):
+        player1_reward, player2_reward = self.game.score_rewards(
+            np.array([True, False]), np.array([10, 3]), np.array([5, 12])
+        )
+        win = self.config.reinforced_win_reward
+        lose = self.config.reinforced_lose_penalty
+        np.testing.assert_array_equal(player1_reward, [10 + win, 3 - lose])
+        np.testing.assert_array_equal(player2_reward, [5 - lose, 12 + win])
+
     def test_config_initialization(self):
         config = Config(
             num_castles=8,
@@ -72,5 +106,95 @@ class TestCastleGame(unittest.TestCase):
         self.assertEqual(config.points_per_castle[8], 8)
 
 
+class TestConfig(unittest.TestCase):
+    def test_frozen_and_hashable(self):
+        config = Config(num_castles=4, seed=1)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            config.epsilon = 0.5
+        same = Config(num_castles=4, seed=1)
+        # The random generator is not part of the value
+        same.random_generator.random()
+        self.assertEqual(config, same)
+        self.assertEqual(hash(config), hash(same))
+        self.assertEqual(config.content_hash(), same.content_hash())
+        self.assertNotEqual(config.content_hash(), Config(num_castles=5).content_hash())
+
+    def test_replace(self):
+        config = Config(num_castles=4, seed=1)
+        changed = config.replace(epsilon=0.5, num_castles=6)
+        self.assertEqual(changed.epsilon, 0.5)
+        self.assertEqual(len(changed.points_per_castle), 6)
+        self.assertEqual(config.epsilon, 0.3)
+        with self.assertRaises(ValueError):
+            config.replace(no_such_parameter=1)
+
+    def test_dict_roundtrip(self):
+        config = Config(seed=3, mutation_operators=["gaussian", "dirichlet"])
+        self.assertEqual(config.mutation_operators, ("gaussian", "dirichlet"))
+        data = json.loads(json.dumps(config.to_dict()))
+        self.assertEqual(Config.from_dict(data), config)
+        with self.assertRaises(ValueError):
+            Config.from_dict({"no_such_parameter": 1})
+
+    def test_from_dict_parses_strings(self):
+        config = Config.from_dict(
+            {
+                "population_size": "20",
+                "epsilon": "0.1",
+                "racing": "yes",
+                "seed": "none",
+                "mutation_operators": "gaussian, swap",
+            }
+        )
+        self.assertEqual(config.population_size, 20)
+        self.assertEqual(config.epsilon, 0.1)
+        self.assertTrue(config.racing)
+        self.assertIsNone(config.seed)
+        self.assertEqual(config.mutation_operators, ("gaussian", "swap"))
+        with self.assertRaises(ValueError):
+            Config.from_dict({"racing": "maybe"})
+
+    def test_from_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "config.json")
+            with open(path, "w") as config_file:
+                json.dump({"num_castles": 3, "population_size": 12}, config_file)
+            config = Config.from_file(path)
+            self.assertEqual(config.population_size, 12)
+            self.assertEqual(len(config.points_per_castle), 3)
+            with self.assertRaises(ValueError):
+                Config.from_file(os.path.join(directory, "config.toml"))
+
+    def test_from_yaml_file(self):
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            self.skipTest("PyYAML is not installed")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "config.yaml")
+            with open(path, "w") as config_file:
+                config_file.write("epsilon: 0.2\nmutation_operators: [swap]\n")
+            config = Config.from_file(path)
+            self.assertEqual(config.epsilon, 0.2)
+            self.assertEqual(config.mutation_operators, ("swap",))
+
+    def test_from_env(self):
+        environ = {"CASTLE_EPSILON": "0.7", "CASTLE_UNRELATED": "1", "HOME": "/"}
+        self.assertEqual(env_values(environ), {"epsilon": "0.7"})
+        base = Config(num_castles=3)
+        config = Config.from_env(environ, base=base)
+        self.assertEqual(config.epsilon, 0.7)
+        self.assertEqual(config.num_castles, 3)
+
+    def test_pickle_keeps_generator_state(self):
+        config = Config(seed=5)
+        config.random_generator.random()
+        restored = pickle.loads(pickle.dumps(config))
+        self.assertEqual(restored, config)
+        self.assertEqual(
+            restored.random_generator.random(), config.random_generator.random()
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+from castle.game import Config, Game
+from castle.hall_of_fame import HallOfFame
+from castle.trainer import Trainer
+
+
+class TestHallOfFame(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=4,
+            armies_per_player=40,
+            hall_of_fame_size=3,
+            hall_of_fame_bank_size=8,
+        )
+        self.hall_of_fame = HallOfFame(self.config)
+
+    def test_add_and_sample(self):
+        self.assertTrue(self.hall_of_fame.add([1.0, 0.0, 0.0, 0.0]))
+        self.assertEqual(len(self.hall_of_fame), 1)
+        allocations = self.hall_of_fame.sample_allocations(5)
+        self.assertEqual(allocations.shape, (5, 4))
+        np.testing.assert_array_equal(allocations[:, 0], [40] * 5)
+
+    def test_rejects_duplicates(self):
+        self.hall_of_fame.add([0.25, 0.25, 0.25, 0.25])
+        self.assertFalse(self.hall_of_fame.add([0.26, 0.24, 0.25, 0.25]))
+        self.assertEqual(len(self.hall_of_fame), 1)
+
+    def test_ring_buffer_overwrites_oldest(self):
+        for castle in range(4):
+            genes = np.zeros(4)
+            genes[castle] = 1.0
+            self.hall_of_fame.add(genes)
+        self.assertEqual(len(self.hall_of_fame), 3)
+        # The first member (all on castle 1) was overwritten by the fourth
+        np.testing.assert_array_equal(self.hall_of_fame.genes[0], [0, 0, 0, 1])
+
+    def test_sample_empty(self):
+        with self.assertRaises(ValueError):
+            self.hall_of_fame.sample_allocations(1)
+
+
+class TestTrainerHallOfFame(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=4,
+            armies_per_player=20,
+            population_size=10,
+            hall_of_fame_size=5,
+            hall_of_fame_fraction=0.5,
+        )
+        self.game = Game(self.config)
+
+    def test_only_for_two_populations(self):
+        trainer = Trainer(self.config, self.game, "genetic", "random")
+        self.assertEqual(trainer.hall_of_fame, {})
+
+    def test_archive_filled_and_used(self):
+        trainer = Trainer(self.config, self.game, "genetic", "genetic")
+        for round_number in range(3):
+            left_results, right_results = trainer.play_round(round_number)
+            self.assertEqual(len(left_results), self.config.population_size)
+            self.assertEqual(len(right_results), self.config.population_size)
+            trainer.evolve_populations(left_results, right_results)
+        self.assertGreater(len(trainer.hall_of_fame["left"]), 0)
+        self.assertGreater(len(trainer.hall_of_fame["right"]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
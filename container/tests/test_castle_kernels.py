@@ -0,0 +1,147 @@
+import unittest
+import numpy as np
+from castle.game import Config, Game
+from castle.kernels import (
+    NUMPY_KERNELS,
+    available_backends,
+    get_kernels,
+    numba,
+)
+from castle.benchmark import benchmark_kernels
+from players.reinforcement import ReinforcedPlayer
+
+
+class TestKernelSelection(unittest.TestCase):
+    def test_numpy_always_available(self):
+        self.assertIs(get_kernels("numpy"), NUMPY_KERNELS)
+        self.assertIn("numpy", available_backends())
+
+    def test_auto_backend(self):
+        expected = "numba" if numba is not None else "numpy"
+        self.assertEqual(get_kernels("auto").name, expected)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            get_kernels("cuda")
+
+    @unittest.skipIf(numba is not None, "numba is installed")
+    def test_numba_missing(self):
+        with self.assertRaises(ValueError):
+            get_kernels("numba")
+
+
+class TestNumpyKernels(unittest.TestCase):
+    def setUp(self):
+        self.kernels = get_kernels("numpy")
+        self.rng = np.random.default_rng(0)
+
+    def test_greedy_allocation(self):
+        qmatrix = np.zeros((11, 3))
+        qmatrix[:, 2] = 1
+        explore = np.zeros(10, dtype=bool)
+        allocation, castles = self.kernels.epsilon_greedy_allocation(
+            qmatrix, explore, np.zeros(10, dtype=int)
+        )
+        np.testing.assert_array_equal(allocation, [0, 0, 10])
+        np.testing.assert_array_equal(castles, [2] * 10)
+
+    def test_explore_allocation(self):
+        qmatrix = np.zeros((4, 3))
+        explore = np.ones(3, dtype=bool)
+        allocation, _ = self.kernels.epsilon_greedy_allocation(
+            qmatrix, explore, np.array([1, 1, 0])
+        )
+        np.testing.assert_array_equal(allocation, [1, 2, 0])
+
+    def test_q_update_matches_reference(self):
+        qmatrix = self.rng.uniform(0, 0.1, (6, 3))
+        reference = qmatrix.copy()
+        armies_left = np.array([5, 4, 3, 2, 1])
+        castles = np.array([0, 2, 1, 2, 0])
+        self.kernels.q_update(qmatrix, armies_left, castles, 1.0, 0.1, 0.9)
+
+        # Straightforward transcription of the original update loop
+        actions = list(zip(armies_left, castles))
+        for i, (left, castle) in enumerate(reversed(actions)):
+            next_max_q = 0 if i == 0 else np.max(reference[actions[-i][0]])
+            current_q = reference[left, castle]
+            reference[left, castle] = max(
+                0, current_q + 0.1 * (1.0 + 0.9 * next_max_q - current_q)
+            )
+        np.testing.assert_allclose(qmatrix, reference)
+
+    def test_score_allocations(self):
+        player1_score, player2_score = self.kernels.score_allocations(
+            np.array([[3, 0, 2]]), np.array([[1, 1, 2]]), np.array([1, 2, 3])
+        )
+        np.testing.assert_array_equal(player1_score, [1])
+        np.testing.assert_array_equal(player2_score, [2])
+
+
+@unittest.skipIf(numba is None, "numba is not installed")
+class TestBackendEquivalence(unittest.TestCase):
+    def setUp(self):
+        self.numpy_kernels = get_kernels("numpy")
+        self.numba_kernels = get_kernels("numba")
+        self.rng = np.random.default_rng(1)
+
+    def test_epsilon_greedy_allocation(self):
+        qmatrix = self.rng.random((101, 10))
+        explore = self.rng.random(100) < 0.3
+        random_castles = self.rng.integers(10, size=100)
+        expected = self.numpy_kernels.epsilon_greedy_allocation(
+            qmatrix, explore, random_castles
+        )
+        actual = self.numba_kernels.epsilon_greedy_allocation(
+            qmatrix, explore, random_castles
+        )
+        np.testing.assert_array_equal(expected[0], actual[0])
+        np.testing.assert_array_equal(expected[1], actual[1])
+
+    def test_q_update(self):
+        qmatrix = self.rng.random((101, 10))
+        armies_left = np.arange(100, 0, -1)
+        castles = self.rng.integers(10, size=100)
+        expected = qmatrix.copy()
+        self.numpy_kernels.q_update(expected, armies_left, castles, -0.4, 0.05, 0.9)
+        self.numba_kernels.q_update(qmatrix, armies_left, castles, -0.4, 0.05, 0.9)
+        np.testing.assert_allclose(expected, qmatrix)
+
+    def test_score_allocations(self):
+        points = np.arange(1, 11)
+        allocations1 = self.rng.multinomial(100, [0.1] * 10, size=500)
+        allocations2 = self.rng.multinomial(100, [0.1] * 10, size=500)
+        expected = self.numpy_kernels.score_allocations(
+            allocations1, allocations2, points
+        )
+        actual = self.numba_kernels.score_allocations(
+            allocations1, allocations2, points
+        )
+        np.testing.assert_array_equal(expected[0], actual[0])
+        np.testing.assert_array_equal(expected[1], actual[1])
+
+    def test_players_agree_across_backends(self):
+        distributions = []
+        for backend in ("numpy", "numba"):
+            config = Config(seed=7, kernel_backend=backend)
+            np.random.seed(7)
+            player = ReinforcedPlayer(config)
+            for _ in range(5):
+                player.distribute_armies()
+                player.update(120, 0.1)
+            distributions.append((player.distribute_armies(), player.qmatrix))
+        self.assertEqual(distributions[0][0], distributions[1][0])
+        np.testing.assert_allclose(distributions[0][1], distributions[1][1])
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_benchmark_reports_backend(self):
+        config = Config(num_castles=3, armies_per_player=10, kernel_backend="numpy")
+        results = benchmark_kernels(config, num_games=100, repeats=2)
+        self.assertEqual(results["backend"], "numpy")
+        self.assertGreater(results["games_scored_per_second"], 0)
+        self.assertGreater(results["reinforced_games_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
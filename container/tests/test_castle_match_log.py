@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from castle.game import Config, Game
+from castle.match_log import MatchLogReader, MatchLogWriter
+from castle.trainer import Trainer
+
+
+class TestMatchLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "matches.log")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_matches(self, count, chunk_size=4):
+        with MatchLogWriter(self.path, 3, chunk_size=chunk_size) as writer:
+            for match in range(count):
+                writer.append(
+                    match // 2,
+                    match,
+                    match + 1,
+                    [match, 0, 1],
+                    [0, match, 1],
+                    1,
+                    2,
+                    101.0,
+                    -48.0,
+                )
+
+    def test_roundtrip(self):
+        self.write_matches(10)
+        reader = MatchLogReader(self.path)
+        self.assertEqual(len(reader), 10)
+        records = reader.records
+        np.testing.assert_array_equal(records["left_id"], np.arange(10))
+        np.testing.assert_array_equal(records["left_allocation"][3], [3, 0, 1])
+        np.testing.assert_array_equal(records["round"][:4], [0, 0, 1, 1])
+        self.assertAlmostEqual(float(records["right_reward"][0]), -48.0)
+
+    def test_chunked_writes(self):
+        writer = MatchLogWriter(self.path, 3, chunk_size=4)
+        for match in range(5):
+            writer.append(0, match, 0, [1, 1, 1], [1, 1, 1], 0, 0, 0.0, 0.0)
+        # One full chunk is on disk, the fifth match is still buffered
+        self.assertEqual(len(MatchLogReader(self.path)), 4)
+        writer.close()
+        self.assertEqual(len(MatchLogReader(self.path)), 5)
+
+    def test_append_batch(self):
+        with MatchLogWriter(self.path, 3, chunk_size=4) as writer:
+            for count in (3, 10):
+                writer.append_batch(
+                    round=7,
+                    left_id=np.arange(count),
+                    right_id=-1,
+                    left_allocation=np.ones((count, 3)),
+                    right_allocation=np.zeros((count, 3)),
+                    left_score=6,
+                    right_score=0,
+                    left_reward=106.0,
+                    right_reward=-50.0,
+                )
+        records = MatchLogReader(self.path).records
+        self.assertEqual(len(records), 13)
+        self.assertTrue((records["right_id"] == -1).all())
+        np.testing.assert_array_equal(records["left_id"][3:], np.arange(10))
+
+    def test_append_to_existing_log(self):
+        self.write_matches(3)
+        self.write_matches(2)
+        self.assertEqual(len(MatchLogReader(self.path)), 5)
+        with self.assertRaises(ValueError):
+            MatchLogWriter(self.path, 4)
+
+    def test_armies_per_player(self):
+        MatchLogWriter(self.path, 3, armies_per_player=10).close()
+        self.assertEqual(MatchLogReader(self.path).armies_per_player, 10)
+        with self.assertRaises(ValueError):
+            MatchLogWriter(self.path, 3, armies_per_player=20)
+
+    def test_iter_batches(self):
+        self.write_matches(10)
+        reader = MatchLogReader(self.path)
+        sizes = [len(batch) for batch in reader.iter_batches(batch_size=4)]
+        self.assertEqual(sizes, [4, 4, 2])
+        sizes = [len(batch) for batch in reader.iter_batches(4, start=2, stop=7)]
+        self.assertEqual(sizes, [4, 1])
+
+    def test_empty_log(self):
+        MatchLogWriter(self.path, 3).close()
+        reader = MatchLogReader(self.path)
+        self.assertEqual(len(reader), 0)
+        self.assertEqual(list(reader.iter_batches()), [])
+
+
+class TestTrainerMatchLog(unittest.TestCase):
+    def test_training_matches_are_logged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = Config(
+                num_castles=4,
+                armies_per_player=20,
+                num_training_rounds=30,
+                population_size=10,
+                match_log_path=os.path.join(directory, "matches.log"),
+            )
+            trainer = Trainer(config, Game(config), "genetic", "random")
+            trainer.train()
+
+            reader = MatchLogReader(config.match_log_path)
+            self.assertEqual(reader.armies_per_player, 20)
+            records = reader.records
+            self.assertEqual(len(records), 3 * 10)
+            self.assertTrue((records["left_allocation"].sum(axis=1) == 20).all())
+            self.assertTrue((records["right_id"] == 0).all())
+            self.assertEqual(sorted(set(records["left_id"][:10])), list(range(10)))
+            expected_winner = records["left_score"] > records["right_score"]
+            self.assertTrue((expected_winner == (records["left_reward"] > 50)).all())
+
+    def test_archive_matches_are_logged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            config = Config(
+                num_castles=4,
+                armies_per_player=20,
+                num_training_rounds=40,
+                population_size=10,
+                hall_of_fame_size=5,
+                hall_of_fame_fraction=0.5,
+                match_log_path=os.path.join(directory, "matches.log"),
+            )
+            trainer = Trainer(config, Game(config), "genetic", "genetic")
+            trainer.train()
+
+            records = MatchLogReader(config.match_log_path).records
+            archived = (records["left_id"] == -1) | (records["right_id"] == -1)
+            self.assertTrue(archived.any())
+            self.assertEqual(len(records) - archived.sum() // 2, 4 * 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,208 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+from castle.game import Config, Game
+from castle.matchmaking import (
+    combine_results,
+    index_players,
+    player_rows,
+    sample_scheduled,
+    schedule_matches,
+    update_scheduled,
+)
+from castle.simulator import QPolicyStrategy
+from castle.trainer import Trainer
+from players.approximate import ApproximatePlayer
+from players.genetic import GeneticPlayer
+from players.reinforcement import ReinforcedPlayer
+
+
+class TestScheduleMatches(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_random(self):
+        left, right = schedule_matches("random", 10, 3, self.rng)
+        self.assertEqual(sorted(left), list(range(10)))
+        self.assertEqual(sorted(np.bincount(right)), [3, 3, 4])
+
+        left, right = schedule_matches("random", 1, 5, self.rng)
+        np.testing.assert_array_equal(left, 0)
+        self.assertEqual(sorted(right), list(range(5)))
+
+    def test_k_opponents(self):
+        left, right = schedule_matches("k_opponents", 6, 6, self.rng, opponents=3)
+        np.testing.assert_array_equal(np.bincount(left), 3)
+        np.testing.assert_array_equal(np.bincount(right), 3)
+        for player in range(6):
+            self.assertEqual(len(set(right[left == player])), 3)
+
+        left, right = schedule_matches("k_opponents", 2, 8, self.rng, opponents=2)
+        np.testing.assert_array_equal(np.bincount(left), 8)
+        np.testing.assert_array_equal(np.bincount(right), 2)
+
+    def test_stratified(self):
+        left_fitness = np.array([0.0, 3.0, 1.0, 2.0])
+        right_fitness = np.array([5.0, 7.0])
+        left, right = schedule_matches(
+            "stratified", 4, 2, self.rng, left_fitness, right_fitness
+        )
+        np.testing.assert_array_equal(left, [1, 3, 2, 0])
+        np.testing.assert_array_equal(right, [1, 1, 0, 0])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            schedule_matches("swiss", 4, 4, self.rng)
+        with self.assertRaises(ValueError):
+            schedule_matches("stratified", 4, 4, self.rng)
+        with self.assertRaises(ValueError):
+            schedule_matches("k_opponents", 4, 4, self.rng, opponents=0)
+
+
+class TestScheduledBatches(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=4, armies_per_player=12, seed=0)
+
+    def test_player_rows(self):
+        rows = {player: list(rows) for player, rows in player_rows(np.array([2, 0, 2]))}
+        self.assertEqual(rows, {0: [1], 2: [0, 2]})
+        players = [object(), object()]
+        distinct, indices = index_players([players[1], players[0], players[1]])
+        self.assertEqual(distinct, [players[1], players[0]])
+        np.testing.assert_array_equal(indices, [0, 1, 0])
+
+    def test_combine_results(self):
+        players = [object(), object()]
+        results = [(players[1], 1.0), (players[0], 4.0), (players[1], 3.0)]
+        self.assertEqual(
+            combine_results(results), [(players[1], 2.0), (players[0], 4.0)]
+        )
+
+    def test_single_update_per_player(self):
+        players = [GeneticPlayer(self.config), ReinforcedPlayer(self.config)]
+        indices = np.array([1, 0, 1, 1])
+        allocations = sample_scheduled(players, indices, 4)
+        np.testing.assert_array_equal(allocations.sum(axis=1), 12)
+        qmatrix = players[1].get_qmatrix().copy()
+        with patch.object(
+            ReinforcedPlayer, "update_batch", autospec=True
+        ) as update_batch:
+            update_scheduled(players, indices, allocations, np.arange(4.0), 0.5)
+        update_batch.assert_called_once()
+        np.testing.assert_array_equal(update_batch.call_args.args[2], [0.0, 2, 3])
+        self.assertEqual(players[0].rewards, [1.0])
+
+        update_scheduled(players, indices, allocations, np.full(4, 150.0), 0.5)
+        self.assertFalse(np.array_equal(players[1].get_qmatrix(), qmatrix))
+
+    def test_reinforced_sampling(self):
+        player = ReinforcedPlayer(self.config.replace(epsilon=0.0))
+        greedy = QPolicyStrategy(player.get_qmatrix(), epsilon=0).sample(
+            1, np.random.default_rng(0)
+        )
+        allocations = player.sample_allocations(3)
+        np.testing.assert_array_equal(allocations, np.repeat(greedy, 3, 0))
+        self.assertEqual(player.sampled_castles.shape, (3, 12))
+        # The last sample can still be learned from by a single update
+        self.assertEqual(len(player.last_actions), 12)
+
+    def test_approximate_batches(self):
+        config = self.config.replace(approximate_batch_size=4)
+        player = ApproximatePlayer(config)
+        weights = player.qfunction.weights.copy()
+        allocations = player.sample_allocations(3)
+        np.testing.assert_array_equal(allocations.sum(axis=1), 12)
+        player.update_batch(allocations, np.full(3, 150.0), 0.5)
+        self.assertEqual(len(player.batch_castles), 3)
+        player.update_batch(player.sample_allocations(2), np.full(2, -40.0), 0.5)
+        self.assertEqual(player.batch_castles, [])
+        self.assertFalse(np.array_equal(player.qfunction.weights, weights))
+
+        greedy = ApproximatePlayer(config.replace(epsilon=0.0))
+        expected = [greedy.distribute_armies()[castle] for castle in range(1, 5)]
+        np.testing.assert_array_equal(greedy.sample_allocations(2), [expected] * 2)
+
+
+class TestTrainerMatchmaking(unittest.TestCase):
+    def test_single_agent_learns_once_per_round(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=12,
+            population_size=10,
+            matchmaking="k_opponents",
+            matchmaking_opponents=3,
+            seed=0,
+        )
+        trainer = Trainer(config, Game(config), "genetic", "reinforced")
+        with patch.object(
+            ReinforcedPlayer,
+            "update_batch",
+            autospec=True,
+            side_effect=ReinforcedPlayer.update_batch,
+        ) as update_batch:
+            left_results, right_results = trainer.play_round(0)
+        update_batch.assert_called_once()
+        self.assertEqual(trainer.round_matches, 30)
+        self.assertEqual(len(left_results), 30)
+        self.assertTrue(all(len(p.rewards) == 3 for p in trainer.population_left))
+        self.assertTrue(
+            all(player is trainer.population_right[0] for player, _ in right_results)
+        )
+
+    def test_evolution_keeps_distinct_players(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=12,
+            population_size=40,
+            matchmaking="k_opponents",
+            matchmaking_opponents=3,
+            seed=0,
+        )
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
+        for round_number in range(2):
+            left_results, right_results = trainer.play_round(round_number)
+            self.assertEqual(len(left_results), 120)
+            trainer.evolve_populations(left_results, right_results)
+            for population in (trainer.population_left, trainer.population_right):
+                self.assertEqual(len(population), 40)
+                self.assertEqual(len({id(player) for player in population}), 40)
+
+    def test_budget_scales_opponents(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=12,
+            population_size=10,
+            matchmaking="k_opponents",
+            matchmaking_opponents=4,
+            match_budget=400,
+            budget_min_rounds=20,
+            seed=0,
+        )
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
+        left_wins, _ = trainer.train()
+        # A full round of 40 matches would only fit 10 rounds into the budget
+        self.assertLess(trainer.budget.depth, 1.0)
+        self.assertLess(trainer.round_matches, 40)
+        self.assertGreater(len(left_wins), 10)
+        self.assertLessEqual(trainer.budget.matches, 400)
+
+    def test_stratified_training(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=12,
+            population_size=10,
+            num_training_rounds=50,
+            matchmaking="stratified",
+            rating_fitness=True,
+            seed=0,
+        )
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
+        trainer.play_round(0)
+        ratings = np.array([player.rating[0] for player in trainer.population_left])
+        self.assertFalse(np.allclose(ratings, ratings[0]))
+        left_wins, _ = trainer.train()
+        self.assertEqual(len(left_wins), trainer.num_rounds)
+
+
+if __name__ == "__main__":
+    unittest.main()
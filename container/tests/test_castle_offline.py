@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from castle.checkpoint import load_qmatrix, save_qmatrix
+from castle.game import Config
+from castle.match_log import MatchLogReader, MatchLogWriter
+from castle.offline import OfflineTrainer
+
+
+class TestOfflineTrainer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "matches.log")
+        self.config = Config(
+            num_castles=3,
+            armies_per_player=4,
+            seed=0,
+            offline_minibatch_size=4,
+            offline_buffer_size=8,
+        )
+        # The left player always wins with everything on castle 3
+        with MatchLogWriter(self.path, 3, armies_per_player=4) as writer:
+            for match in range(20):
+                writer.append(0, 0, 1, [0, 0, 4], [2, 2, 0], 3, 3, 103.0, -47.0)
+            # A match from a differently sized game is skipped
+            writer.append(0, 0, 1, [0, 0, 9], [2, 2, 0], 3, 3, 103.0, -47.0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_experience_sides(self):
+        trainer = OfflineTrainer(self.config, MatchLogReader(self.path))
+        records = trainer.reader.records
+        allocations, rewards = trainer.experience(records)
+        self.assertEqual(len(allocations), 41)
+        trainer.config = self.config.replace(offline_sides="left")
+        allocations, rewards = trainer.experience(records)
+        self.assertEqual(len(allocations), 20)
+        self.assertTrue(np.all(rewards > 0))
+        trainer.config = self.config.replace(offline_sides="middle")
+        with self.assertRaises(ValueError):
+            trainer.experience(records)
+
+    def test_minibatches(self):
+        trainer = OfflineTrainer(self.config, MatchLogReader(self.path))
+        allocations = np.zeros((10, 3))
+        trainer.config = self.config.replace(offline_sampling="sequential")
+        batches = list(trainer.minibatches(allocations))
+        np.testing.assert_array_equal(np.concatenate(batches), np.arange(10))
+        trainer.config = self.config.replace(offline_sampling="uniform")
+        batches = list(trainer.minibatches(allocations))
+        self.assertEqual(len(batches), 3)
+        self.assertTrue(all(len(batch) == 4 for batch in batches))
+
+    def test_train_learns_winning_castle(self):
+        config = self.config.replace(offline_sides="left")
+        trainer = OfflineTrainer(config, MatchLogReader(self.path))
+        checkpoint = os.path.join(self.directory.name, "qmatrix.npy")
+        player = trainer.train(epochs=20, checkpoint_path=checkpoint)
+        qmatrix = player.get_qmatrix()
+        np.testing.assert_array_equal(np.argmax(qmatrix[1:], axis=1), [2, 2, 2, 2])
+        np.testing.assert_array_equal(load_qmatrix(checkpoint), qmatrix)
+
+    def test_castle_mismatch(self):
+        with self.assertRaises(ValueError):
+            OfflineTrainer(Config(num_castles=5), MatchLogReader(self.path))
+
+    def test_army_mismatch(self):
+        self.assertEqual(MatchLogReader(self.path).armies_per_player, 4)
+        with self.assertRaises(ValueError):
+            OfflineTrainer(Config(num_castles=3), MatchLogReader(self.path))
+
+    def test_no_valid_experience(self):
+        # A log that does not record its army count, from 9-army games
+        path = os.path.join(self.directory.name, "other.log")
+        with MatchLogWriter(path, 3) as writer:
+            writer.append(0, 0, 1, [0, 0, 9], [3, 3, 3], 3, 3, 103.0, -47.0)
+        trainer = OfflineTrainer(self.config, MatchLogReader(path))
+        with self.assertRaisesRegex(ValueError, "4 armies per player"):
+            trainer.train()
+
+    def test_save_qmatrix_replaces_atomically(self):
+        path = os.path.join(self.directory.name, "qmatrix.npy")
+        save_qmatrix(path, np.zeros((2, 3)))
+        save_qmatrix(path, np.ones((2, 3)))
+        np.testing.assert_array_equal(load_qmatrix(path), np.ones((2, 3)))
+        self.assertEqual(os.listdir(self.directory.name).count("qmatrix.npy"), 1)
+        self.assertFalse(
+            any(name.endswith(".tmp") for name in os.listdir(self.directory.name))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
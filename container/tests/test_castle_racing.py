@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from castle.game import Config, Game
+from castle.racing import RacingEvaluator
+from castle.trainer import Trainer
+from players.genetic import GeneticPlayer
+from players.player import RandomPlayer
+
+
+class TestRacingEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(
+            num_castles=5, armies_per_player=50, racing_opponent_samples=64
+        )
+        self.game = Game(self.config)
+        self.evaluator = RacingEvaluator(self.config, self.game)
+        self.population = [GeneticPlayer(self.config) for _ in range(20)]
+        self.opponents = [RandomPlayer(self.config)]
+
+    def test_evaluate_shapes_and_budget(self):
+        means, counts = self.evaluator.evaluate(self.population, self.opponents, 2)
+        self.assertEqual(means.shape, (20,))
+        self.assertTrue(np.all(counts >= self.config.racing_initial_matches))
+        self.assertTrue(np.all(counts <= self.config.racing_max_matches))
+
+    def test_boundary_individuals_get_more_matches(self):
+        # A player piling everything on the top castle is clearly worse than
+        # spreading out; the racing should stop evaluating it early.
+        weak = GeneticPlayer(self.config)
+        weak.chromosome.genes = np.array([0.0, 0.0, 0.0, 0.0, 1.0])
+        population = [weak] + self.population
+        _, counts = self.evaluator.evaluate(population, self.opponents, 5)
+        self.assertLess(counts[0], counts.max())
+
+    def test_right_side_evaluation(self):
+        means, _ = self.evaluator.evaluate(
+            self.population, self.opponents, 2, left_side=False
+        )
+        self.assertEqual(means.shape, (20,))
+
+
+class TestTrainerRacing(unittest.TestCase):
+    def test_play_round_uses_raced_scores(self):
+        config = Config(
+            num_castles=5,
+            armies_per_player=20,
+            num_training_rounds=20,
+            population_size=10,
+            racing=True,
+            racing_opponent_samples=16,
+        )
+        trainer = Trainer(config, Game(config), "genetic", "random")
+        left_results, right_results = trainer.play_round(0)
+        self.assertEqual(len(left_results), 10)
+        self.assertEqual(
+            [player for player, _ in left_results], trainer.population_left
+        )
+        trainer.evolve_populations(left_results, right_results)
+        self.assertEqual(len(trainer.population_left), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from castle.checkpoint import load_elite_ratings
+from castle.game import Config, Game
+from castle.rating import (
+    INITIAL_RATING,
+    expected_scores,
+    glicko_update,
+    initial_rating,
+    rating_score,
+)
+from castle.trainer import Trainer
+from players.cmaes import CMAESPlayer
+from players.genetic import GeneticPlayer
+
+
+class TestGlicko(unittest.TestCase):
+    def test_glickman_example(self):
+        # The worked example of Glickman's description of the Glicko system
+        ratings = np.array(
+            [
+                [1500, 200**2],
+                [1400, 30**2],
+                [1550, 100**2],
+                [1700, 300**2],
+            ],
+            dtype=float,
+        )
+        updated = glicko_update(
+            ratings, np.array([0, 0, 0]), np.array([1, 2, 3]), np.array([1, 0, 0])
+        )
+        self.assertAlmostEqual(updated[0, 0], 1464.1, delta=0.1)
+        self.assertAlmostEqual(np.sqrt(updated[0, 1]), 151.4, delta=0.2)
+
+    def test_symmetric_match(self):
+        ratings = np.tile(initial_rating(Config()), (2, 1))
+        updated = glicko_update(ratings, np.array([0]), np.array([1]), np.array([1]))
+        self.assertGreater(updated[0, 0], INITIAL_RATING)
+        self.assertAlmostEqual(
+            updated[0, 0] - INITIAL_RATING, INITIAL_RATING - updated[1, 0]
+        )
+        self.assertTrue(np.all(updated[:, 1] < ratings[:, 1]))
+        draw = glicko_update(ratings, np.array([0]), np.array([1]), np.array([0.5]))
+        np.testing.assert_allclose(draw[:, 0], INITIAL_RATING)
+
+    def test_unmatched_players_and_variance_floor(self):
+        ratings = np.array([[1500, 30.0**2], [1500, 30.0**2], [1600, 10.0**2]])
+        updated = glicko_update(
+            ratings, np.array([0]), np.array([1]), np.array([0]), 30.0**2
+        )
+        np.testing.assert_array_equal(updated[2], ratings[2])
+        self.assertEqual(updated[0, 1], 30.0**2)
+
+    def test_expected_scores(self):
+        self.assertAlmostEqual(expected_scores(1500, 1500, 0.0), 0.5)
+        self.assertGreater(expected_scores(1700, 1500, 0.0), 0.75)
+        # An uncertain opponent rating pulls the expectation towards 0.5
+        self.assertLess(
+            expected_scores(1700, 1500, 350.0**2), expected_scores(1700, 1500, 0.0)
+        )
+
+
+class TestRatingFitness(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=4, armies_per_player=20, rating_fitness=True)
+
+    def test_genetic_player(self):
+        player = GeneticPlayer(self.config)
+        player.rating = np.array([1600.0, 100.0**2])
+        player.update(150, 0.5)
+        self.assertEqual(player.rewards, [])
+        self.assertEqual(player.fitness(), 1500.0)
+        self.assertEqual(player.fitness(), rating_score(player.rating, self.config))
+        offspring = player.copy()
+        np.testing.assert_array_equal(offspring.rating, [1600.0, 350.0**2])
+        np.testing.assert_array_equal(player.rating, [1600.0, 100.0**2])
+
+    def test_cmaes_candidates_start_unrated(self):
+        player = CMAESPlayer(self.config)
+        player.rating = np.array([1600.0, 100.0**2])
+        player.set_logits(np.ones(4))
+        np.testing.assert_array_equal(player.rating, initial_rating(self.config))
+
+    def test_trainer_rates_and_checkpoints(self):
+        config = self.config.replace(num_training_rounds=60, population_size=10)
+        with tempfile.TemporaryDirectory() as directory:
+            trainer = Trainer(
+                config.replace(checkpoint_dir=directory),
+                Game(config),
+                "genetic",
+                "random",
+            )
+            trainer.train()
+            ratings = np.array([player.rating for player in trainer.population_left])
+            self.assertFalse(np.allclose(ratings[:, 0], INITIAL_RATING))
+            self.assertTrue(all(not p.rewards for p in trainer.population_left))
+            # The single random opponent is rated from all of its matches
+            self.assertLess(trainer.population_right[0].rating[1], 100.0**2)
+
+            path = os.path.join(directory, "left_elites.npz")
+            saved = load_elite_ratings(path)
+            np.testing.assert_array_equal(saved[0], trainer.population_left[0].rating)
+            warm = config.replace(warm_start_elites=path, warm_start_fraction=0.5)
+            seeded = Trainer(warm, Game(warm), "genetic", "random")
+            np.testing.assert_array_equal(seeded.population_left[0].rating, saved[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import numpy as np
+from castle.game import Config
+from castle.serving import (
+    PolicyClient,
+    PolicyServer,
+    benchmark_serving,
+    compile_policy,
+    load_policy,
+    save_policy,
+)
+from castle.simulator import QPolicyStrategy
+from players.genetic import GeneticPlayer
+from players.player import RandomPlayer
+from players.reinforcement import ReinforcedPlayer
+
+
+class TestCompiledPolicy(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=5, armies_per_player=20, seed=0)
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_genetic_policy(self):
+        player = GeneticPlayer(self.config)
+        player.chromosome.genes = np.array([0.1, 0.1, 0.2, 0.2, 0.4])
+        policy = compile_policy(player, bank_size=2000)
+        self.assertEqual(policy.bank.shape, (2000, 5))
+        np.testing.assert_array_equal(policy.bank.sum(axis=1), 20)
+        np.testing.assert_allclose(
+            policy.bank.mean(axis=0), 20 * player.chromosome.genes, atol=0.3
+        )
+        self.assertEqual(sum(policy.distribute_armies().values()), 20)
+
+    def test_reinforced_policy_is_greedy(self):
+        player = ReinforcedPlayer(self.config)
+        policy = compile_policy(player)
+        greedy = QPolicyStrategy(player.get_qmatrix(), epsilon=0).sample(
+            1, np.random.default_rng(0)
+        )
+        np.testing.assert_array_equal(policy.allocations(3), np.repeat(greedy, 3, 0))
+        self.assertEqual(len(policy.greedy), 20)
+
+    def test_other_players_are_rejected(self):
+        with self.assertRaises(ValueError):
+            compile_policy(RandomPlayer(self.config))
+
+    def test_allocations_wrap_around_the_bank(self):
+        policy = compile_policy(GeneticPlayer(self.config), bank_size=5)
+        first = policy.allocations(3)
+        second = policy.allocations(4)
+        np.testing.assert_array_equal(first, policy.bank[:3])
+        np.testing.assert_array_equal(second, policy.bank[[3, 4, 0, 1]])
+        self.assertEqual(second.dtype, np.int32)
+
+    def test_save_and_load(self):
+        path = os.path.join(self.directory.name, "policy.npz")
+        for player in (GeneticPlayer(self.config), ReinforcedPlayer(self.config)):
+            policy = compile_policy(player, bank_size=10)
+            save_policy(path, policy)
+            loaded = load_policy(path)
+            self.assertEqual(loaded.kind, policy.kind)
+            np.testing.assert_array_equal(loaded.bank, policy.bank)
+            np.testing.assert_array_equal(
+                loaded.allocations(12), policy.allocations(12)
+            )
+
+
+class TestPolicyServer(unittest.TestCase):
+    def setUp(self):
+        config = Config(num_castles=5, armies_per_player=20, seed=0)
+        self.policy = compile_policy(GeneticPlayer(config), bank_size=100)
+        self.expected = compile_policy(GeneticPlayer(config.replace()), 100).bank
+        self.directory = tempfile.TemporaryDirectory()
+        self.address = "unix:" + os.path.join(self.directory.name, "policy.sock")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_serves_batches(self):
+        async def run():
+            server = PolicyServer({"genetic": self.policy}, max_batch=64)
+            await server.start(self.address)
+            client = await PolicyClient.connect(self.address)
+            try:
+                batches = [await client.allocations("genetic", 8) for _ in range(2)]
+                with self.assertRaises(KeyError):
+                    await client.allocations("missing", 1)
+                with self.assertRaises(ValueError):
+                    await client.allocations("genetic", 65)
+                return batches
+            finally:
+                await client.close()
+                await server.close()
+
+        first, second = asyncio.run(run())
+        np.testing.assert_array_equal(first, self.expected[:8])
+        np.testing.assert_array_equal(second, self.expected[8:16])
+        self.assertFalse(os.path.exists(self.address[len("unix:") :]))
+
+    def test_benchmark(self):
+        results = benchmark_serving(
+            self.policy, self.address, requests=50, batch_size=4, concurrency=3
+        )
+        self.assertAlmostEqual(
+            results["allocations_per_second"], 4 * results["requests_per_second"]
+        )
+        self.assertGreater(results["p99_latency_us"], 0)
+        self.assertGreater(results["in_process_us_per_request"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
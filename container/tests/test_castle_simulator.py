@@ -0,0 +1,98 @@
+import unittest
+import numpy as np
+from castle.game import Config
+from castle.simulator import (
+    FixedStrategy,
+    MixedStrategy,
+    MultinomialStrategy,
+    QPolicyStrategy,
+    as_strategies,
+    simulate,
+    strategies_from_players,
+)
+from players.equilibrium import EquilibriumPlayer
+from players.approximate import ApproximatePlayer
+from players.genetic import GeneticPlayer
+from players.player import RandomPlayer
+from players.reinforcement import ReinforcedPlayer
+
+
+class TestStrategies(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def test_allocations_use_all_armies(self):
+        qmatrix = self.rng.random((21, 4))
+        strategies = [
+            MultinomialStrategy([1, 2, 3, 4], 20),
+            FixedStrategy([5, 5, 5, 5]),
+            MixedStrategy([[20, 0, 0, 0], [0, 0, 0, 20]], [1, 3]),
+            QPolicyStrategy(qmatrix, 0.3),
+        ]
+        for strategy in strategies:
+            allocations = strategy.sample(50, self.rng)
+            self.assertEqual(allocations.shape, (50, 4))
+            self.assertTrue((allocations.sum(axis=1) == 20).all())
+
+    def test_greedy_q_policy(self):
+        qmatrix = np.zeros((11, 3))
+        qmatrix[:, 1] = 1
+        allocations = QPolicyStrategy(qmatrix, 0.0).sample(3, self.rng)
+        np.testing.assert_array_equal(allocations, [[0, 10, 0]] * 3)
+
+
+class TestSimulate(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=3, armies_per_player=9, seed=0)
+
+    def test_fixed_strategies(self):
+        strong = FixedStrategy([0, 4, 5])
+        weak = FixedStrategy([9, 0, 0])
+        equal = FixedStrategy([3, 3, 3])
+        result = simulate(self.config, [strong, weak], [weak, equal], 10)
+        np.testing.assert_array_equal(result.matches, [[10, 10], [10, 10]])
+        np.testing.assert_array_equal(result.win_rate, [[1, 1], [0, 0]])
+        np.testing.assert_array_equal(result.tie_rate, [[0, 0], [1, 0]])
+        np.testing.assert_array_equal(result.mean_score1, [[5, 5], [0, 1]])
+        np.testing.assert_array_equal(result.losses, [[0, 0], [0, 10]])
+
+    def test_chunks_and_workers_do_not_change_the_result(self):
+        genes = np.array([[1.0, 1.0, 1.0], [0.2, 0.3, 0.5]])
+        results = [
+            simulate(self.config.replace(simulator_chunk_size=size), genes, genes, 500)
+            for size in (64, 64, 100000)
+        ]
+        for result in results:
+            np.testing.assert_array_equal(result.matches, 500)
+        np.testing.assert_array_equal(results[0].wins, results[1].wins)
+        parallel = simulate(
+            self.config.replace(simulator_chunk_size=64), genes, genes, 500, workers=2
+        )
+        np.testing.assert_array_equal(parallel.wins, results[0].wins)
+
+    def test_as_strategies(self):
+        fixed = as_strategies(np.array([[3, 3, 3]]), self.config)
+        self.assertIsInstance(fixed[0], FixedStrategy)
+        genes = as_strategies(np.array([[0.5, 0.5, 0.0]]), self.config)
+        self.assertIsInstance(genes[0], MultinomialStrategy)
+
+    def test_strategies_from_players(self):
+        config = self.config.replace(
+            equilibrium_strategies=5, simulator_policy_samples=8
+        )
+        players = [
+            GeneticPlayer(config),
+            ReinforcedPlayer(config),
+            EquilibriumPlayer(config),
+            RandomPlayer(config),
+            ApproximatePlayer(config),
+        ]
+        strategies = strategies_from_players(players)
+        self.assertEqual(len(strategies[-1].allocations), 8)
+        result = simulate(config, strategies, strategies, 20)
+        self.assertEqual(result.wins.shape, (5, 5))
+        self.assertTrue((result.matches == 20).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import unittest
+from castle.game import Config
+from castle.sweep import (
+    METRIC_COLUMNS,
+    build_config,
+    completed_hashes,
+    config_hash,
+    expand_jobs,
+    run_job,
+    run_sweep,
+)
+
+SMALL_BASE = {
+    "num_castles": 3,
+    "armies_per_player": 10,
+    "num_training_rounds": 20,
+    "num_matches": 5,
+    "population_size": 10,
+    "left_player": "genetic",
+    "right_player": "random",
+}
+
+
+class TestSweep(unittest.TestCase):
+    def test_config_hash_is_order_independent(self):
+        self.assertEqual(
+            config_hash({"a": 1, "b": 2.0}), config_hash({"b": 2.0, "a": 1})
+        )
+        self.assertNotEqual(config_hash({"a": 1}), config_hash({"a": 2}))
+
+    def test_expand_grid(self):
+        spec = {
+            "parameters": {"epsilon": [0.1, 0.2], "learning_rate": [0.01, 0.05, 0.1]},
+            "seeds": [0, 1],
+        }
+        jobs = expand_jobs(spec)
+        self.assertEqual(len(jobs), 12)
+        self.assertEqual(len({job["hash"] for job in jobs}), 12)
+
+    def test_expand_random(self):
+        spec = {
+            "search": "random",
+            "samples": 5,
+            "parameters": {
+                "mutation_std_dev": {"low": 0.01, "high": 1.0, "log": True},
+                "population_size": {"low": 10, "high": 100, "integer": True},
+                "epsilon": [0.1, 0.3],
+            },
+        }
+        jobs = expand_jobs(spec)
+        self.assertEqual(len(jobs), 5)
+        for job in jobs:
+            self.assertTrue(0.01 <= job["params"]["mutation_std_dev"] <= 1.0)
+            self.assertIsInstance(job["params"]["population_size"], int)
+            self.assertIn(job["params"]["epsilon"], [0.1, 0.3])
+        self.assertEqual(jobs, expand_jobs(spec))
+
+    def test_jobs_with_default_values_are_the_same_job(self):
+        explicit = expand_jobs({"base": {"epsilon": Config().epsilon}})[0]
+        implicit = expand_jobs({})[0]
+        self.assertEqual(explicit["hash"], implicit["hash"])
+
+    def test_expand_invalid_search(self):
+        with self.assertRaises(ValueError):
+            expand_jobs({"search": "bayesian"})
+
+    def test_build_config(self):
+        config = build_config({"num_castles": 4, "epsilon": 0.5}, seed=3)
+        self.assertEqual(config.num_castles, 4)
+        self.assertEqual(len(config.points_per_castle), 4)
+        self.assertEqual(config.epsilon, 0.5)
+        with self.assertRaises(ValueError):
+            build_config({"no_such_parameter": 1})
+
+    def test_run_job(self):
+        job = expand_jobs({"base": SMALL_BASE})[0]
+        row = run_job(job)
+        self.assertEqual(row["status"], "ok")
+        self.assertTrue(0 <= row["left_win_rate"] <= 1)
+
+    def test_run_job_failure_is_recorded(self):
+        job = expand_jobs({"base": {"unknown_parameter": 1}})[0]
+        row = run_job(job)
+        self.assertEqual(row["status"], "failed")
+        self.assertIn("unknown_parameter", row["error"])
+
+    def test_run_sweep_skips_completed(self):
+        spec = {"base": SMALL_BASE, "parameters": {"mutation_std_dev": [0.05, 0.2]}}
+        with tempfile.TemporaryDirectory() as directory:
+            results_path = os.path.join(directory, "results.csv")
+            rows = run_sweep(spec, results_path, workers=2)
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(len(completed_hashes(results_path)), 2)
+
+            self.assertEqual(run_sweep(spec, results_path, workers=2), [])
+
+            spec["parameters"]["mutation_std_dev"].append(0.5)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(len(run_sweep(spec, results_path, workers=2)), 1)
+            self.assertIn(
+                "Running 1 jobs, skipping 2 completed ones", output.getvalue()
+            )
+            with open(results_path, newline="") as results_file:
+                self.assertEqual(len(list(csv.DictReader(results_file))), 3)
+
+    def test_run_sweep_adds_new_parameter_columns(self):
+        spec = {"base": SMALL_BASE, "parameters": {"mutation_std_dev": [0.05]}}
+        with tempfile.TemporaryDirectory() as directory:
+            results_path = os.path.join(directory, "results.csv")
+            run_sweep(spec, results_path, workers=1)
+            spec["parameters"] = {"point_mutation_rate": [0.5]}
+            run_sweep(spec, results_path, workers=1)
+            with open(results_path, newline="") as results_file:
+                reader = csv.DictReader(results_file)
+                rows = list(reader)
+            self.assertIn("point_mutation_rate", reader.fieldnames)
+            self.assertIn("mutation_std_dev", reader.fieldnames)
+            self.assertEqual(reader.fieldnames[-len(METRIC_COLUMNS) :], METRIC_COLUMNS)
+            self.assertEqual(
+                [(row["mutation_std_dev"], row["point_mutation_rate"]) for row in rows],
+                [("0.05", ""), ("", "0.5")],
+            )
+            self.assertEqual([row["status"] for row in rows], ["ok", "ok"])
+
+    def test_limit_fails_only_the_job_over_it(self):
+        spec = {
+            "base": SMALL_BASE,
+            "parameters": {"num_training_rounds": [10, 10**7, 20]},
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            rows = run_sweep(
+                spec, os.path.join(directory, "results.csv"), workers=1, max_seconds=2
+            )
+        statuses = {row["num_training_rounds"]: row["status"] for row in rows}
+        self.assertEqual(statuses, {10: "ok", 10**7: "failed", 20: "ok"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,14 @@
+import contextlib
+import io
+import os
+import tempfile
 import unittest
 from unittest.mock import Mock, patch
 import numpy as np
 from castle.game import Config, Game
+from castle.budget import TrainingBudget
 from castle.trainer import Trainer
+from castle.checkpoint import load_elites, save_elites
 from players.player import RandomPlayer
 from players.reinforcement import ReinforcedPlayer
 from players.genetic import GeneticPlayer
@@ -78,6 +84,25 @@ class TestTrainer(unittest.TestCase):
         self.assertEqual(len(new_population), len(initial_population))
         self.assertNotEqual(new_population, initial_population)
 
+    def test_evolve_population_records_diversity(self):
+        config = self.config.replace(population_size=40, fitness_sharing=True)
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
+        population = trainer.population_left
+        results = [(player, np.random.random()) for player in population]
+        new_population = trainer.evolve_population(population, results, "left")
+        diversity = trainer.diversity_history["left"][-1]
+        self.assertGreater(diversity["gene_variance"], 0)
+        self.assertGreater(diversity["mean_distance"], 0)
+        self.assertGreaterEqual(diversity["mean_niche_count"], 1)
+
+        # Only the offspring are new; the elites keep their distance rows
+        results = [(player, np.random.random()) for player in new_population]
+        trainer.evolve_population(new_population, results, "left")
+        cache = trainer.distance_caches["left"]
+        self.assertEqual(
+            cache.recomputed_rows, len(population) - trainer.elitism_count(population)
+        )
+
     @patch("players.reinforcement.ReinforcedPlayer.distribute_armies")
     @patch("players.reinforcement.ReinforcedPlayer.update")
     def test_update_players(self, mock_update, mock_distribute):
@@ -97,14 +122,194 @@ class TestTrainer(unittest.TestCase):
         mock_update.assert_any_call(10, training_progress=0.5)
         mock_update.assert_any_call(-10, training_progress=0.5)
 
+    def test_self_play_single_population(self):
+        config = self.config.replace(population_size=11, self_play=True)
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
+        self.assertIs(trainer.population_left, trainer.population_right)
+
+        with patch.object(
+            trainer, "play_game", wraps=trainer.play_game
+        ) as mock_play_game:
+            left_results, right_results = trainer.play_round(0)
+        # Five pairs within the population plus one for the odd player out
+        self.assertEqual(mock_play_game.call_count, 6)
+        results = trainer.self_play_results(left_results, right_results)
+        self.assertCountEqual(
+            [id(player) for player, _ in results],
+            [id(player) for player in trainer.population_left],
+        )
+
+        with patch.object(
+            trainer, "evolve_population", wraps=trainer.evolve_population
+        ) as mock_evolve:
+            trainer.evolve_populations(left_results, right_results)
+        mock_evolve.assert_called_once()
+        self.assertIs(trainer.population_left, trainer.population_right)
+        self.assertEqual(len(trainer.population_left), 11)
+        self.assertIs(trainer.best_player("right"), trainer.best_player("left"))
+
+    def test_evolve_cmaes_population(self):
+        config = self.config.replace(population_size=20)
+        trainer = Trainer(config, Game(config), "cmaes", "genetic")
+        population = trainer.population_left
+        self.assertEqual(list(trainer.evolution_strategies), ["left"])
+        results = [(player, np.random.random()) for player in population]
+        logits = [player.logits.copy() for player in population]
+        new_population = trainer.evolve_population(population, results, "left")
+
+        self.assertEqual(len(new_population), 20)
+        strategy = trainer.evolution_strategies["left"]
+        self.assertEqual(strategy.generation, 1)
+        best = trainer.best_player("left")
+        self.assertIs(best, new_population[0])
+        np.testing.assert_array_equal(best.logits, strategy.mean)
+        self.assertFalse(np.array_equal(new_population[1].logits, logits[1]))
+        self.assertEqual(len(trainer.diversity_history["left"]), 1)
+
+    def test_self_play_needs_matching_populations(self):
+        config = self.config.replace(population_size=10, self_play=True)
+        for left, right in (("genetic", "random"), ("reinforced", "reinforced")):
+            with self.assertRaises(ValueError):
+                Trainer(config, Game(config), left, right)
+
+    def test_exploitability_history(self):
+        config = self.config.replace(
+            population_size=10, num_training_rounds=40, exploitability_interval=2
+        )
+        trainer = Trainer(config, Game(config), "genetic", "reinforced")
+        trainer.train()
+        self.assertEqual(
+            [
+                round_number
+                for round_number, _ in trainer.exploitability_history["left"]
+            ],
+            [1, 3],
+        )
+        for side in ("left", "right"):
+            for _, value in trainer.exploitability_history[side]:
+                self.assertGreater(value, 0)
+
+    def test_warm_start_from_checkpoint(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=20,
+            num_training_rounds=200,
+            population_size=20,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            trained = Trainer(
+                config.replace(checkpoint_dir=directory),
+                Game(config),
+                "genetic",
+                "reinforced",
+            )
+            trained.train()
+            self.assertTrue(
+                os.path.exists(os.path.join(directory, "right_qmatrix.npy"))
+            )
+            self.assertEqual(
+                Config.from_file(os.path.join(directory, "config.json")).checkpoint_dir,
+                directory,
+            )
+
+            warm = config.replace(
+                warm_start_elites=os.path.join(directory, "left_elites.npz"),
+                warm_start_qmatrix=os.path.join(directory, "right_qmatrix.npy"),
+                warm_start_fraction=0.5,
+            )
+            trainer = Trainer(warm, Game(warm), "genetic", "reinforced")
+            elites = load_elites(os.path.join(directory, "left_elites.npz"))
+            self.assertEqual(
+                len(elites), trained.elitism_count(trained.population_left)
+            )
+            np.testing.assert_allclose(
+                trainer.population_left[0].chromosome.genes, elites[0]
+            )
+            # Noisy copies fill half the population, the rest stays random
+            seeded = [player.chromosome.genes for player in trainer.population_left]
+            self.assertFalse(np.allclose(seeded[len(elites)], elites[0]))
+            np.testing.assert_array_equal(
+                trainer.population_right[0].get_qmatrix(),
+                trained.population_right[0].get_qmatrix(),
+            )
+
+    def test_cmaes_checkpoint_saves_the_mean(self):
+        config = Config(num_castles=4, num_training_rounds=20, population_size=10)
+        with tempfile.TemporaryDirectory() as directory:
+            trainer = Trainer(
+                config.replace(checkpoint_dir=directory),
+                Game(config),
+                "cmaes",
+                "genetic",
+            )
+            trainer.train()
+            with np.load(os.path.join(directory, "left_elites.npz")) as saved:
+                self.assertEqual(str(saved["source"]), "cmaes_mean")
+                np.testing.assert_array_equal(
+                    saved["genes"], [trainer.best_player("left").chromosome.genes]
+                )
+            with np.load(os.path.join(directory, "right_elites.npz")) as saved:
+                self.assertEqual(str(saved["source"]), "elites")
+                fitness = saved["fitness"]
+                self.assertTrue(np.all(fitness[:-1] >= fitness[1:]))
+
+    def test_warm_start_rejects_other_board(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "elites.npz")
+            save_elites(path, np.full((2, 3), 1 / 3))
+            config = Config(num_castles=4, population_size=5, warm_start_elites=path)
+            with self.assertRaises(ValueError):
+                Trainer(config, Game(config), "genetic", "random")
+
+    def test_match_budget_with_checkpoints(self):
+        config = Config(
+            num_castles=4,
+            armies_per_player=20,
+            num_training_rounds=10,
+            population_size=10,
+            racing=True,
+            racing_max_matches=16,
+            match_budget=2000,
+            budget_min_rounds=20,
+            checkpoint_interval=0,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            trainer = Trainer(
+                config.replace(checkpoint_dir=directory),
+                Game(config),
+                "genetic",
+                "cmaes",
+            )
+            left_wins, _ = trainer.train()
+            # The budget, not num_training_rounds, decides the round count
+            self.assertGreater(len(left_wins), 1)
+            self.assertLessEqual(trainer.budget.matches, 2000)
+            self.assertEqual(trainer.budget.rounds, len(left_wins))
+            # Racing depth was cut to fit budget_min_rounds into the budget
+            self.assertLess(trainer.budget.depth, 1.0)
+            for side in ("left", "right"):
+                self.assertTrue(
+                    os.path.exists(os.path.join(directory, f"{side}_elites.npz"))
+                )
+
+    def test_budget_progress_output(self):
+        config = self.config.replace(match_budget=200)
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
+        trainer.budget = TrainingBudget(config)
+        trainer.budget.record_round(50)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            trainer.print_progress(56, [(Mock(), 1.0)], [(Mock(), 0.0)])
+        self.assertIn("Round 57 (25% of budget)", output.getvalue())
+        self.assertNotIn(f"/{trainer.num_rounds}", output.getvalue())
+
     @patch("castle.trainer.Trainer.play_round")
     @patch("castle.trainer.Trainer.evolve_population")
     def test_train(self, mock_evolve, mock_play_round):
         mock_play_round.return_value = ([(Mock(), 1)], [(Mock(), 0)])
-        trainer = Trainer(self.config, self.game, "genetic", "genetic")
-
         # Update the num_training_rounds to match the actual implementation
-        trainer.config.num_training_rounds = 1
+        config = self.config.replace(num_training_rounds=1)
+        trainer = Trainer(config, Game(config), "genetic", "genetic")
 
         trainer.train()
 
@@ -0,0 +1,126 @@
+import copy
+import pickle
+import unittest
+import numpy as np
+from castle.game import Config
+from players.approximate import (
+    NUM_SHARED_FEATURES,
+    ApproximatePlayer,
+    LinearQFunction,
+    MLPQFunction,
+    placement_features,
+)
+
+
+class TestPlacementFeatures(unittest.TestCase):
+    def test_features(self):
+        features = placement_features(
+            np.array([10, 4]), np.array([[0, 0], [3, 3]]), np.array([0.5, 1]), 10
+        )
+        self.assertEqual(features.shape, (2, 2, NUM_SHARED_FEATURES + 2))
+        np.testing.assert_allclose(features[:, :, 1], [[1, 1], [0.4, 0.4]])
+        np.testing.assert_allclose(features[1, :, 3], [0.3, 0.3])
+        np.testing.assert_array_equal(features[0, :, NUM_SHARED_FEATURES:], np.eye(2))
+
+
+class TestQFunctions(unittest.TestCase):
+    def test_updates_reduce_error(self):
+        rng = np.random.default_rng(0)
+        features = rng.random((64, 5))
+        targets = features @ np.array([1.0, -2.0, 0.5, 0.0, 1.0])
+        for qfunction in (
+            LinearQFunction(np.zeros(5), rng),
+            MLPQFunction(np.zeros(5), 16, rng),
+        ):
+            initial_error = np.mean((targets - qfunction.predict(features)) ** 2)
+            for _ in range(200):
+                qfunction.update(features, targets - qfunction.predict(features), 0.5)
+            final_error = np.mean((targets - qfunction.predict(features)) ** 2)
+            self.assertLess(final_error, initial_error / 10)
+
+
+class TestApproximatePlayer(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(approximate_model="mlp", approximate_batch_size=4, seed=0)
+        self.player = ApproximatePlayer(self.config)
+
+    def test_distribute_armies(self):
+        distribution = self.player.distribute_armies()
+        self.assertEqual(sum(distribution.values()), self.config.armies_per_player)
+        self.assertEqual(len(distribution), self.config.num_castles)
+        np.testing.assert_array_equal(
+            np.bincount(self.player.last_castles, minlength=self.config.num_castles),
+            list(distribution.values()),
+        )
+
+    def test_updates_in_batches(self):
+        weights = self.player.qfunction.output_weights.copy()
+        for game in range(4):
+            self.player.distribute_armies()
+            self.player.update(self.config.reinforced_win_reward, 0.5)
+            if game < 3:
+                self.assertEqual(len(self.player.batch_castles), game + 1)
+                np.testing.assert_array_equal(
+                    self.player.qfunction.output_weights, weights
+                )
+        self.assertEqual(self.player.batch_castles, [])
+        self.assertFalse(np.array_equal(self.player.qfunction.output_weights, weights))
+
+    def test_update_without_distribution(self):
+        self.player.update(50, 0.5)
+        self.assertEqual(self.player.batch_castles, [])
+
+    def test_trajectory_features_match_placements(self):
+        castles = np.array([[0, 0, 1], [2, 1, 0]])
+        features = self.player.trajectory_features(castles)
+        placed = np.zeros(self.config.num_castles)
+        for step, castle in enumerate(castles[1]):
+            np.testing.assert_allclose(
+                features[1, step],
+                placement_features(
+                    [3 - step],
+                    placed[None, :],
+                    self.player.castle_values,
+                    self.config.armies_per_player,
+                )[0],
+            )
+            placed[castle] += 1
+
+    def test_train_batch_moves_towards_reward(self):
+        config = self.config.replace(approximate_model="linear")
+        player = ApproximatePlayer(config)
+        castles = np.full((8, config.armies_per_player), 9)
+        features = player.trajectory_features(castles)[0, 0]
+        before = player.qfunction.predict(features)[9]
+        player.train_batch(castles, np.ones(8), 0.1)
+        self.assertGreater(player.qfunction.predict(features)[9], before)
+
+    def test_prior_spreads_armies_by_value(self):
+        player = ApproximatePlayer(self.config.replace(epsilon=0.0))
+        allocation = list(player.distribute_armies().values())
+        self.assertEqual(allocation, sorted(allocation))
+        self.assertLess(allocation[-1], self.config.armies_per_player / 3)
+
+    def test_invalid_model(self):
+        with self.assertRaises(ValueError):
+            ApproximatePlayer(self.config.replace(approximate_model="tree"))
+
+    def test_scales_with_armies(self):
+        small = ApproximatePlayer(self.config.replace(armies_per_player=10))
+        large = ApproximatePlayer(self.config.replace(armies_per_player=10000))
+        self.assertEqual(
+            small.qfunction.hidden_weights.shape, large.qfunction.hidden_weights.shape
+        )
+
+    def test_copy_and_pickle(self):
+        player_copy = copy.deepcopy(self.player)
+        self.assertIs(player_copy.config, self.player.config)
+        self.assertIsNot(player_copy.qfunction, self.player.qfunction)
+        restored = pickle.loads(pickle.dumps(self.player))
+        np.testing.assert_array_equal(
+            restored.qfunction.hidden_weights, self.player.qfunction.hidden_weights
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -35,12 +35,67 @@ class TestChromosome(unittest.TestCase):
         self.chromosome.mutate(mutation_rate=0.5, mutation_amount=0.2)
         self.assertFalse(np.array_equal(original_genes, self.chromosome.genes))
 
+    def test_mutate_defaults_to_config(self):
+        self.chromosome.config = self.config.replace(
+            point_mutation_rate=0.0, mutation_operators=("gaussian",)
+        )
+        original_genes = self.chromosome.genes.copy()
+        self.chromosome.mutate()
+        # Even at rate 0 exactly one gene is mutated before normalizing
+        self.assertFalse(np.array_equal(original_genes, self.chromosome.genes))
+        self.assertAlmostEqual(sum(self.chromosome.genes), 1.0, places=7)
+
     def test_get_distribution(self):
         total_armies = 100
         distribution = self.chromosome.get_distribution(total_armies)
         self.assertEqual(sum(distribution), total_armies)
         self.assertEqual(len(distribution), self.config.num_castles)
 
+    def test_get_distribution_uses_bank(self):
+        self.chromosome.get_distribution(100)
+        bank = self.chromosome._bank
+        self.assertEqual(len(bank), self.config.sample_bank_size)
+        second = self.chromosome.get_distribution(100)
+        self.assertIs(self.chromosome._bank, bank)
+        np.testing.assert_array_equal(second, bank[1])
+
+    def test_bank_refills(self):
+        for _ in range(self.config.sample_bank_size + 1):
+            distribution = self.chromosome.get_distribution(100)
+        self.assertEqual(self.chromosome._bank_index, 1)
+        self.assertEqual(sum(distribution), 100)
+
+    def test_bank_invalidated_on_gene_change(self):
+        self.chromosome.get_distribution(100)
+        self.chromosome.genes = np.array([1.0, 0, 0, 0, 0])
+        self.assertIsNone(self.chromosome._bank)
+        distribution = self.chromosome.get_distribution(100)
+        np.testing.assert_array_equal(distribution, [100, 0, 0, 0, 0])
+
+    def test_bank_invalidated_on_mutation(self):
+        self.chromosome.get_distribution(100)
+        self.chromosome.swap_mutation(swap_probability=1.0)
+        self.assertIsNone(self.chromosome._bank)
+        self.chromosome.get_distribution(100)
+        self.chromosome.point_mutation(mutation_rate=1.0)
+        self.assertIsNone(self.chromosome._bank)
+
+    def test_bank_invalidated_on_armies_change(self):
+        self.chromosome.get_distribution(100)
+        self.assertEqual(sum(self.chromosome.get_distribution(40)), 40)
+
+    def test_validation_cached(self):
+        self.chromosome.validated_genes()
+        self.assertTrue(self.chromosome._validated)
+        self.chromosome.genes = np.array([1, 2, 3, 4, 5])
+        self.assertFalse(self.chromosome._validated)
+        self.assertAlmostEqual(sum(self.chromosome.validated_genes()), 1.0, places=7)
+
+    def test_get_distributions(self):
+        distributions = self.chromosome.get_distributions(100, 8)
+        self.assertEqual(distributions.shape, (8, self.config.num_castles))
+        self.assertTrue((distributions.sum(axis=1) == 100).all())
+
     def test_crossover(self):
         other_chromosome = Chromosome(self.config)
         new_chromosome = self.chromosome.crossover(other_chromosome)
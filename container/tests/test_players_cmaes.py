@@ -0,0 +1,56 @@
+import pickle
+import unittest
+import numpy as np
+from castle.game import Config
+from players.cmaes import CMAES, CMAESPlayer, softmax_rows
+
+
+class TestCMAES(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=5, seed=0)
+
+    def test_softmax_rows(self):
+        genes = softmax_rows([[0, 0], [1000, 0]])
+        np.testing.assert_allclose(genes, [[0.5, 0.5], [1, 0]])
+
+    def test_ask_shape(self):
+        strategy = CMAES(self.config, 20)
+        self.assertEqual(strategy.ask(20).shape, (20, 5))
+
+    def test_converges_to_target_genes(self):
+        target = np.array([0.05, 0.1, 0.15, 0.3, 0.4])
+        strategy = CMAES(self.config, 20)
+        for _ in range(150):
+            logits = strategy.ask(20)
+            fitness = -np.abs(softmax_rows(logits) - target).sum(axis=1)
+            strategy.tell(logits, fitness)
+        np.testing.assert_allclose(strategy.mean_genes(), target, atol=0.01)
+        self.assertLess(strategy.sigma, self.config.cmaes_sigma)
+        np.testing.assert_allclose(strategy.covariance, strategy.covariance.T)
+
+
+class TestCMAESPlayer(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=4, armies_per_player=20)
+        self.player = CMAESPlayer(self.config)
+
+    def test_genes_follow_logits(self):
+        self.player.rewards = [1.0]
+        self.player.set_logits([0.0, 0.0, np.log(2), np.log(4)])
+        np.testing.assert_allclose(
+            self.player.chromosome.genes, np.array([1, 1, 2, 4]) / 8
+        )
+        self.assertEqual(self.player.rewards, [])
+        self.assertEqual(sum(self.player.distribute_armies().values()), 20)
+
+    def test_copy_and_pickle(self):
+        self.player.set_logits([1.0, 2.0, 3.0, 4.0])
+        for other in (self.player.copy(), pickle.loads(pickle.dumps(self.player))):
+            np.testing.assert_array_equal(other.logits, self.player.logits)
+            np.testing.assert_array_equal(
+                other.chromosome.genes, self.player.chromosome.genes
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,6 @@
+import copy
+import pickle
+import tracemalloc
 import unittest
 import numpy as np
 from castle.game import Config
@@ -18,6 +21,16 @@ class TestGeneticPlayer(unittest.TestCase):
         distribution = self.player.distribute_armies()
         self.assertEqual(sum(distribution.values()), self.config.armies_per_player)
         self.assertEqual(len(distribution), self.config.num_castles)
+        self.assertEqual(
+            sorted(distribution), sorted(self.config.points_per_castle.keys())
+        )
+
+    def test_sample_allocations(self):
+        allocations = self.player.sample_allocations(6)
+        self.assertEqual(allocations.shape, (6, self.config.num_castles))
+        self.assertTrue(
+            (allocations.sum(axis=1) == self.config.armies_per_player).all()
+        )
 
     def test_update(self):
         initial_rewards = len(self.player.rewards)
@@ -34,6 +47,14 @@ class TestGeneticPlayer(unittest.TestCase):
         self.player.mutate(mutation_rate=0.5, mutation_amount=0.2)
         self.assertFalse(np.array_equal(original_genes, self.player.chromosome.genes))
 
+    def test_mutate_defaults_to_config(self):
+        config = dict(num_castles=5, armies_per_player=100, point_mutation_rate=1.0)
+        player = GeneticPlayer(Config(seed=0, **config))
+        chromosome = GeneticPlayer(Config(seed=0, **config)).chromosome
+        player.mutate()
+        chromosome.mutate()
+        np.testing.assert_array_equal(player.chromosome.genes, chromosome.genes)
+
     def test_copy(self):
         self.player.rewards = [1, 2, 3]
         copied_player = self.player.copy()
@@ -67,6 +88,46 @@ class TestGeneticPlayer(unittest.TestCase):
         self.assertIsNot(self.player.chromosome, original_chromosome)
         self.assertEqual(len(self.player.rewards), 0)
 
+    def test_copy_shares_config(self):
+        self.player.rewards = [1, 2]
+        new_player = self.player.copy()
+        self.assertIs(new_player.config, self.config)
+        self.assertIs(new_player.chromosome.config, self.config)
+        self.assertEqual(new_player.rewards, [])
+        np.testing.assert_array_equal(
+            new_player.chromosome.genes, self.player.chromosome.genes
+        )
+        new_player.chromosome.genes[0] += 1
+        self.assertNotEqual(
+            new_player.chromosome.genes[0], self.player.chromosome.genes[0]
+        )
+        shallow = copy.copy(self.player)
+        self.assertIs(shallow.chromosome, self.player.chromosome)
+
+    def test_pickle_population_stores_config_once(self):
+        population = [GeneticPlayer(self.config) for _ in range(10)]
+        restored = pickle.loads(pickle.dumps(population))
+        self.assertIs(restored[0].config, restored[9].config)
+        self.assertIs(restored[0].chromosome.config, restored[0].config)
+        np.testing.assert_array_equal(
+            restored[3].chromosome.genes, population[3].chromosome.genes
+        )
+        self.assertEqual(sum(restored[3].distribute_armies().values()), 100)
+
+    def test_population_memory_footprint(self):
+        config = Config(seed=0)
+        tracemalloc.start()
+        try:
+            population = [GeneticPlayer(config) for _ in range(100000)]
+            used, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertFalse(hasattr(population[0], "__dict__"))
+        self.assertFalse(hasattr(population[0].chromosome, "__dict__"))
+        # Players, chromosomes and genes only; the config is shared
+        self.assertLess(used / len(population), 1024)
+        self.assertLess(len(pickle.dumps(population)) / len(population), 512)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+from castle.game import Config
+from players.operators import (
+    blend_crossover,
+    crossover_genes,
+    dirichlet_mutation,
+    gaussian_mutation,
+    mutate_genes,
+    normalize_rows,
+    single_point_crossover,
+    swap_mutation,
+    uniform_crossover,
+)
+
+
+class TestOperators(unittest.TestCase):
+    def setUp(self):
+        self.config = Config(num_castles=6, seed=0)
+        self.rng = self.config.random_generator
+        self.genes = normalize_rows(self.rng.random((50, 6)))
+
+    def assert_normalized(self, genes):
+        self.assertTrue(np.all(genes >= 0))
+        np.testing.assert_allclose(genes.sum(axis=1), 1.0)
+
+    def test_normalize_rows(self):
+        genes = normalize_rows([[1, 3], [-1, -2]])
+        np.testing.assert_allclose(genes, [[0.25, 0.75], [0.5, 0.5]])
+
+    def test_gaussian_mutation_changes_every_row(self):
+        mutated = gaussian_mutation(self.genes, self.rng, 0.0, 0.1)
+        self.assert_normalized(mutated)
+        self.assertTrue(np.all(np.any(mutated != self.genes, axis=1)))
+
+    def test_swap_mutation(self):
+        swapped = swap_mutation(self.genes, self.rng, 1.0)
+        np.testing.assert_allclose(np.sort(swapped), np.sort(self.genes))
+        self.assertTrue(np.all(np.sum(swapped != self.genes, axis=1) == 2))
+        unchanged = swap_mutation(self.genes, self.rng, 0.0)
+        np.testing.assert_array_equal(unchanged, self.genes)
+
+    def test_dirichlet_mutation(self):
+        resampled = dirichlet_mutation(self.genes, self.rng, 1.0, 1000.0)
+        self.assert_normalized(resampled)
+        self.assertFalse(np.array_equal(resampled, self.genes))
+        # A high concentration stays close to the original genes
+        self.assertLess(np.abs(resampled - self.genes).sum(axis=1).mean(), 0.2)
+
+    def test_crossovers_take_genes_from_parents(self):
+        other = normalize_rows(self.rng.random((50, 6)))
+        for crossover in (single_point_crossover, uniform_crossover):
+            offspring = crossover(self.genes, other, self.rng)
+            from_parent = (offspring == self.genes) | (offspring == other)
+            self.assertTrue(np.all(from_parent))
+        offspring = single_point_crossover(self.genes, other, self.rng)
+        np.testing.assert_array_equal(offspring[:, 0], self.genes[:, 0])
+        np.testing.assert_array_equal(offspring[:, -1], other[:, -1])
+        offspring = blend_crossover(self.genes, other, self.rng)
+        low = np.minimum(self.genes, other)
+        high = np.maximum(self.genes, other)
+        self.assertTrue(
+            np.all((offspring >= low - 1e-12) & (offspring <= high + 1e-12))
+        )
+
+    def test_mutate_genes_uses_config(self):
+        config = self.config.replace(
+            mutation_operators=("gaussian", "swap", "dirichlet")
+        )
+        self.assert_normalized(mutate_genes(self.genes, config))
+        config = self.config.replace(mutation_operators=("unknown",))
+        with self.assertRaises(ValueError):
+            mutate_genes(self.genes, config)
+
+    def test_crossover_genes_uses_config(self):
+        for operator in ("single_point", "uniform", "blend"):
+            config = self.config.replace(crossover_operator=operator)
+            self.assert_normalized(
+                crossover_genes(self.genes, self.genes[::-1], config)
+            )
+        config = self.config.replace(crossover_operator="unknown")
+        with self.assertRaises(ValueError):
+            crossover_genes(self.genes, self.genes, config)
+
+    def test_reproducible_with_seed(self):
+        first = mutate_genes(self.genes, Config(num_castles=6, seed=3))
+        second = mutate_genes(self.genes, Config(num_castles=6, seed=3))
+        np.testing.assert_array_equal(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
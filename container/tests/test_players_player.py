@@ -46,6 +46,13 @@ class TestRandomPlayer(unittest.TestCase):
             self.assertIsInstance(armies, int)
             self.assertGreaterEqual(armies, 0)
 
+    def test_sample_allocations(self):
+        allocations = self.player.sample_allocations(7)
+        self.assertEqual(allocations.shape, (7, self.config.num_castles))
+        self.assertTrue(
+            (allocations.sum(axis=1) == self.config.armies_per_player).all()
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
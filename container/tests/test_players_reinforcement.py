@@ -1,7 +1,13 @@
+import copy
+import pickle
 import unittest
 import numpy as np
 from castle.game import Config
-from players.reinforcement import ReinforcedPlayer
+from players.reinforcement import (
+    ReinforcedPlayer,
+    allocations_to_trajectories,
+    batch_q_update,
+)
 
 
 class TestReinforcedPlayer(unittest.TestCase):
@@ -62,15 +68,45 @@ class TestReinforcedPlayer(unittest.TestCase):
 
     def test_epsilon_greedy_strategy(self):
         # Test exploitation
-        self.config.epsilon = 0
+        self.player.config = self.config.replace(epsilon=0)
         exploited_distribution = self.player.distribute_armies()
 
         # Test exploration
-        self.config.epsilon = 1
+        self.player.config = self.config.replace(epsilon=1)
         explored_distribution = self.player.distribute_armies()
 
         self.assertNotEqual(exploited_distribution, explored_distribution)
 
+    def test_deepcopy_copies_qmatrix_only(self):
+        self.player.distribute_armies()
+        new_player = copy.deepcopy(self.player)
+        self.assertIs(new_player.config, self.config)
+        np.testing.assert_array_equal(new_player.qmatrix, self.player.qmatrix)
+        new_player.qmatrix[0, 0] = -1
+        self.assertNotEqual(self.player.qmatrix[0, 0], -1)
+        restored = pickle.loads(pickle.dumps(self.player))
+        np.testing.assert_array_equal(restored.last_actions, self.player.last_actions)
+
+    def test_allocations_to_trajectories(self):
+        allocations = np.array([[3, 0, 1], [0, 4, 0]])
+        armies_left, castles = allocations_to_trajectories(
+            allocations, self.config.random_generator
+        )
+        np.testing.assert_array_equal(armies_left[0], [4, 3, 2, 1])
+        for row, allocation in zip(castles, allocations):
+            np.testing.assert_array_equal(np.bincount(row, minlength=3), allocation)
+
+    def test_batch_q_update(self):
+        qmatrix = np.zeros((3, 2))
+        armies_left = np.array([[2, 1], [2, 1]])
+        castles = np.array([[0, 1], [0, 0]])
+        batch_q_update(qmatrix, armies_left, castles, [1.0, -1.0], 0.5, 0.9)
+        # Both trajectories hit (2, 0): errors +1 and -1 average out
+        self.assertEqual(qmatrix[2, 0], 0)
+        self.assertEqual(qmatrix[1, 1], 0.5)
+        # Q-values are clamped at zero
+        self.assertEqual(qmatrix[1, 0], 0)
+
 
 if __name__ == "__main__":
     unittest.main()